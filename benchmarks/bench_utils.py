@@ -0,0 +1,128 @@
+"""
+bench_utils.py
+----------------
+Helpers shared by the benchmark scripts.
+"""
+
+import itertools
+from pathlib import Path
+import random
+import shutil
+from typing import List
+
+from src.dataset import open_binary
+
+
+def write_scaled_copy(filename: str, repeat: int, directory: str) -> str:
+    """
+    Write `repeat` copies of a file into a new file in `directory` and return its path.
+    """
+    data = Path(filename).read_bytes()
+    scaled_path = Path(directory) / f"scaled_{repeat}x.txt"
+    with open(scaled_path, "wb") as f:
+        for _ in range(repeat):
+            f.write(data)
+            if not data.endswith(b"\n"):
+                f.write(b"\n")
+    return str(scaled_path)
+
+
+def write_compressed_copy(filename: str, suffix: str, directory: str) -> str:
+    """
+    Write a copy of a file compressed by `suffix`, e.g. ".gz", into `directory` and return
+    its path.
+    """
+    compressed_path = Path(directory) / f"{Path(filename).name}{suffix}"
+    with open(filename, "rb") as src, open_binary(str(compressed_path), "wb") as dst:
+        shutil.copyfileobj(src, dst, 1 << 20)
+    return str(compressed_path)
+
+
+# Sizes of the synthetic corpora used by the benchmark suite
+CORPUS_SIZES = {"1MB": 1 << 20, "100MB": 100 << 20, "1GB": 1 << 30}
+# Corpora larger than this are not loaded into memory as lists of lines
+IN_MEMORY_MAX = 100 << 20
+
+_HEADER = (
+    "The Project Gutenberg eBook of A Synthetic Book\n\n"
+    "This eBook is for the use of anyone anywhere in the United States and most other parts\n"
+    "of the world at no cost and with almost no restrictions whatsoever.\n\n"
+    "Title: A Synthetic Book\n\nLanguage: English\n\n"
+    "*** START OF THE PROJECT GUTENBERG EBOOK A SYNTHETIC BOOK ***\n\n"
+)
+_FOOTER = (
+    "\n*** END OF THE PROJECT GUTENBERG EBOOK A SYNTHETIC BOOK ***\n\n"
+    "Updated editions will replace the previous one--the old editions will be renamed.\n"
+)
+_BLOCK_SIZE = 1 << 20
+_N_BLOCKS = 8
+
+
+def _synthetic_paragraphs(rng: random.Random, vocabulary: List[str], size: int) -> str:
+    """
+    Generate about `size` characters of paragraphs of Zipf-distributed words, with
+    capitalised sentences, punctuation, quotes and lines of at most 70 characters.
+    """
+    cum_weights = list(itertools.accumulate(1 / rank for rank in range(1, len(vocabulary) + 1)))
+    words = rng.choices(vocabulary, cum_weights=cum_weights, k=size // 5)
+    lines: List[str] = []
+    line: List[str] = []
+    length = 0
+    start_sentence = True
+    for word in words:
+        if start_sentence:
+            word = word.capitalize()
+            start_sentence = False
+        r = rng.random()
+        if r < 0.06:
+            word += "."
+            start_sentence = True
+        elif r < 0.12:
+            word += ","
+        elif r < 0.13:
+            word = f'"{word}!"'
+        elif r < 0.135:
+            word = f"({word})"
+        if length + len(word) > 70:
+            lines.append(" ".join(line))
+            line, length = [], 0
+            if rng.random() < 0.1:
+                lines.append("")
+        line.append(word)
+        length += len(word) + 1
+    lines.append(" ".join(line))
+    return "\n".join(lines) + "\n"
+
+
+def write_synthetic_book(filename: str, size: int, seed: int = 0, n_words: int = 20_000) -> str:
+    """
+    Write a Project Gutenberg-style book of at most `size` bytes without any network access.
+    The body is built from a few random 1 MB blocks of Zipf-distributed text, so that large
+    books are generated quickly; the output only depends on `size` and `seed`.
+    """
+    rng = random.Random(seed)
+    letters = "abcdefghijklmnopqrstuvwxyz" * 3 + "éèàç'-"
+    vocabulary = sorted(
+        {
+            "".join(rng.choices(letters, k=rng.randint(1, 12))).strip("'-") or "a"
+            for _ in range(n_words)
+        }
+    )
+    rng.shuffle(vocabulary)
+    blocks = [
+        _synthetic_paragraphs(rng, vocabulary, min(_BLOCK_SIZE, size)).encode("utf-8")
+        for _ in range(_N_BLOCKS if size > _BLOCK_SIZE else 1)
+    ]
+    written = 0
+    with open(filename, "wb") as f:
+        written += f.write(_HEADER.encode("utf-8"))
+        while written < size:
+            block = rng.choice(blocks)
+            if written + len(block) > size:
+                # Cut the last block at a line break, so the book is not larger than `size`
+                block = block[: block.rfind(b"\n", 0, size - written) + 1]
+                if not block:
+                    break
+            written += f.write(block)
+        f.write(_FOOTER.encode("utf-8"))
+    return filename
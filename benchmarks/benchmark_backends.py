@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+"""
+benchmark_backends.py
+----------------
+Compares the run time of the "python" and "pandas" counting backends of
+src.analysis.calculate_word_counts for inputs of increasing size. The input file is
+replicated 1, 10, ... times, up to `max-repeat`, into a temporary file.
+Usage:
+    python benchmarks/benchmark_backends.py [input-file] [max-repeat]
+"""
+
+
+import os
+import sys
+import tempfile
+import time
+
+from bench_utils import write_scaled_copy
+
+from src.analysis import BACKENDS, calculate_word_counts
+from src.config import PROCESSED_DATA_DIR
+from src.dataset import iter_chunks
+
+
+def main():
+    """
+    Time every backend on every input size and check that the DataFrames are identical.
+    """
+    filename = sys.argv[1] if len(sys.argv) > 1 else str(PROCESSED_DATA_DIR / "book.txt")
+    max_repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+
+    print(f"input: {filename}")
+    header = " ".join(f"{name + ' (s)':>12}" for name in BACKENDS)
+    print(f"{'repeat':>7} {'MB':>8} {header} identical")
+    with tempfile.TemporaryDirectory() as directory:
+        repeat = 1
+        while repeat <= max_repeat:
+            scaled = write_scaled_copy(filename, repeat, directory)
+            size_mb = os.path.getsize(scaled) / 1e6
+            times = []
+            results = []
+            for backend in BACKENDS:
+                start = time.perf_counter()
+                results.append(calculate_word_counts(iter_chunks(scaled), backend=backend))
+                times.append(time.perf_counter() - start)
+            identical = all(df.equals(results[0]) for df in results)
+            print(
+                f"{repeat:>7} {size_mb:>8.1f} "
+                + " ".join(f"{elapsed:>12.2f}" for elapsed in times)
+                + f" {identical}"
+            )
+            os.remove(scaled)
+            repeat *= 10
+
+if __name__ == "__main__":
+    main()
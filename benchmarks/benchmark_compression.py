@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+"""
+benchmark_compression.py
+----------------
+Compares the end-to-end throughput of cleaning and counting a synthetic book stored plain
+and compressed with every format of src.dataset.COMPRESSED_SUFFIXES. The cleaned text is
+written in the same format as the input, so a compressed book is never decompressed to disk.
+Throughput is given in MB of uncompressed text per second.
+Usage:
+    python benchmarks/benchmark_compression.py [size-mb]
+"""
+
+
+import os
+import sys
+import tempfile
+import time
+
+from bench_utils import write_compressed_copy, write_synthetic_book
+
+from src.analysis import word_count
+from src.dataset import COMPRESSED_SUFFIXES, clean_text
+
+
+def timed(func, *args):
+    """
+    Call `func` and return its result and the elapsed time in seconds.
+    """
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    """
+    Clean and count the book in every format and print a table.
+    """
+    size_mb = float(sys.argv[1]) if len(sys.argv) > 1 else 20
+    with tempfile.TemporaryDirectory() as directory:
+        raw = write_synthetic_book(os.path.join(directory, "book.txt"), int(size_mb * (1 << 20)))
+        text_mb = os.path.getsize(raw) / 1e6
+        print(f"input: synthetic book ({text_mb:.1f} MB)")
+        print(
+            f"{'format':<7} {'MB':>7} {'ratio':>6} {'clean (s)':>10} {'count (s)':>10} "
+            f"{'MB/s':>7} {'identical':>10}"
+        )
+        expected = None
+        for suffix in ("",) + COMPRESSED_SUFFIXES:
+            book = write_compressed_copy(raw, suffix, directory) if suffix else raw
+            clean = os.path.join(directory, f"clean.txt{suffix}")
+            counts = os.path.join(directory, f"counts{suffix.replace('.', '_')}.csv")
+            _, clean_time = timed(clean_text, book, clean)
+            _, count_time = timed(word_count, clean, counts)
+            with open(counts, "rb") as f:
+                result = f.read()
+            expected = result if expected is None else expected
+            book_mb = os.path.getsize(book) / 1e6
+            print(
+                f"{suffix or 'plain':<7} {book_mb:>7.1f} {text_mb / book_mb:>6.1f} "
+                f"{clean_time:>10.2f} {count_time:>10.2f} "
+                f"{text_mb / (clean_time + count_time):>7.1f} {str(result == expected):>10}"
+            )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+"""
+benchmark_formats.py
+----------------
+Compares the write time, file size and read time (whole table and top `limit` rows) of the
+word counts formats supported by src.formats on a synthetic vocabulary of `n-words` rows.
+Usage:
+    python benchmarks/benchmark_formats.py [n-words] [limit]
+"""
+
+
+import importlib.util
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.formats import read_word_counts, write_word_counts
+
+
+def synthetic_word_counts(n_words: int) -> pd.DataFrame:
+    """
+    Build a word counts table of `n_words` distinct words with Zipf-like counts.
+    """
+    words = [f"word{i}" for i in range(n_words)]
+    counts = (1_000_000 // np.arange(1, n_words + 1)).astype(np.int64) + 1
+    return pd.DataFrame({"word": words, "count": counts})
+
+
+def timed(func, *args):
+    """
+    Call `func` and return its result and the elapsed time in seconds.
+    """
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    """
+    Write and read the synthetic table in every available format and print a table.
+    """
+    n_words = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    limit = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    df = synthetic_word_counts(n_words)
+    suffixes = [".csv", ".npz"]
+    if importlib.util.find_spec("pyarrow") is not None:
+        suffixes.append(".feather")
+
+    print(f"vocabulary: {n_words} words, limit: {limit}")
+    print(f"{'format':<9} {'MB':>8} {'write (s)':>10} {'read (s)':>10} {'top (s)':>10}")
+    with tempfile.TemporaryDirectory() as directory:
+        for suffix in suffixes:
+            filename = os.path.join(directory, f"counts{suffix}")
+            _, write_time = timed(write_word_counts, filename, df)
+            _, read_time = timed(read_word_counts, filename)
+            _, top_time = timed(read_word_counts, filename, limit)
+            size_mb = os.path.getsize(filename) / 1e6
+            print(
+                f"{suffix:<9} {size_mb:>8.1f} "
+                f"{write_time:>10.3f} {read_time:>10.3f} {top_time:>10.4f}"
+            )
+
+if __name__ == "__main__":
+    main()
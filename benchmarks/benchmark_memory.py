@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+"""
+benchmark_memory.py
+----------------
+Compares peak memory and run time of the list-based word counter (every token kept in a
+list and counted with pd.Series.value_counts) against the streaming src.analysis counter.
+The input file is replayed `repeat` times to emulate larger corpora.
+Usage:
+    python benchmarks/benchmark_memory.py [input-file] [repeat]
+"""
+
+
+import re
+import sys
+import time
+import tracemalloc
+from typing import Callable, Iterator
+
+import pandas as pd
+
+from src.analysis import DELIMITERS, calculate_word_counts
+from src.config import PROCESSED_DATA_DIR
+
+
+def iter_repeated_lines(filename: str, repeat: int) -> Iterator[str]:
+    """
+    Yield the lines of a file `repeat` times without holding the file in memory.
+    """
+    for _ in range(repeat):
+        with open(filename, encoding="utf-8") as f:
+            yield from f
+
+
+def list_word_counts(filename: str, repeat: int) -> pd.DataFrame:
+    """
+    The original counting path: materialise every token, then call value_counts.
+    """
+    words = []
+    for line in iter_repeated_lines(filename, repeat):
+        clean_line = re.sub(DELIMITERS, " ", line)
+        words.extend([w.lower().strip() for w in clean_line.split()])
+    counts = pd.Series(words).value_counts().reset_index()
+    counts.columns = ["word", "count"]
+    return counts
+
+
+def streaming_word_counts(filename: str, repeat: int) -> pd.DataFrame:
+    """
+    The streaming counting path: only a running word -> count table is kept.
+    """
+    return calculate_word_counts(iter_repeated_lines(filename, repeat))
+
+
+def measure(func: Callable[[str, int], pd.DataFrame], filename: str, repeat: int):
+    """
+    Run `func` and return its result, wall time in seconds and traced peak memory in MB.
+    """
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func(filename, repeat)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak / 1e6
+
+
+def main():
+    """
+    Run both counting paths on the same input and print a comparison table.
+    """
+    filename = sys.argv[1] if len(sys.argv) > 1 else str(PROCESSED_DATA_DIR / "book.txt")
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+
+    list_df, list_time, list_peak = measure(list_word_counts, filename, repeat)
+    stream_df, stream_time, stream_peak = measure(streaming_word_counts, filename, repeat)
+
+    print(f"input: {filename} x {repeat}")
+    print(f"{'path':<10} {'time (s)':>10} {'peak (MB)':>10}")
+    print(f"{'list':<10} {list_time:>10.2f} {list_peak:>10.1f}")
+    print(f"{'streaming':<10} {stream_time:>10.2f} {stream_peak:>10.1f}")
+    identical = list_df.to_csv(index=False) == stream_df.to_csv(index=False)
+    print(f"identical CSV output: {identical}")
+
+if __name__ == "__main__":
+    main()
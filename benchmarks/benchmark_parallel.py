@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+"""
+benchmark_parallel.py
+----------------
+Measures the speedup of src.analysis.parallel_count_words over the serial counter for an
+increasing number of worker processes. The input file is replicated `repeat` times into a
+temporary file to emulate a large book.
+Usage:
+    python benchmarks/benchmark_parallel.py [input-file] [repeat] [max-workers]
+"""
+
+
+import os
+import sys
+import tempfile
+import time
+
+from bench_utils import write_scaled_copy
+
+from src.analysis import count_words, parallel_count_words
+from src.config import PROCESSED_DATA_DIR
+from src.dataset import iter_lines
+
+
+def main():
+    """
+    Time the serial counter and the parallel counter with 1, 2, 4, ... workers.
+    """
+    filename = sys.argv[1] if len(sys.argv) > 1 else str(PROCESSED_DATA_DIR / "book.txt")
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    max_workers = int(sys.argv[3]) if len(sys.argv) > 3 else os.cpu_count() or 1
+
+    with tempfile.TemporaryDirectory() as directory:
+        scaled = write_scaled_copy(filename, repeat, directory)
+        size_mb = os.path.getsize(scaled) / 1e6
+
+        start = time.perf_counter()
+        expected = count_words(iter_lines(scaled))
+        serial = time.perf_counter() - start
+
+        print(f"input: {filename} x {repeat} ({size_mb:.1f} MB)")
+        print(f"{'workers':>8} {'time (s)':>10} {'MB/s':>8} {'speedup':>8} {'identical':>10}")
+        print(f"{'serial':>8} {serial:>10.2f} {size_mb / serial:>8.1f} {1.0:>8.2f} {'-':>10}")
+        workers = 1
+        while workers <= max_workers:
+            start = time.perf_counter()
+            counts = parallel_count_words(scaled, workers=workers)
+            elapsed = time.perf_counter() - start
+            identical = counts == expected and list(counts) == list(expected)
+            print(
+                f"{workers:>8} {elapsed:>10.2f} {size_mb / elapsed:>8.1f} "
+                f"{serial / elapsed:>8.2f} {str(identical):>10}"
+            )
+            workers *= 2
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+"""
+benchmark_startup.py
+----------------
+Measures the cold-start import time of every command module with `python -X importtime`
+and fails if the median of `runs` runs exceeds its target. It also checks that importing a
+command does not load the heavy dependencies, which are only needed once work starts.
+Usage:
+    python benchmarks/benchmark_startup.py [runs]
+"""
+
+
+import os
+import statistics
+import subprocess
+import sys
+
+from src.config import PROJ_ROOT
+
+# Cumulative import time targets in milliseconds. When they were set, loguru and typer were
+# the only dependencies loaded at startup and every command imported in about 150 ms
+TARGETS_MS = {
+    "src.__main__": 60,
+    "src.dataset": 250,
+    "src.analysis": 250,
+    "src.plots": 300,
+    "src.pipeline": 300,
+    "src.shards": 250,
+    "src.corpus": 250,
+    "src.server": 250,
+    "src.compare": 250,
+    "src.zipf": 250,
+    "src.index": 250,
+}
+LAZY_MODULES = ("pandas", "numpy", "matplotlib", "tqdm", "dotenv")
+
+
+def import_time_ms(module):
+    """
+    Import a module in a fresh interpreter and return its cumulative import time in ms.
+    """
+    env = dict(os.environ, PYTHONPATH=str(PROJ_ROOT))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        env=env,
+        check=True,
+    )
+    last = result.stderr.strip().splitlines()[-1]
+    return int(last.split("|")[1]) / 1000
+
+
+def loaded_heavy_modules(module):
+    """
+    Return the heavy dependencies that are loaded by importing a module.
+    """
+    env = dict(os.environ, PYTHONPATH=str(PROJ_ROOT))
+    code = f"import sys, {module}; print(' '.join(m for m in {LAZY_MODULES!r} if m in sys.modules))"
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, env=env, check=True
+    )
+    return result.stdout.split()
+
+
+def main():
+    """
+    Print the median import time of every command module against its target.
+    """
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+
+    print(f"{'module':<14} {'median (ms)':>12} {'target (ms)':>12} {'heavy imports':<20} ok")
+    failed = False
+    for module, target in TARGETS_MS.items():
+        median = statistics.median(import_time_ms(module) for _ in range(runs))
+        heavy = loaded_heavy_modules(module)
+        ok = median <= target and not heavy
+        failed |= not ok
+        print(f"{module:<14} {median:>12.1f} {target:>12} {','.join(heavy) or '-':<20} {ok}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+"""
+benchmark_tokenizers.py
+----------------
+Compares the tokens per second of the reference SubSplitTokenizer (per line re.sub, split,
+lower and strip) and the block-level RegexTokenizer. The input file is replicated `repeat`
+times into a temporary file and tokenised in line-aligned chunks.
+Usage:
+    python benchmarks/benchmark_tokenizers.py [input-file] [repeat] [min_length]
+"""
+
+
+import os
+import sys
+import tempfile
+import time
+
+from bench_utils import write_scaled_copy
+
+from src.analysis import RegexTokenizer, SubSplitTokenizer, Tokenizer
+from src.config import RAW_DATA_DIR
+from src.dataset import iter_chunks, iter_lines
+
+
+def run(tokenizer: Tokenizer, texts, min_length: int):
+    """
+    Tokenise every text and return the number of tokens and the elapsed time.
+    """
+    start = time.perf_counter()
+    n_tokens = 0
+    for text in texts:
+        n_tokens += len(tokenizer.tokenize(text, min_length))
+    return n_tokens, time.perf_counter() - start
+
+
+def main():
+    """
+    Tokenise the scaled input with both tokenizers and print tokens per second.
+    """
+    filename = sys.argv[1] if len(sys.argv) > 1 else str(RAW_DATA_DIR / "book.txt")
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    min_length = int(sys.argv[3]) if len(sys.argv) > 3 else 1
+
+    with tempfile.TemporaryDirectory() as directory:
+        scaled = write_scaled_copy(filename, repeat, directory)
+        size_mb = os.path.getsize(scaled) / 1e6
+        print(f"input: {filename} x {repeat} ({size_mb:.1f} MB), min_length={min_length}")
+        print(f"{'tokenizer':<28} {'tokens':>12} {'time (s)':>10} {'Mtokens/s':>10}")
+        cases = [
+            ("SubSplitTokenizer (lines)", SubSplitTokenizer(), iter_lines(scaled)),
+            ("RegexTokenizer (lines)", RegexTokenizer(), iter_lines(scaled)),
+            ("RegexTokenizer (chunks)", RegexTokenizer(), iter_chunks(scaled)),
+        ]
+        totals = set()
+        for name, tokenizer, texts in cases:
+            n_tokens, elapsed = run(tokenizer, texts, min_length)
+            totals.add(n_tokens)
+            print(f"{name:<28} {n_tokens:>12} {elapsed:>10.2f} {n_tokens / elapsed / 1e6:>10.2f}")
+        print(f"same number of tokens: {len(totals) == 1}")
+
+if __name__ == "__main__":
+    main()
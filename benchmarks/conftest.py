@@ -0,0 +1,191 @@
+"""
+conftest.py
+----------------
+Fixtures of the pytest-benchmark suite in test_performance.py: synthetic Gutenberg-style
+corpora of the sizes selected with --bench-sizes, and a peak memory check against the
+baselines in benchmarks/baselines/memory.json.
+"""
+
+import json
+import os
+from pathlib import Path
+import tracemalloc
+from typing import Any, Callable, Dict, List, Tuple
+
+from bench_utils import CORPUS_SIZES, write_compressed_copy, write_synthetic_book
+import pytest
+
+from src.analysis import calculate_word_counts
+from src.dataset import clean_text, iter_lines
+
+MEMORY_BASELINE = Path(__file__).parent / "baselines" / "memory.json"
+# Peak memory may exceed its baseline by this fraction before a benchmark fails
+MEMORY_THRESHOLD = 0.2
+# Absolute slack in MB, so that tiny peaks do not fail on allocator noise
+MEMORY_SLACK_MB = 0.5
+# Number of timed rounds per corpus size
+ROUNDS = {"1MB": 5, "100MB": 3, "1GB": 1}
+
+
+def pytest_addoption(parser: pytest.Parser) -> None:
+    group = parser.getgroup("bench", "word count benchmarks")
+    group.addoption(
+        "--bench-sizes",
+        default=os.environ.get("BENCH_SIZES", "1MB"),
+        help=f"Comma-separated corpus sizes to benchmark, out of {', '.join(CORPUS_SIZES)}.",
+    )
+    group.addoption(
+        "--bench-corpus-dir",
+        default=os.environ.get("BENCH_CORPUS_DIR"),
+        help="Directory to keep the generated corpora in between runs.",
+    )
+    group.addoption(
+        "--memory-threshold",
+        type=float,
+        default=MEMORY_THRESHOLD,
+        help="Fail if peak memory exceeds its baseline by more than this fraction.",
+    )
+    group.addoption(
+        "--update-memory-baseline",
+        action="store_true",
+        help="Save the measured peak memory as the new baseline instead of checking it.",
+    )
+
+
+def _selected_sizes(config: pytest.Config) -> List[str]:
+    sizes = [size.strip() for size in config.getoption("--bench-sizes").split(",") if size]
+    unknown = [size for size in sizes if size not in CORPUS_SIZES]
+    if unknown:
+        raise pytest.UsageError(f"Unknown corpus sizes {unknown}, use {list(CORPUS_SIZES)}")
+    return sizes
+
+
+def pytest_generate_tests(metafunc: pytest.Metafunc) -> None:
+    if "corpus_size" in metafunc.fixturenames:
+        metafunc.parametrize("corpus_size", _selected_sizes(metafunc.config), scope="session")
+
+
+class MemoryBaseline:
+    """
+    Peak memory of every benchmark, checked against and optionally saved as a baseline.
+    """
+
+    def __init__(self, path: Path, threshold: float, update: bool):
+        self.path = path
+        self.threshold = threshold
+        self.update = update
+        self.baseline: Dict[str, float] = {}
+        if path.exists():
+            self.baseline = json.loads(path.read_text(encoding="utf-8"))
+        self.results: Dict[str, float] = {}
+
+    def check(self, name: str, peak_mb: float) -> None:
+        self.results[name] = peak_mb
+        if self.update or name not in self.baseline:
+            return
+        limit = self.baseline[name] * (1 + self.threshold) + MEMORY_SLACK_MB
+        if peak_mb > limit:
+            pytest.fail(
+                f"Peak memory of {name} is {peak_mb:.1f} MB, "
+                f"more than {limit:.1f} MB (baseline {self.baseline[name]:.1f} MB)"
+            )
+
+    def save(self) -> None:
+        baseline = {**self.baseline, **{k: round(v, 2) for k, v in self.results.items()}}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.path.write_text(json.dumps(baseline, indent=2, sort_keys=True) + "\n")
+
+
+@pytest.fixture(scope="session")
+def memory_baseline(pytestconfig: pytest.Config):
+    baseline = MemoryBaseline(
+        MEMORY_BASELINE,
+        pytestconfig.getoption("--memory-threshold"),
+        pytestconfig.getoption("--update-memory-baseline"),
+    )
+    yield baseline
+    if baseline.update and baseline.results:
+        baseline.save()
+
+
+def peak_memory_mb(func: Callable[..., Any], *args: Any, **kwargs: Any) -> float:
+    """
+    Run a function once and return the peak memory in MB allocated by Python meanwhile.
+    """
+    tracemalloc.start()
+    try:
+        func(*args, **kwargs)
+        return tracemalloc.get_traced_memory()[1] / (1 << 20)
+    finally:
+        tracemalloc.stop()
+
+
+@pytest.fixture
+def measure(benchmark, request: pytest.FixtureRequest, memory_baseline: MemoryBaseline):
+    """
+    Benchmark a function on a corpus size, then record its throughput and peak memory in
+    the benchmark's extra_info and check the peak memory against its baseline.
+    """
+
+    def run(
+        func: Callable[..., Any],
+        *args: Any,
+        size: str,
+        nbytes: int = 0,
+        tokens: int = 0,
+        **kwargs: Any,
+    ) -> Any:
+        result = benchmark.pedantic(func, args, kwargs, rounds=ROUNDS[size], iterations=1)
+        if benchmark.stats is not None:
+            mean = max(benchmark.stats.stats.mean, 1e-9)
+            if nbytes:
+                benchmark.extra_info["mb_per_s"] = nbytes / 1e6 / mean
+            if tokens:
+                benchmark.extra_info["tokens_per_s"] = tokens / mean
+        peak = peak_memory_mb(func, *args, **kwargs)
+        benchmark.extra_info["peak_mb"] = peak
+        memory_baseline.check(request.node.name, peak)
+        return result
+
+    return run
+
+
+@pytest.fixture(scope="session")
+def raw_book(corpus_size: str, pytestconfig: pytest.Config, tmp_path_factory) -> str:
+    corpus_dir = pytestconfig.getoption("--bench-corpus-dir")
+    directory = Path(corpus_dir) if corpus_dir else tmp_path_factory.mktemp("corpus")
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"synthetic_{corpus_size}.txt"
+    if not path.exists():
+        write_synthetic_book(str(path), CORPUS_SIZES[corpus_size])
+    return str(path)
+
+
+@pytest.fixture(scope="session")
+def clean_book(raw_book: str, tmp_path_factory) -> str:
+    path = tmp_path_factory.mktemp("clean") / "book.txt"
+    clean_text(raw_book, str(path))
+    return str(path)
+
+
+@pytest.fixture(scope="session")
+def book_tokens(clean_book: str) -> int:
+    return int(calculate_word_counts(iter_lines(clean_book))["count"].sum())
+
+
+@pytest.fixture(scope="session")
+def compressed_copy(tmp_path_factory) -> Callable[[str, str], str]:
+    """
+    Return a function that compresses a file by suffix, e.g. ".gz", once per session.
+    """
+    directory = tmp_path_factory.mktemp("compressed")
+    copies: Dict[Tuple[str, str], str] = {}
+
+    def get(filename: str, suffix: str) -> str:
+        if (filename, suffix) not in copies:
+            target = directory / str(len(copies))
+            target.mkdir()
+            copies[filename, suffix] = write_compressed_copy(filename, suffix, str(target))
+        return copies[filename, suffix]
+
+    return get
@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+"""
+load_test.py
+----------------
+Sends `requests` count requests with `concurrency` concurrent clients to a count server and
+reports the client-side p50/p99 latency and throughput, together with the server's own
+metrics. Every request counts a random slice of lines of the input file. Without a URL a
+server with `workers` worker processes is started in this process.
+Usage:
+    python benchmarks/load_test.py [input-file] [requests] [concurrency] [url]
+"""
+
+
+from concurrent.futures import ThreadPoolExecutor
+import os
+import random
+import sys
+import threading
+import time
+
+from loguru import logger
+
+from src.config import PROCESSED_DATA_DIR
+from src.server import (
+    CountServer,
+    CountService,
+    percentile,
+    request_counts,
+    request_metrics,
+)
+
+LINES_PER_REQUEST = 50
+
+
+def timed_request(url, text):
+    """
+    Send one count request and return its latency in seconds.
+    """
+    start = time.perf_counter()
+    request_counts(text=text, url=url)
+    return time.perf_counter() - start
+
+
+def main():
+    """
+    Run the load test and print the latency and throughput.
+    """
+    filename = sys.argv[1] if len(sys.argv) > 1 else str(PROCESSED_DATA_DIR / "book.txt")
+    n_requests = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    concurrency = int(sys.argv[3]) if len(sys.argv) > 3 else 16
+    url = sys.argv[4] if len(sys.argv) > 4 else None
+
+    with open(filename, encoding="utf-8") as f:
+        lines = f.read().splitlines()
+    rng = random.Random(0)
+    texts = []
+    for _ in range(n_requests):
+        start = rng.randrange(max(len(lines) - LINES_PER_REQUEST, 1))
+        texts.append("\n".join(lines[start : start + LINES_PER_REQUEST]))
+
+    # Leave out the debug log line of every request
+    logger.remove()
+    logger.add(sys.stderr, level="INFO")
+    server = service = None
+    if url is None:
+        service = CountService(workers=os.cpu_count() or 1).start()
+        server = CountServer(("127.0.0.1", 0), service)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_port}"
+
+    print(f"input: {filename}, {n_requests} requests, {concurrency} concurrent clients")
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        latencies = list(executor.map(lambda text: timed_request(url, text), texts))
+    elapsed = time.perf_counter() - start
+
+    print(f"{'p50 (ms)':>10} {'p99 (ms)':>10} {'requests/s':>12}")
+    print(
+        f"{percentile(latencies, 50) * 1000:>10.2f} {percentile(latencies, 99) * 1000:>10.2f} "
+        f"{n_requests / elapsed:>12.1f}"
+    )
+    print("server metrics:")
+    for name, value in request_metrics(url).items():
+        print(f"{name:>16}: {value:.3f}" if isinstance(value, float) else f"{name:>16}: {value}")
+
+    if server is not None:
+        server.shutdown()
+        server.server_close()
+        service.close()
+
+
+if __name__ == "__main__":
+    main()
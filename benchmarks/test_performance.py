@@ -0,0 +1,178 @@
+"""
+test_performance.py
+----------------
+pytest-benchmark suite of the pipeline stages on synthetic corpora. Every benchmark
+records its throughput and peak memory in extra_info; a benchmark fails if its peak memory
+exceeds the baseline in benchmarks/baselines/memory.json, and, with --benchmark-compare-fail,
+if its run time regresses against a saved baseline.
+Usage:
+    pytest benchmarks --bench-sizes 1MB,100MB --benchmark-compare --benchmark-compare-fail=mean:20%
+"""
+
+from io import BytesIO
+import os
+from pathlib import Path
+
+from bench_utils import CORPUS_SIZES, IN_MEMORY_MAX
+import pytest
+
+from src.analysis import BACKENDS, calculate_word_counts, ngram_word_count, word_count
+from src.dataset import COMPRESSED_SUFFIXES, clean_text, iter_lines, load_text, strip_headers
+from src.index import WordIndex
+
+pytest.importorskip("pytest_benchmark")
+
+
+def _skip_if_too_large(corpus_size: str) -> None:
+    if CORPUS_SIZES[corpus_size] > IN_MEMORY_MAX:
+        pytest.skip(f"{corpus_size} is not loaded into memory")
+
+
+# ------------------- Dataset -------------------
+
+
+def test_load_text(measure, corpus_size: str, raw_book: str):
+    """Benchmark loading a raw book as a list of lines."""
+    _skip_if_too_large(corpus_size)
+    lines = measure(load_text, raw_book, size=corpus_size, nbytes=os.path.getsize(raw_book))
+    assert lines
+
+
+def test_strip_headers(measure, corpus_size: str, raw_book: str):
+    """Benchmark stripping the Gutenberg headers from the lines of a book in memory."""
+    _skip_if_too_large(corpus_size)
+    lines = load_text(raw_book)
+    text = measure(strip_headers, lines, size=corpus_size, nbytes=os.path.getsize(raw_book))
+    assert text
+
+
+def test_clean_text(measure, corpus_size: str, raw_book: str, tmp_path: Path):
+    """Benchmark cleaning a book from file to file."""
+    output = tmp_path / "clean.txt"
+    measure(clean_text, raw_book, str(output), size=corpus_size, nbytes=os.path.getsize(raw_book))
+    assert output.stat().st_size > 0
+
+
+@pytest.mark.parametrize("suffix", COMPRESSED_SUFFIXES)
+def test_clean_text_compressed(
+    measure, corpus_size: str, raw_book: str, compressed_copy, suffix: str, tmp_path: Path
+):
+    """Benchmark cleaning a compressed book into a file of the same format, per MB of text."""
+    book = compressed_copy(raw_book, suffix)
+    output = tmp_path / f"clean.txt{suffix}"
+    measure(clean_text, book, str(output), size=corpus_size, nbytes=os.path.getsize(raw_book))
+    assert output.stat().st_size > 0
+
+
+# ------------------- Analysis -------------------
+
+
+@pytest.mark.parametrize("backend", list(BACKENDS))
+def test_calculate_word_counts(
+    measure, corpus_size: str, clean_book: str, book_tokens: int, backend: str
+):
+    """Benchmark counting the words of a book held in memory, for every backend."""
+    _skip_if_too_large(corpus_size)
+    lines = load_text(clean_book)
+    df = measure(
+        calculate_word_counts,
+        lines,
+        backend=backend,
+        size=corpus_size,
+        nbytes=os.path.getsize(clean_book),
+        tokens=book_tokens,
+    )
+    assert df["count"].sum() == book_tokens
+
+
+@pytest.mark.parametrize("backend", list(BACKENDS))
+def test_word_count(
+    measure, corpus_size: str, clean_book: str, book_tokens: int, backend: str, tmp_path: Path
+):
+    """Benchmark counting the words of a book from file to file, for every backend."""
+    output = tmp_path / "counts.csv"
+    measure(
+        word_count,
+        clean_book,
+        str(output),
+        backend=backend,
+        size=corpus_size,
+        nbytes=os.path.getsize(clean_book),
+        tokens=book_tokens,
+    )
+    assert output.stat().st_size > 0
+
+
+@pytest.mark.parametrize("suffix", COMPRESSED_SUFFIXES)
+def test_word_count_compressed(
+    measure,
+    corpus_size: str,
+    clean_book: str,
+    book_tokens: int,
+    compressed_copy,
+    suffix: str,
+    tmp_path: Path,
+):
+    """Benchmark counting the words of a compressed book from file to file, per MB of text."""
+    output = tmp_path / "counts.csv"
+    measure(
+        word_count,
+        compressed_copy(clean_book, suffix),
+        str(output),
+        size=corpus_size,
+        nbytes=os.path.getsize(clean_book),
+        tokens=book_tokens,
+    )
+    assert output.stat().st_size > 0
+
+
+@pytest.mark.parametrize("n", [2, 3])
+def test_ngram_word_count(
+    measure, corpus_size: str, clean_book: str, book_tokens: int, n: int, tmp_path: Path
+):
+    """Benchmark counting the bigrams and trigrams of a book from file to file."""
+    output = tmp_path / "ngrams.csv"
+    measure(
+        ngram_word_count,
+        clean_book,
+        str(output),
+        n,
+        size=corpus_size,
+        nbytes=os.path.getsize(clean_book),
+        tokens=book_tokens,
+    )
+    assert output.stat().st_size > 0
+
+
+@pytest.mark.parametrize("lines", [False, True], ids=["counts", "lines"])
+def test_build_word_index(
+    measure, corpus_size: str, clean_book: str, book_tokens: int, lines: bool, tmp_path: Path
+):
+    """Benchmark building and saving the inverted index of a book, with and without lines."""
+    output = tmp_path / "index.npz"
+
+    def build() -> None:
+        WordIndex.build([clean_book], lines=lines).save(str(output))
+
+    measure(build, size=corpus_size, nbytes=os.path.getsize(clean_book), tokens=book_tokens)
+    assert WordIndex.load(str(output)).totals.tolist() == [book_tokens]
+
+
+# ------------------- Plots -------------------
+
+
+def test_plot_word_counts(measure, corpus_size: str, clean_book: str):
+    """Benchmark rendering the histogram of the top words to PDF."""
+    from src.plots import plot_word_counts, pyplot
+
+    df = calculate_word_counts(iter_lines(clean_book))
+    plt = pyplot()
+
+    def render() -> int:
+        buffer = BytesIO()
+        plot_word_counts(df)
+        plt.savefig(buffer, format="pdf")
+        plt.close()
+        return buffer.tell()
+
+    assert measure(render, size=corpus_size) > 0
@@ -11,7 +11,7 @@ Usage:
 
 import sys
 
-from src.dataset import load_text, save_text, strip_headers
+from src.dataset import clean_text
 
 
 def main():
@@ -23,9 +23,7 @@ def main():
         sys.exit(1)
     input_file = sys.argv[1]
     output_file = sys.argv[2]
-    text = load_text(input_file)
-    cleaned_text = strip_headers(text)
-    save_text(output_file, cleaned_text)
+    clean_text(input_file, output_file)
 
 if __name__ == "__main__":
     main()
@@ -12,8 +12,8 @@ Usage:
 import sys
 
 import matplotlib.pyplot as plt
-import pandas as pd
 
+from src.formats import read_word_counts
 from src.plots import plot_word_counts
 
 
@@ -29,7 +29,7 @@ def main():
     input_file = sys.argv[1]
     output_file = sys.argv[2]
     limit = int(sys.argv[3]) if len(sys.argv) > 3 else 10
-    df = pd.read_csv(input_file)
+    df = read_word_counts(input_file, limit)
     plot_word_counts(df, limit)
     if output_file == "show":
         plt.show()
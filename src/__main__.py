@@ -0,0 +1,53 @@
+"""
+Run a command of the pipeline: python -m src <command> [OPTIONS]
+
+Only the module of the chosen command is imported, so a command starts without loading the
+dependencies of the others.
+"""
+
+import importlib
+import sys
+from typing import List, Optional
+
+COMMANDS = {
+    "dataset": ("src.dataset", "Clean a raw Project Gutenberg book."),
+    "analysis": ("src.analysis", "Count the words of a cleaned book."),
+    "plots": ("src.plots", "Plot a histogram of word counts."),
+    "corpus": ("src.corpus", "Clean and count a whole directory of books."),
+    "compare": ("src.compare", "Compare the top words of many books in one plot."),
+    "zipf": ("src.zipf", "Fit Zipf's law to a table of word counts."),
+    "index": ("src.index", "Index the processed books and look up words in them."),
+    "pipeline": ("src.pipeline", "Clean, count and plot a book in one process."),
+    "shards": ("src.shards", "Merge and sort on-disk word count shards."),
+    "server": ("src.server", "Serve word counts from a warm process, or query the server."),
+}
+
+
+def usage() -> str:
+    lines = ["Usage: python -m src COMMAND [OPTIONS]", "", "Commands:"]
+    lines += [f"  {name:<10}{help_text}" for name, (_, help_text) in COMMANDS.items()]
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """
+    Import the module of the command named by the first argument and run its Typer app with
+    the remaining arguments.
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] in ("-h", "--help"):
+        print(usage())
+        return
+    name, args = argv[0], argv[1:]
+    if name not in COMMANDS:
+        print(f"Unknown command {name!r}\n\n{usage()}", file=sys.stderr)
+        sys.exit(2)
+    module = importlib.import_module(COMMANDS[name][0])
+    # Accept the "main" subcommand used by the pixi tasks for single-command apps
+    if args[:1] == ["main"] and len(module.app.registered_commands) == 1:
+        args = args[1:]
+    module.app(args=args, prog_name=f"python -m src {name}")
+
+
+if __name__ == "__main__":
+    main()
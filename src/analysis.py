@@ -1,54 +1,623 @@
+from abc import ABC, abstractmethod
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+import hashlib
+import json
+import os
 from pathlib import Path
 import re
-from typing import List
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Tuple,
+)
 
 from loguru import logger
-import pandas as pd
-from tqdm import tqdm
 import typer
 
+from src.cache import cached_step, prefix_digest
 from src.config import ANALYZED_DIR, PROCESSED_DATA_DIR
-from src.dataset import load_text
+from src.dataset import compression, iter_chunks, last_line_end, split_line_ranges
+from src.profiling import NULL_PROFILER, Profiler, profile_command, progress
+from src.shards import write_shard
+
+# numpy, pandas and the modules that need them are imported by the functions that use
+# them, so that starting a command does not pay for them unless they are needed
+if TYPE_CHECKING:
+    import pandas as pd
+
+    from src.ngrams import NgramCounter
+    from src.sketch import CountMinSketch, SpaceSaving
+    from src.vocab import CountVector, Vocabulary
 
 app = typer.Typer()
 
 
 DELIMITERS = r"[\.\,;:\?\$@\^<>#%`!\*\-=\(\)\[\]\{\}/\\\"']"
 
+# The only character whose lower-case form is longer, which would change word lengths
+_EXPANDING_LOWER = "\u0130"
+
 
-def save_word_counts(filename: str, df: pd.DataFrame) -> None:
+class Tokenizer(ABC):
     """
-    Save a DataFrame of word counts to a CSV file.
+    Abstract base class of tokenizers that split text into lower-case words.
+    Words are separated by whitespace and by the characters of the `delimiters` regex
+    character class, and only words whose length is >= min_length are kept.
     """
-    df.to_csv(filename, index=False)
+
+    def __init__(self, delimiters: str = DELIMITERS):
+        self.delimiters = delimiters
+
+    @abstractmethod
+    def tokenize(self, text: str, min_length: int = 1) -> List[str]:
+        """
+        Return the words of a text, in order.
+        """
 
 
-def calculate_word_counts(lines: List[str], min_length: int = 1) -> pd.DataFrame:
+class SubSplitTokenizer(Tokenizer):
     """
-    Given a list of strings, parse each string and create a DataFrame of word counts.
-    DELIMITERS are removed before the string is parsed. The function is case-insensitive
-    and words in the dictionary are in lower-case.
+    Reference tokenizer: re.sub of the delimiters, str.split, then lower and strip every word.
     """
-    words = []
-    for line in lines:
+
+    def tokenize(self, text: str, min_length: int = 1) -> List[str]:
         # Remove delimiters and split into words
-        clean_line = re.sub(DELIMITERS, " ", line)
-        words.extend([w.lower().strip() for w in clean_line.split() if len(w) >= min_length])
-    word_series = pd.Series(words)
-    counts = word_series.value_counts().reset_index()
-    counts.columns = ["word", "count"]
+        clean_text = re.sub(self.delimiters, " ", text)
+        return [w.lower().strip() for w in clean_text.split() if len(w) >= min_length]
+
+
+class RegexTokenizer(Tokenizer):
+    """
+    Block tokenizer: one precompiled substitution, one case fold and one split per block.
+    Delimiters are replaced by spaces before case folding, so context-dependent lower-case
+    forms see the same word boundaries as in SubSplitTokenizer. Words are only filtered
+    by length when min_length > 1. The words are identical to those of SubSplitTokenizer.
+    """
+
+    def __init__(self, delimiters: str = DELIMITERS):
+        super().__init__(delimiters)
+        self.pattern = re.compile(delimiters)
+
+    def tokenize(self, text: str, min_length: int = 1) -> List[str]:
+        clean_text = self.pattern.sub(" ", text)
+        if _EXPANDING_LOWER in clean_text:
+            return [w.lower() for w in clean_text.split() if len(w) >= min_length]
+        words = clean_text.lower().split()
+        if min_length > 1:
+            return [w for w in words if len(w) >= min_length]
+        return words
+
+
+DEFAULT_TOKENIZER = RegexTokenizer()
+PANDAS_BATCH_LINES = 100_000
+SKETCH_CAPACITY = 10_000
+SKETCH_WIDTH = 1 << 16
+SKETCH_DEPTH = 4
+
+
+def count_params(
+    min_length: int = 1, top_k: Optional[int] = None, ngram: int = 1
+) -> Dict[str, Any]:
+    """
+    Return the counting parameters that change the word counts, used as cache key parameters.
+    """
+    params: Dict[str, Any] = {"min_length": min_length, "delimiters": DELIMITERS}
+    if top_k:
+        params["top_k"] = top_k
+    if ngram > 1:
+        params["ngram"] = ngram
+    return params
+
+
+def save_word_counts(filename: str, df: "pd.DataFrame") -> None:
+    """
+    Save a DataFrame of word counts to a CSV file, or to a Feather or NumPy .npz file if
+    the filename ends with .feather or .npz.
+    """
+    from src.formats import write_word_counts
+
+    write_word_counts(filename, df)
+
+
+def count_words(
+    lines: Iterable[str], min_length: int = 1, tokenizer: Tokenizer = DEFAULT_TOKENIZER
+) -> Counter[str]:
+    """
+    Count words in an iterable of strings, keeping only a running word -> count table.
+    Strings are consumed one at a time, so a generator over a file is never materialised.
+    They may be single lines or whole line-aligned blocks of text, since words never span
+    a line break. Dictionary keys are kept in order of first appearance.
+    """
+    counts: Counter[str] = Counter()
+    for line in lines:
+        counts.update(tokenizer.tokenize(line, min_length))
     return counts
 
 
-def word_count(input_file: str, output_file: str, min_length: int = 1) -> None:
+def _iter_line_batches(lines: Iterable[str], batch_size: int) -> Iterator[List[str]]:
+    """
+    Regroup strings, which may be single lines or blocks of lines, into batches of lines.
+    """
+    batch: List[str] = []
+    for text in lines:
+        batch.extend(text.splitlines())
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def pandas_count_words(
+    lines: Iterable[str], min_length: int = 1, tokenizer: Tokenizer = DEFAULT_TOKENIZER
+) -> Counter[str]:
+    """
+    Count words with vectorized pandas string operations instead of Python-level loops.
+    Lines are processed in batches of PANDAS_BATCH_LINES: the tokenizer's delimiters are
+    replaced with str.replace, lines are split and exploded into words, filtered on
+    min_length and case folded with str.lower, then counted with value_counts. The result
+    is identical to count_words, including the order of first appearance.
+    """
+    import pandas as pd
+
+    counts: Counter[str] = Counter()
+    for batch in _iter_line_batches(lines, PANDAS_BATCH_LINES):
+        # object dtype keeps Python's str semantics, e.g. for lower(), with any string storage
+        series = pd.Series(batch, dtype=object)
+        cleaned = series.str.replace(tokenizer.delimiters, " ", regex=True)
+        words = cleaned.str.split().explode().dropna().astype(object)
+        if min_length > 1:
+            words = words[words.str.len() >= min_length]
+        counts.update(words.str.lower().value_counts(sort=False).to_dict())
+    return counts
+
+
+def vocab_count_words(
+    lines: Iterable[str],
+    min_length: int = 1,
+    tokenizer: Tokenizer = DEFAULT_TOKENIZER,
+    vocabulary: Optional["Vocabulary"] = None,
+) -> "CountVector":
+    """
+    Count words into an array indexed by integer word IDs instead of a word -> count dict.
+    Only the distinct words of every chunk are looked up in the vocabulary, and the count
+    table holds one int64 per word. Pass the same vocabulary to count several books with
+    shared word IDs, so that their counts can be compared and merged as arrays. The result
+    is a mapping equal to count_words, including the order of first appearance.
+    """
+    from src.vocab import CountVector
+
+    counts = CountVector(vocabulary)
+    for line in lines:
+        counts.update(tokenizer.tokenize(line, min_length))
+    return counts
+
+
+def ngram_count_words(
+    lines: Iterable[str],
+    n: int = 2,
+    min_length: int = 1,
+    tokenizer: Tokenizer = DEFAULT_TOKENIZER,
+    vocabulary: Optional["Vocabulary"] = None,
+) -> "NgramCounter":
+    """
+    Count the n-grams of consecutive words in an iterable of strings, see NgramCounter.
+    The strings form one token stream, so n-grams span lines and chunks. Words shorter
+    than min_length are dropped from the stream before the n-grams are formed.
+    """
+    from src.ngrams import NgramCounter
+
+    counts = NgramCounter(n, vocabulary)
+    for line in lines:
+        counts.update(tokenizer.tokenize(line, min_length))
+    return counts
+
+
+BACKENDS: Dict[str, Callable[[Iterable[str], int, Tokenizer], Mapping[str, int]]] = {
+    "python": count_words,
+    "pandas": pandas_count_words,
+    "vocab": vocab_count_words,
+}
+
+
+def get_backend(name: str) -> Callable[[Iterable[str], int, Tokenizer], Mapping[str, int]]:
+    """
+    Return the counting function of a backend, given its name.
+    """
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown backend {name!r}, choose from {', '.join(BACKENDS)}")
+    return BACKENDS[name]
+
+
+def _count_range(task: Tuple[str, int, Optional[int], int, Tokenizer, str]) -> Mapping[str, int]:
+    """
+    Count words in one line-aligned byte range of a file; runs in a worker process.
+    """
+    filename, start, end, min_length, tokenizer, backend = task
+    chunks = iter_chunks(filename, start=start, end=end)
+    return get_backend(backend)(chunks, min_length, tokenizer)
+
+
+def parallel_count_words(
+    filename: str,
+    min_length: int = 1,
+    workers: int = 1,
+    tokenizer: Tokenizer = DEFAULT_TOKENIZER,
+    backend: str = "python",
+) -> Mapping[str, int]:
+    """
+    Count words in a file using several worker processes.
+    The file is split into line-aligned byte ranges that are counted independently. The
+    partial counts are merged in file order, so dictionary keys are in order of first
+    appearance and the result is identical to count_words over the whole file.
+    A compressed file is a single range, counted in this process.
+    """
+    ranges = split_line_ranges(filename, workers)
+    get_backend(backend)
+    tasks = [(filename, start, end, min_length, tokenizer, backend) for start, end in ranges]
+    if len(tasks) <= 1:
+        return _count_range(tasks[0]) if tasks else Counter()
+    counts: Counter[str] = Counter()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for partial in executor.map(_count_range, tasks):
+            counts.update(partial)
+    return counts
+
+
+def sketch_word_counts(
+    lines: Iterable[str],
+    min_length: int = 1,
+    capacity: int = SKETCH_CAPACITY,
+    width: int = SKETCH_WIDTH,
+    depth: int = SKETCH_DEPTH,
+    tokenizer: Tokenizer = DEFAULT_TOKENIZER,
+) -> Tuple["SpaceSaving", "CountMinSketch"]:
+    """
+    Summarise the word counts of an iterable of strings in fixed memory: a Space-Saving
+    summary of the `capacity` heaviest words and a Count-Min Sketch for point queries.
+    Each string is counted exactly first, so memory is bounded by the summaries plus the
+    vocabulary of one string, e.g. one chunk from iter_chunks.
+    """
+    from src.sketch import CountMinSketch, SpaceSaving
+
+    summary = SpaceSaving(capacity)
+    sketch = CountMinSketch(width, depth)
+    for line in lines:
+        counts = count_words([line], min_length, tokenizer)
+        summary.update_counts(counts)
+        sketch.update_counts(counts)
+    return summary, sketch
+
+
+def _sketch_range(
+    task: Tuple[str, int, Optional[int], int, int, int, int, Tokenizer],
+) -> Tuple["SpaceSaving", "CountMinSketch"]:
+    """
+    Summarise the words in one line-aligned byte range of a file; runs in a worker process.
+    """
+    filename, start, end, min_length, capacity, width, depth, tokenizer = task
+    chunks = iter_chunks(filename, start=start, end=end)
+    return sketch_word_counts(chunks, min_length, capacity, width, depth, tokenizer)
+
+
+def parallel_sketch_word_counts(
+    filename: str,
+    min_length: int = 1,
+    workers: int = 1,
+    capacity: int = SKETCH_CAPACITY,
+    width: int = SKETCH_WIDTH,
+    depth: int = SKETCH_DEPTH,
+    tokenizer: Tokenizer = DEFAULT_TOKENIZER,
+) -> Tuple["SpaceSaving", "CountMinSketch"]:
+    """
+    Summarise the word counts of a file using several worker processes.
+    Every worker summarises one line-aligned byte range and the summaries are merged in
+    file order.
+    """
+    from src.sketch import CountMinSketch, SpaceSaving
+
+    ranges = split_line_ranges(filename, max(workers, 1))
+    tasks = [
+        (filename, start, end, min_length, capacity, width, depth, tokenizer)
+        for start, end in ranges
+    ]
+    if len(tasks) == 1:
+        return _sketch_range(tasks[0])
+    summary, sketch = SpaceSaving(capacity), CountMinSketch(width, depth)
+    if not tasks:
+        return summary, sketch
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for partial_summary, partial_sketch in executor.map(_sketch_range, tasks):
+            summary.merge(partial_summary)
+            sketch.merge(partial_sketch)
+    return summary, sketch
+
+
+def sketch_to_dataframe(
+    summary: "SpaceSaving", sketch: "CountMinSketch", k: Optional[int] = None
+) -> "pd.DataFrame":
+    """
+    Return the heaviest words of a Space-Saving summary as a DataFrame with columns word
+    and count, in descending order of count. Both summaries overestimate, so every count is
+    the smaller of the two estimates.
+    """
+    import numpy as np
+    import pandas as pd
+
+    top = summary.top(summary.capacity if k is None else k)
+    words = [word for word, _, _ in top]
+    estimates = np.minimum([count for _, count, _ in top], sketch.query(words)).astype(np.int64)
+    order = sorted(range(len(words)), key=lambda i: (-estimates[i], words[i]))
+    return pd.DataFrame(
+        {
+            "word": pd.Series([words[i] for i in order], dtype=object),
+            "count": np.array([estimates[i] for i in order], dtype=np.int64),
+        }
+    )
+
+
+def sketch_error_bounds(summary: "SpaceSaving", sketch: "CountMinSketch") -> Dict[str, float]:
+    """
+    Return the error bounds guaranteed by the summaries of `total` counted words.
+    """
+    return {
+        "total": summary.total,
+        "space_saving_max_error": summary.max_error,
+        "count_min_epsilon": sketch.epsilon,
+        "count_min_delta": sketch.delta,
+        "count_min_max_error": sketch.epsilon * sketch.total,
+    }
+
+
+def approximate_word_count(
+    input_file: str,
+    output_file: str,
+    min_length: int = 1,
+    workers: int = 1,
+    capacity: int = SKETCH_CAPACITY,
+    width: int = SKETCH_WIDTH,
+    depth: int = SKETCH_DEPTH,
+    top_k: Optional[int] = None,
+) -> Dict[str, float]:
+    """
+    Estimate the frequencies of the heaviest words of a file in fixed memory and save them
+    in the same format as word_count. Returns the guaranteed error bounds.
+    """
+    summary, sketch = parallel_sketch_word_counts(
+        input_file, min_length, workers, capacity, width, depth
+    )
+    save_word_counts(output_file, sketch_to_dataframe(summary, sketch, top_k))
+    return sketch_error_bounds(summary, sketch)
+
+
+def counts_to_dataframe(counts: Mapping[str, int]) -> "pd.DataFrame":
+    """
+    Convert a word -> count mapping into a DataFrame of word counts in descending order.
+    Ties keep the mapping's order, which matches pd.Series.value_counts on the word list.
+    """
+    import pandas as pd
+
+    from src.vocab import CountVector
+
+    if isinstance(counts, CountVector):
+        return counts.to_dataframe()
+
+    series = pd.Series(list(counts.values()), index=pd.Index(list(counts.keys())), dtype="int64")
+    counts_df = series.sort_values(ascending=False, kind="stable").reset_index()
+    counts_df.columns = ["word", "count"]
+    return counts_df
+
+
+def top_k_dataframe(counts: Mapping[str, int], k: int) -> "pd.DataFrame":
+    """
+    Return only the k most frequent words of a word -> count mapping as a DataFrame.
+    The k-th largest count is found with a partial sort (np.partition) and only the selected
+    words are sorted, instead of the whole vocabulary. Ties are broken by the mapping's
+    order, so the result equals counts_to_dataframe(counts).head(k).
+    """
+    import numpy as np
+
+    values = np.fromiter(counts.values(), dtype=np.int64, count=len(counts))
+    if k >= len(values):
+        return counts_to_dataframe(counts)
+    if k <= 0:
+        return counts_to_dataframe({})
+    threshold = np.partition(values, len(values) - k)[len(values) - k]
+    above = np.flatnonzero(values > threshold)
+    tied = np.flatnonzero(values == threshold)[: k - len(above)]
+    selected = set(np.concatenate([above, tied]).tolist())
+    top = {word: count for i, (word, count) in enumerate(counts.items()) if i in selected}
+    return counts_to_dataframe(top)
+
+
+def calculate_word_counts(
+    lines: Iterable[str],
+    min_length: int = 1,
+    tokenizer: Tokenizer = DEFAULT_TOKENIZER,
+    backend: str = "python",
+) -> "pd.DataFrame":
+    """
+    Given an iterable of strings, parse each string and create a DataFrame of word counts.
+    DELIMITERS are removed before the string is parsed. The function is case-insensitive
+    and words in the dictionary are in lower-case. The counting backend is "python",
+    "pandas" or "vocab"; all give the same DataFrame.
+    """
+    return counts_to_dataframe(get_backend(backend)(lines, min_length, tokenizer))
+
+
+def word_count(
+    input_file: str,
+    output_file: str,
+    min_length: int = 1,
+    workers: int = 1,
+    backend: str = "python",
+    top_k: Optional[int] = None,
+    shard_file: Optional[str] = None,
+    profiler: Profiler = NULL_PROFILER,
+) -> None:
     """
     Load a file, calculate the frequencies of each word in the file and
     save in a new file the words, counts and percentages of the total in
     descending order. Only words whose length is >= min_length are included.
+    With workers > 1 the file is counted in parallel worker processes.
+    With top_k only the top_k most frequent words are saved.
+    With shard_file all counts are also saved as a shard sorted by word, see src.shards.
+    The input may be compressed, by extension, see src.dataset.COMPRESSED_SUFFIXES.
+    The profiler times the load, tokenize, count, sort and save stages.
+    """
+    if workers > 1:
+        with profiler.stage("count"):
+            counts = parallel_count_words(input_file, min_length, workers, backend=backend)
+    else:
+        sized = compression(input_file) is None
+        chunks = progress(iter_chunks(input_file), input_file, "count", sized)
+        chunks = profiler.iterate("load", chunks)
+        if profiler.enabled and backend == "python":
+            # Same as count_words, with tokenizing and counting timed separately
+            counts = Counter()
+            for chunk in chunks:
+                with profiler.stage("tokenize") as tokenize:
+                    words = DEFAULT_TOKENIZER.tokenize(chunk, min_length)
+                    tokenize.lines += chunk.count("\n")
+                    tokenize.tokens += len(words)
+                with profiler.stage("count"):
+                    counts.update(words)
+        else:
+            with profiler.stage("count"):
+                counts = get_backend(backend)(chunks, min_length, DEFAULT_TOKENIZER)
+    if profiler.enabled:
+        profiler.stats("load" if workers <= 1 else "count").bytes_read = os.path.getsize(
+            input_file
+        )
+        profiler.stats("count").tokens = sum(counts.values())
+    with profiler.stage("sort"):
+        df = top_k_dataframe(counts, top_k) if top_k else counts_to_dataframe(counts)
+    with profiler.stage("save") as save:
+        if shard_file:
+            write_shard(shard_file, counts)
+        save_word_counts(output_file, df)
+    if profiler.enabled:
+        save.bytes_written = os.path.getsize(output_file)
+
+
+def ngram_word_count(
+    input_file: str,
+    output_file: str,
+    n: int = 2,
+    min_length: int = 1,
+    top_k: Optional[int] = None,
+    profiler: Profiler = NULL_PROFILER,
+) -> None:
+    """
+    Count the n-grams of a file and save them in descending order in the format of
+    word_count, with the space-separated words of every n-gram in the 'word' column.
+    With top_k only the top_k most frequent n-grams are saved.
+    The profiler times the load, count and save stages.
+    """
+    sized = compression(input_file) is None
+    chunks = progress(iter_chunks(input_file), input_file, "count", sized)
+    chunks = profiler.iterate("load", chunks)
+    with profiler.stage("count") as count:
+        counts = ngram_count_words(chunks, n, min_length)
+        count.tokens = counts.total
+    with profiler.stage("save") as save:
+        save_word_counts(output_file, counts.to_dataframe(top_k))
+    if profiler.enabled:
+        profiler.stats("load").bytes_read = os.path.getsize(input_file)
+        save.bytes_written = os.path.getsize(output_file)
+
+
+def incremental_state_path(output_file: str) -> Path:
+    """
+    Return the path of the incremental counting state stored next to an output CSV file.
+    """
+    return Path(f"{output_file}.state.json")
+
+
+def _read_counts(filename: str) -> Dict[str, int]:
+    """
+    Read a saved word counts table back into a word -> count dictionary.
+    """
+    from src.formats import read_word_counts
+
+    df = read_word_counts(filename)
+    return dict(zip(df["word"], df["count"].tolist()))
+
+
+def _load_incremental_state(
+    input_file: str, state_file: Path, min_length: int
+) -> Tuple[int, Counter[str], "hashlib._Hash"]:
+    """
+    Load the offset and counts of a previous incremental run if they are still valid, with
+    the digest of the counted prefix of the input.
+    The state is discarded, meaning a full recount, if it is missing or unreadable, if the
+    counting parameters changed, or if the counted prefix of the input was truncated or
+    rewritten. The whole prefix is hashed to check this, which reads it without tokenising
+    it again.
     """
-    lines = load_text(input_file)
-    df = calculate_word_counts(lines, min_length)
+    if not state_file.is_file():
+        return 0, Counter(), hashlib.sha256()
+    try:
+        with open(state_file, encoding="utf-8") as f:
+            state = json.load(f)
+        offset = state["offset"]
+        valid = state["params"] == count_params(min_length) and offset <= os.path.getsize(
+            input_file
+        )
+        digest = prefix_digest(input_file, offset if valid else 0)
+        valid = valid and state["fingerprint"] == digest.hexdigest()
+    except (OSError, ValueError, KeyError) as e:
+        logger.warning(f"Ignoring unreadable state {state_file}: {e}")
+        return 0, Counter(), hashlib.sha256()
+    if not valid:
+        logger.warning(f"{input_file} was truncated or rewritten, counting it from the start")
+        return 0, Counter(), hashlib.sha256()
+    return offset, Counter(state["counts"]), digest
+
+
+def incremental_word_count(
+    input_file: str, output_file: str, min_length: int = 1, top_k: Optional[int] = None
+) -> int:
+    """
+    Count words in a growing, append-only file, tokenising only the bytes added since the
+    last run. The byte offset of the last complete line and the counts up to it are stored
+    next to the output CSV file and merged with the counts of the new bytes. A trailing
+    incomplete line is counted in the output but not in the stored state, since it may
+    still grow. The output is identical to word_count over the whole file. Returns the
+    number of bytes that were tokenised. A compressed file cannot be resumed at an offset
+    and raises a ValueError.
+    """
+    if compression(input_file):
+        raise ValueError(f"Cannot count compressed file {input_file} incrementally")
+    state_file = incremental_state_path(output_file)
+    offset, counts, digest = _load_incremental_state(input_file, state_file, min_length)
+    end = last_line_end(input_file, offset)
+    counts.update(count_words(iter_chunks(input_file, start=offset, end=end), min_length))
+
+    state = {
+        "offset": end,
+        "fingerprint": prefix_digest(input_file, end, offset, digest).hexdigest(),
+        "params": count_params(min_length),
+        "counts": counts,
+    }
+    tmp_file = state_file.with_name(f"{state_file.name}.tmp")
+    with open(tmp_file, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False)
+    os.replace(tmp_file, state_file)
+
+    tail = count_words(iter_chunks(input_file, start=end), min_length)
+    counts.update(tail)
+    df = top_k_dataframe(counts, top_k) if top_k else counts_to_dataframe(counts)
     save_word_counts(output_file, df)
+    return os.path.getsize(input_file) - offset
 
 
 @app.command()
@@ -56,12 +625,128 @@ def main(
     input_path: Path = PROCESSED_DATA_DIR / "book.txt",
     output_path: Path = ANALYZED_DIR / "word_counts.csv",
     min_length: int = 1,
+    workers: int = 1,
+    backend: str = typer.Option("python", help="Counting backend: python, pandas or vocab."),
+    use_cache: bool = typer.Option(True, "--cache/--no-cache"),
+    incremental: bool = typer.Option(
+        False, help="Only count the bytes appended since the last incremental run."
+    ),
+    top_k: Optional[int] = typer.Option(None, help="Only save the K most frequent words."),
+    approximate: bool = typer.Option(
+        False, help="Estimate the counts of the most frequent words in fixed memory."
+    ),
+    capacity: int = typer.Option(SKETCH_CAPACITY, help="Number of words kept by --approximate."),
+    sketch_width: int = typer.Option(SKETCH_WIDTH, help="Count-Min Sketch width."),
+    sketch_depth: int = typer.Option(SKETCH_DEPTH, help="Count-Min Sketch depth."),
+    shard_path: Optional[Path] = typer.Option(
+        None, help="Also save the counts as a shard sorted by word, for src/shards.py."
+    ),
+    ngram: int = typer.Option(
+        1, help="Count the n-grams of N consecutive words, in one process, instead of words."
+    ),
+    profile: Optional[Path] = typer.Option(None, help="Save a JSON profile of the stages."),
+    pstats: Optional[Path] = typer.Option(None, help="Save a cProfile dump (pstats)."),
 ):
     """
     Count word frequencies in a plain-text file and save the results as a CSV file.
+    The output format (.csv, .feather or .npz) is chosen by the extension of output_path.
     """
-    logger.info(f"Counting words in {input_path} (min_length={min_length})")
-    word_count(str(input_path), str(output_path), min_length)
+    if backend not in BACKENDS:
+        raise typer.BadParameter(f"choose from {', '.join(BACKENDS)}", param_hint="--backend")
+    if shard_path and (approximate or top_k):
+        raise typer.BadParameter(
+            "a shard needs the exact counts of every word", param_hint="--shard-path"
+        )
+    if ngram < 1:
+        raise typer.BadParameter("must be at least 1", param_hint="--ngram")
+    if ngram > 1 and (approximate or incremental or shard_path):
+        raise typer.BadParameter(
+            "n-grams are only counted exactly, without --approximate, --incremental or "
+            "--shard-path",
+            param_hint="--ngram",
+        )
+    if incremental and compression(str(input_path)):
+        raise typer.BadParameter(
+            "a compressed file cannot be resumed at an offset", param_hint="--incremental"
+        )
+    if ngram > 1:
+        logger.info(f"Counting {ngram}-grams in {input_path} (min_length={min_length})")
+    else:
+        logger.info(
+            f"Counting words in {input_path} "
+            f"(min_length={min_length}, workers={workers}, backend={backend})"
+        )
+    mode = "approximate" if approximate else "incremental" if incremental else "cache"
+    with profile_command("analysis", profile, pstats) as profiler, profiler.stage(mode):
+        if approximate:
+            params = count_params(min_length, top_k)
+            params["sketch"] = {"capacity": capacity, "width": sketch_width, "depth": sketch_depth}
+            bounds: Dict[str, float] = {}
+            cached_step(
+                "count",
+                str(input_path),
+                str(output_path),
+                params,
+                lambda: bounds.update(
+                    approximate_word_count(
+                        str(input_path),
+                        str(output_path),
+                        min_length,
+                        workers,
+                        capacity,
+                        sketch_width,
+                        sketch_depth,
+                        top_k,
+                    )
+                ),
+                use_cache,
+            )
+            if bounds:
+                logger.info(
+                    f"Approximate counts of {bounds['total']} words: each count overestimates "
+                    f"by at most {bounds['space_saving_max_error']:.1f}, and by at most "
+                    f"{bounds['count_min_max_error']:.1f} with probability "
+                    f"{1 - bounds['count_min_delta']:.4f}"
+                )
+        elif incremental:
+            counted = incremental_word_count(str(input_path), str(output_path), min_length, top_k)
+            logger.info(f"Tokenised {counted} new bytes")
+            if shard_path:
+                write_shard(str(shard_path), _read_counts(str(output_path)))
+        elif ngram > 1:
+            cached_step(
+                "count",
+                str(input_path),
+                str(output_path),
+                count_params(min_length, top_k, ngram),
+                lambda: ngram_word_count(
+                    str(input_path), str(output_path), ngram, min_length, top_k, profiler
+                ),
+                use_cache,
+            )
+        else:
+            shard_file = str(shard_path) if shard_path else None
+            hit = cached_step(
+                "count",
+                str(input_path),
+                str(output_path),
+                count_params(min_length, top_k),
+                lambda: word_count(
+                    str(input_path),
+                    str(output_path),
+                    min_length,
+                    workers,
+                    backend,
+                    top_k,
+                    shard_file,
+                    profiler,
+                ),
+                use_cache,
+            )
+            if hit and shard_file:
+                write_shard(shard_file, _read_counts(str(output_path)))
+    if shard_path:
+        logger.info(f"Shard saved to {shard_path}")
     logger.success(f"Word counts saved to {output_path}")
 
 
@@ -0,0 +1,222 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+import shutil
+from typing import Any, Callable, Dict, Optional
+
+from loguru import logger
+
+from src.config import CACHE_DIR, CACHE_MAX_BYTES
+
+# Bump to invalidate every cache entry when the cleaning or counting output changes
+CACHE_VERSION = 1
+HASH_BLOCK_SIZE = 1 << 20
+
+
+def file_digest(filename: str) -> str:
+    """
+    Compute the SHA-256 digest of a file's content, reading it block by block.
+
+    Args:
+        filename (str): Path to the file.
+
+    Returns:
+        str: Hexadecimal digest of the file content.
+    """
+    digest = hashlib.sha256()
+    with open(filename, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def prefix_digest(
+    filename: str, end: int, start: int = 0, digest: Optional["hashlib._Hash"] = None
+) -> "hashlib._Hash":
+    """
+    Hash the bytes of a file from `start` to `end`, block by block.
+
+    Every byte of the range is hashed, so any rewrite of it is detected. Passing the digest
+    of the bytes before `start` extends it, so a growing file is only read once.
+
+    Args:
+        filename (str): Path to the file.
+        end (int): Offset of the end of the range.
+        start (int): Offset of the start of the range.
+        digest (Optional[hashlib._Hash]): SHA-256 digest of the bytes before `start`, which
+            is updated in place, or None to start a new one.
+
+    Returns:
+        hashlib._Hash: SHA-256 digest of the first `end` bytes of the file.
+    """
+    digest = hashlib.sha256() if digest is None else digest
+    with open(filename, "rb") as f:
+        f.seek(start)
+        remaining = end - start
+        while remaining > 0:
+            block = f.read(min(HASH_BLOCK_SIZE, remaining))
+            if not block:
+                break
+            digest.update(block)
+            remaining -= len(block)
+    return digest
+
+
+def cache_key(stage: str, digest: str, params: Dict[str, Any]) -> str:
+    """
+    Build the cache key of a pipeline stage from its input digest and parameters.
+
+    Args:
+        stage (str): Name of the pipeline stage, e.g. "clean" or "count".
+        digest (str): Digest of the stage input file.
+        params (Dict[str, Any]): JSON-serialisable parameters that change the stage output.
+
+    Returns:
+        str: Hexadecimal cache key.
+    """
+    payload = json.dumps(
+        {"version": CACHE_VERSION, "stage": stage, "input": digest, "params": params},
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def cache_path(key: str, suffix: str, cache_dir: Path = CACHE_DIR) -> Path:
+    """
+    Return the path of the cache entry for a key.
+    """
+    return cache_dir / f"{key}{suffix}"
+
+
+def cache_get(key: str, suffix: str, cache_dir: Path = CACHE_DIR) -> Optional[Path]:
+    """
+    Look up a cache entry and mark it as recently used.
+
+    Args:
+        key (str): Cache key.
+        suffix (str): File suffix of the cached output.
+        cache_dir (Path): Cache directory.
+
+    Returns:
+        Optional[Path]: Path of the cached file, or None on a cache miss, including an entry
+            evicted by another worker while it was looked up.
+    """
+    path = cache_path(key, suffix, cache_dir)
+    if not path.is_file():
+        return None
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        # Evicted by another worker since the check
+        return None
+    return path
+
+
+def cache_put(
+    key: str,
+    filename: str,
+    suffix: str,
+    cache_dir: Path = CACHE_DIR,
+    max_bytes: int = CACHE_MAX_BYTES,
+) -> Path:
+    """
+    Store a copy of an output file in the cache and evict old entries if the cache is full.
+
+    The copy is written to a temporary file and renamed, so concurrent workers never see a
+    partially written entry.
+
+    Args:
+        key (str): Cache key.
+        filename (str): Path to the output file to store.
+        suffix (str): File suffix of the cached output.
+        cache_dir (Path): Cache directory.
+        max_bytes (int): Maximum total size of the cache in bytes.
+
+    Returns:
+        Path: Path of the cache entry.
+    """
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    path = cache_path(key, suffix, cache_dir)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    shutil.copyfile(filename, tmp_path)
+    os.replace(tmp_path, path)
+    evict(max_bytes, cache_dir)
+    return path
+
+
+def evict(max_bytes: int = CACHE_MAX_BYTES, cache_dir: Path = CACHE_DIR) -> int:
+    """
+    Remove least recently used cache entries until the cache fits in `max_bytes`.
+
+    Args:
+        max_bytes (int): Maximum total size of the cache in bytes.
+        cache_dir (Path): Cache directory.
+
+    Returns:
+        int: Number of removed entries.
+    """
+    entries = []
+    for path in cache_dir.glob("*"):
+        if path.is_file() and not path.name.endswith(".tmp"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                # Evicted by another worker since the listing
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+    total = sum(size for _, size, _ in entries)
+    removed = 0
+    for _, size, path in sorted(entries, key=lambda entry: entry[0]):
+        if total <= max_bytes:
+            break
+        path.unlink(missing_ok=True)
+        total -= size
+        removed += 1
+    return removed
+
+
+def cached_step(
+    stage: str,
+    input_file: str,
+    output_file: str,
+    params: Dict[str, Any],
+    compute: Callable[[], Any],
+    use_cache: bool = True,
+    cache_dir: Path = CACHE_DIR,
+) -> bool:
+    """
+    Run a pipeline stage unless its output for the same input content and parameters is cached.
+
+    On a cache hit the cached output is copied to `output_file` and `compute` is not called.
+    On a miss `compute` must write `output_file`, which is then stored in the cache.
+
+    Args:
+        stage (str): Name of the pipeline stage.
+        input_file (str): Path to the stage input file.
+        output_file (str): Path to the stage output file.
+        params (Dict[str, Any]): JSON-serialisable parameters that change the stage output.
+        compute (Callable[[], Any]): Function that runs the stage and writes `output_file`.
+        use_cache (bool): If False, always run the stage and leave the cache untouched.
+        cache_dir (Path): Cache directory.
+
+    Returns:
+        bool: True on a cache hit, False if the stage was run.
+    """
+    if not use_cache:
+        compute()
+        return False
+    suffix = Path(output_file).suffix
+    key = cache_key(stage, file_digest(input_file), params)
+    cached = cache_get(key, suffix, cache_dir)
+    if cached is not None:
+        try:
+            shutil.copyfile(cached, output_file)
+        except FileNotFoundError:
+            logger.info(f"Cache entry for {stage} of {input_file} was evicted, running it")
+        else:
+            logger.info(f"Cache hit for {stage} of {input_file}")
+            return True
+    compute()
+    cache_put(key, output_file, suffix, cache_dir)
+    return False
@@ -0,0 +1,382 @@
+from concurrent.futures import ProcessPoolExecutor
+import glob
+import os
+from pathlib import Path
+import time
+from typing import TYPE_CHECKING, List, Optional, Sequence, Tuple
+
+from loguru import logger
+import typer
+
+from src.config import ANALYZED_DIR, RESULT_DIR
+from src.vocab import Vocabulary
+
+# numpy, pandas and matplotlib are imported when an index is built or plotted
+if TYPE_CHECKING:
+    import numpy as np
+
+app = typer.Typer()
+
+# Bump when the layout of the saved index changes
+INDEX_VERSION = 1
+
+
+def _read_table(table: str) -> Tuple[List[str], "np.ndarray"]:
+    """
+    Read the words and counts of a count table.
+    """
+    from src.formats import read_word_counts
+
+    df = read_word_counts(table)
+    return df["word"].astype(str).tolist(), df["count"].to_numpy(dtype="int64")
+
+
+class CountIndex:
+    """
+    Word counts of many books over one shared vocabulary.
+
+    Every word gets an integer ID from one Vocabulary, its position in `words`. The
+    counts of book `b` are stored in compressed sparse rows: `ids[offsets[b]:offsets[b + 1]]`
+    are the IDs of its words in increasing order and `counts` the matching counts. Looking
+    up any set of words in every book is then a binary search per book, without reading the
+    tables again.
+    """
+
+    def __init__(
+        self,
+        books: List[str],
+        sources: List[str],
+        mtimes: "np.ndarray",
+        words: List[str],
+        offsets: "np.ndarray",
+        ids: "np.ndarray",
+        counts: "np.ndarray",
+    ):
+        import numpy as np
+
+        self.books = books
+        self.sources = sources
+        self.mtimes = mtimes
+        self.words = words
+        self.offsets = offsets
+        self.ids = ids
+        self.counts = counts
+        cumulative = np.concatenate(([0], np.cumsum(counts, dtype=np.int64)))
+        self.totals = cumulative[offsets[1:]] - cumulative[offsets[:-1]]
+
+    @classmethod
+    def build(cls, tables: Sequence[str], workers: int = 1) -> "CountIndex":
+        """
+        Build an index from count tables, read in parallel if workers > 1.
+
+        Args:
+            tables (Sequence[str]): Paths to CSV, Feather or .npz count tables.
+            workers (int): Number of worker processes reading the tables.
+
+        Returns:
+            CountIndex: Index of the tables, with the book names taken from the file names.
+        """
+        import numpy as np
+
+        tables = [str(table) for table in tables]
+        if workers > 1 and len(tables) > 1:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                rows = list(executor.map(_read_table, tables, chunksize=8))
+        else:
+            rows = [_read_table(table) for table in tables]
+        vocabulary = Vocabulary()
+        ids, counts, offsets = [], [], [0]
+        for words, book_counts in rows:
+            book_ids = vocabulary.add_all(words).astype(np.int32)
+            order = np.argsort(book_ids, kind="stable")
+            ids.append(book_ids[order])
+            counts.append(book_counts[order])
+            offsets.append(offsets[-1] + len(words))
+        return cls(
+            [Path(table).stem for table in tables],
+            tables,
+            np.array([os.stat(table).st_mtime_ns for table in tables], dtype=np.int64),
+            vocabulary.words,
+            np.array(offsets, dtype=np.int64),
+            np.concatenate(ids) if ids else np.empty(0, dtype=np.int32),
+            np.concatenate(counts) if counts else np.empty(0, dtype=np.int64),
+        )
+
+    def save(self, filename: str) -> None:
+        """
+        Save the index as an uncompressed .npz file.
+        """
+        import numpy as np
+
+        with open(filename, "wb") as f:
+            np.savez(
+                f,
+                version=np.array(INDEX_VERSION),
+                books=np.array(self.books, dtype=str),
+                sources=np.array(self.sources, dtype=str),
+                mtimes=self.mtimes,
+                words=np.frombuffer("\n".join(self.words).encode("utf-8"), dtype=np.uint8),
+                offsets=self.offsets,
+                ids=self.ids,
+                counts=self.counts,
+            )
+
+    @classmethod
+    def load(cls, filename: str) -> "CountIndex":
+        """
+        Load an index saved by `save`.
+        """
+        import numpy as np
+
+        with np.load(filename) as data:
+            if int(data["version"]) != INDEX_VERSION:
+                raise ValueError(f"{filename} is an index of another version")
+            words = data["words"].tobytes().decode("utf-8")
+            return cls(
+                data["books"].tolist(),
+                data["sources"].tolist(),
+                data["mtimes"],
+                words.split("\n") if len(data["ids"]) else [],
+                data["offsets"],
+                data["ids"],
+                data["counts"],
+            )
+
+    def is_current(self, tables: Sequence[str]) -> bool:
+        """
+        Return True if the index was built from these tables and none of them changed since.
+        """
+        tables = [str(table) for table in tables]
+        if tables != self.sources:
+            return False
+        try:
+            return all(os.stat(t).st_mtime_ns == m for t, m in zip(tables, self.mtimes.tolist()))
+        except FileNotFoundError:
+            return False
+
+    def book_counts(self, book: int) -> Tuple["np.ndarray", "np.ndarray"]:
+        """
+        Return the word IDs, in increasing order, and the counts of one book.
+        """
+        start, end = self.offsets[book], self.offsets[book + 1]
+        return self.ids[start:end], self.counts[start:end]
+
+    def top_words(self, k: int, book: Optional[int] = None) -> "np.ndarray":
+        """
+        Return the IDs of the k most frequent words of one book, or of all books together.
+        Ties are broken by word ID, i.e. by first appearance in the tables.
+        """
+        import numpy as np
+
+        if book is None:
+            ids = np.arange(len(self.words))
+            counts = np.bincount(self.ids, weights=self.counts, minlength=len(self.words))
+        else:
+            ids, counts = self.book_counts(book)
+        order = np.lexsort((ids, -counts))[:k]
+        return ids[order]
+
+    def matrix(self, word_ids: "np.ndarray") -> "np.ndarray":
+        """
+        Return the counts of the given words in every book, as a (books, words) array.
+        """
+        import numpy as np
+
+        word_ids = np.asarray(word_ids)
+        result = np.zeros((len(self.books), len(word_ids)), dtype=np.int64)
+        for book in range(len(self.books)):
+            ids, counts = self.book_counts(book)
+            positions = np.minimum(np.searchsorted(ids, word_ids), max(len(ids) - 1, 0))
+            if len(ids):
+                found = ids[positions] == word_ids
+                result[book, found] = counts[positions[found]]
+        return result
+
+
+def load_or_build_index(
+    tables: Sequence[str], index_file: Optional[str] = None, workers: int = 1
+) -> CountIndex:
+    """
+    Load the index saved in `index_file` if it is current for the tables, or build it and
+    save it there.
+
+    Args:
+        tables (Sequence[str]): Paths to the count tables.
+        index_file (Optional[str]): Path of the saved index, or None to always build it.
+        workers (int): Number of worker processes reading the tables.
+
+    Returns:
+        CountIndex: Index of the tables.
+    """
+    if index_file and os.path.exists(index_file):
+        try:
+            index = CountIndex.load(index_file)
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Rebuilding the index, {index_file} cannot be read: {e}")
+        else:
+            if index.is_current(tables):
+                logger.info(f"Loaded the index of {len(tables)} books from {index_file}")
+                return index
+            logger.info(f"Rebuilding the index, the tables changed since {index_file}")
+    index = CountIndex.build(tables, workers)
+    if index_file:
+        index.save(index_file)
+    return index
+
+
+def _panels(
+    index: CountIndex, limit: int, shared: bool, relative: bool
+) -> List[Tuple[str, List[str], List[float]]]:
+    """
+    Return the title, words and heights of the panel of every book.
+    """
+    import numpy as np
+
+    totals = np.maximum(index.totals, 1)[:, None]
+    if shared:
+        word_ids = index.top_words(limit)
+        values = index.matrix(word_ids)
+        values = values / totals if relative else values
+        labels = [index.words[i] for i in word_ids.tolist()]
+        return [(book, labels, values[b].tolist()) for b, book in enumerate(index.books)]
+    panels = []
+    for b, book in enumerate(index.books):
+        word_ids = index.top_words(limit, b)
+        values = index.matrix(word_ids)[b]
+        values = values / totals[b] if relative else values
+        panels.append((book, [index.words[i] for i in word_ids.tolist()], values.tolist()))
+    return panels
+
+
+def plot_comparison(
+    index: CountIndex,
+    output_file: str,
+    limit: int = 10,
+    shared: bool = True,
+    relative: bool = True,
+    rows: int = 3,
+    cols: int = 4,
+) -> List[str]:
+    """
+    Plot the top words of every book of an index as small multiples, rows x cols per page.
+
+    One Figure is drawn for all pages: the bars of every panel are created once and only
+    updated from page to page. A .pdf output gets all pages through a single PdfPages
+    writer; other formats are saved as one file per page, <name>-001.png, ...
+
+    Args:
+        index (CountIndex): Index of the books to compare.
+        output_file (str): Path to the output file; the extension selects the format.
+        limit (int): Number of words per panel.
+        shared (bool): Plot the top words of all books together in every panel, so the
+            panels are comparable, instead of the top words of each book.
+        relative (bool): Plot the frequencies relative to the total of each book.
+        rows (int): Number of rows of panels per page.
+        cols (int): Number of columns of panels per page.
+
+    Returns:
+        List[str]: Paths of the saved files.
+    """
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.backends.backend_pdf import PdfPages
+    from matplotlib.figure import Figure
+    from matplotlib.layout_engine import TightLayoutEngine
+
+    panels = _panels(index, limit, shared, relative)
+    per_page = rows * cols
+    figure = Figure(figsize=(3 * cols, 2.5 * rows))
+    FigureCanvasAgg(figure)
+    axes = figure.subplots(rows, cols, sharey=shared, squeeze=False).ravel().tolist()
+    bars = [ax.bar(range(limit), [0] * limit, width=0.8).patches for ax in axes]
+    figure.supylabel("Frequency" if relative else "Counts")
+    # The layout is computed once, for the longest word of any panel
+    longest = max((len(word) for _, words, _ in panels for word in words), default=0)
+    for ax in axes:
+        ax.set_title("w" * 20, fontsize=9)
+        ax.set_xticks(range(limit), ["w" * longest] * limit, rotation=45, ha="right", fontsize=7)
+    TightLayoutEngine().execute(figure)
+    ymax = max((max(values, default=0) for _, _, values in panels), default=0) * 1.05 or 1
+
+    path = Path(output_file)
+    pdf = PdfPages(output_file) if path.suffix.lower() == ".pdf" else None
+    saved: List[str] = []
+    try:
+        for page, start in enumerate(range(0, len(panels), per_page), start=1):
+            for ax, ax_bars, panel in zip(axes, bars, panels[start : start + per_page]):
+                title, words, values = panel
+                ax.set_visible(True)
+                ax.set_title(title, fontsize=9)
+                for i, bar in enumerate(ax_bars):
+                    bar.set_visible(i < len(values))
+                    bar.set_height(values[i] if i < len(values) else 0)
+                ax.set_xticks(range(len(words)), words, rotation=45, ha="right", fontsize=7)
+                ax.set_xlim(-0.5, limit - 0.5)
+                if not shared:
+                    ax.set_ylim(0, max(values, default=0) * 1.05 or 1)
+            for ax in axes[len(panels[start : start + per_page]) :]:
+                ax.set_visible(False)
+            if shared:
+                axes[0].set_ylim(0, ymax)
+            if pdf is not None:
+                pdf.savefig(figure)
+            else:
+                page_file = str(path.with_name(f"{path.stem}-{page:03d}{path.suffix}"))
+                figure.savefig(page_file)
+                saved.append(page_file)
+    finally:
+        if pdf is not None:
+            pdf.close()
+            saved.append(output_file)
+        figure.clear()
+    return saved
+
+
+@app.command()
+def main(
+    input_path: str = typer.Option(
+        str(ANALYZED_DIR), help="Directory of CSV count tables, or a glob pattern."
+    ),
+    output_path: Path = RESULT_DIR / "comparison.pdf",
+    index_path: Optional[Path] = typer.Option(
+        None, help="Save the index here and reuse it while the tables do not change."
+    ),
+    limit: int = 10,
+    shared: bool = typer.Option(
+        True, "--shared/--own", help="Plot the overall top words, or each book's own."
+    ),
+    relative: bool = typer.Option(True, "--relative/--absolute"),
+    rows: int = 3,
+    cols: int = 4,
+    workers: int = os.cpu_count() or 1,
+):
+    """
+    Compare the top words of many books as small multiples, in one multi-page PDF.
+    """
+    from src.corpus import CORPUS_COUNTS_FILE
+
+    pattern = os.path.join(input_path, "*.csv") if os.path.isdir(input_path) else input_path
+    tables = sorted(
+        p
+        for p in glob.glob(pattern, recursive=True)
+        if os.path.isfile(p) and Path(p).name != CORPUS_COUNTS_FILE
+    )
+    if not tables:
+        raise typer.BadParameter(f"no count tables match {input_path}", param_hint="input_path")
+    logger.info(f"Comparing {len(tables)} count tables from {input_path}")
+    start = time.perf_counter()
+    index = load_or_build_index(tables, str(index_path) if index_path else None, workers)
+    indexed = time.perf_counter()
+    logger.info(
+        f"Indexed {len(index.words)} words of {len(index.books)} books in {indexed - start:.2f} s"
+    )
+    saved = plot_comparison(index, str(output_path), limit, shared, relative, rows, cols)
+    elapsed = time.perf_counter() - indexed
+    logger.info(f"Rendered {len(index.books)} books in {elapsed:.2f} s")
+    if len(saved) == 1:
+        logger.success(f"Comparison saved to {saved[0]}")
+    else:
+        logger.success(f"Comparison saved to {len(saved)} pages, {saved[0]} to {saved[-1]}")
+
+
+if __name__ == "__main__":
+    app()
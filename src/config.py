@@ -1,14 +1,15 @@
+import os
 from pathlib import Path
 
-from dotenv import load_dotenv
-from loguru import logger
+# Load environment variables from .env file if it exists. python-dotenv is only imported
+# when there is one, as it adds noticeably to the startup time of every command.
+if any((directory / ".env").is_file() for directory in Path(__file__).resolve().parents):
+    from dotenv import load_dotenv
 
-# Load environment variables from .env file if it exists
-load_dotenv()
+    load_dotenv()
 
 # Paths
 PROJ_ROOT = Path(__file__).resolve().parents[1]
-logger.info(f"PROJ_ROOT path is: {PROJ_ROOT}")
 
 DATA_DIR = PROJ_ROOT / "data"
 RAW_DATA_DIR = DATA_DIR / "raw"
@@ -16,4 +17,7 @@ PROCESSED_DATA_DIR = DATA_DIR / "processed"
 
 ANALYZED_DIR = DATA_DIR / "analyzed"
 
+CACHE_DIR = DATA_DIR / "cache"
+CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", 1 << 30))
+
 RESULT_DIR = PROJ_ROOT / "results"
@@ -0,0 +1,242 @@
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import glob
+import os
+from pathlib import Path
+import time
+from typing import Dict, List, Tuple
+
+from loguru import logger
+import typer
+
+from src.analysis import count_params, counts_to_dataframe, save_word_counts, word_count
+from src.cache import cached_step
+from src.config import ANALYZED_DIR, PROCESSED_DATA_DIR, RAW_DATA_DIR
+from src.dataset import COMPRESSED_SUFFIXES, GUTENBERG_TEXT, clean_text, compression
+
+app = typer.Typer()
+
+CORPUS_COUNTS_FILE = "corpus_word_counts.csv"
+
+
+def find_books(pattern: str) -> List[Path]:
+    """
+    Find the books to process, given a directory or a glob pattern.
+
+    Args:
+        pattern (str): A directory, whose `*.txt` files, plain or compressed, are used, or a
+            glob pattern.
+
+    Returns:
+        List[Path]: Sorted list of matching files.
+    """
+    if os.path.isdir(pattern):
+        suffixes = ("",) + COMPRESSED_SUFFIXES
+        paths = [
+            p for suffix in suffixes for p in glob.glob(os.path.join(pattern, f"*.txt{suffix}"))
+        ]
+    else:
+        paths = glob.glob(pattern, recursive=True)
+    return sorted(Path(p) for p in paths if os.path.isfile(p))
+
+
+def relative_paths(books: List[Path]) -> List[Path]:
+    """
+    Return the paths of books relative to their common directory.
+    """
+    if not books:
+        return []
+    root = Path(os.path.commonpath([os.path.abspath(book.parent) for book in books]))
+    return [Path(os.path.abspath(book)).relative_to(root) for book in books]
+
+
+def output_paths(
+    books: List[Path], processed_dir: Path, analyzed_dir: Path
+) -> List[Tuple[Path, Path]]:
+    """
+    Return the paths of the cleaned book and of the word counts of every book.
+
+    The outputs mirror the paths of the books relative to their common directory, so books
+    of the same name in different subdirectories do not overwrite each other. A cleaned
+    book keeps the compression of the raw book; its counts are saved as <name>.csv. Raises
+    ValueError if two books would have the same outputs, e.g. book.txt and book.txt.gz.
+
+    Args:
+        books (List[Path]): Raw books to process.
+        processed_dir (Path): Directory for the cleaned books.
+        analyzed_dir (Path): Directory for the per-book word counts.
+
+    Returns:
+        List[Tuple[Path, Path]]: Cleaned book and word counts path of every book.
+    """
+    paths = []
+    for book, relative in zip(books, relative_paths(books)):
+        name = Path(relative.stem) if compression(str(book)) else relative
+        counts = analyzed_dir / relative.parent / f"{name.stem}.csv"
+        paths.append((processed_dir / relative, counts))
+    seen: Dict[Path, Path] = {}
+    for book, (_, counts) in zip(books, paths):
+        if counts in seen:
+            raise ValueError(f"{seen[counts]} and {book} would both be counted into {counts}")
+        seen[counts] = book
+    return paths
+
+
+def process_book(
+    raw_file: str,
+    processed_file: str,
+    counts_file: str,
+    min_length: int = 1,
+    use_cache: bool = True,
+) -> Counter[str]:
+    """
+    Clean one raw Project Gutenberg book, count its words and save the counts as CSV.
+
+    Both steps are skipped when their output for the same input content is cached. If a step
+    fails, both outputs are removed, so a failed book never leaves a truncated file behind.
+
+    Args:
+        raw_file (str): Path to the raw book.
+        processed_file (str): Path to the cleaned book written by this function.
+        counts_file (str): Path to the word counts CSV written by this function.
+        min_length (int): Minimum length of the counted words.
+        use_cache (bool): Whether to reuse and store cached outputs.
+
+    Returns:
+        Counter[str]: Word counts of the book, in the order of the saved CSV file.
+    """
+    try:
+        cached_step(
+            "clean",
+            raw_file,
+            processed_file,
+            {"marker": GUTENBERG_TEXT},
+            lambda: clean_text(raw_file, processed_file),
+            use_cache,
+        )
+        cached_step(
+            "count",
+            processed_file,
+            counts_file,
+            count_params(min_length),
+            lambda: word_count(processed_file, counts_file, min_length),
+            use_cache,
+        )
+    except BaseException:
+        for output_file in (processed_file, counts_file):
+            Path(output_file).unlink(missing_ok=True)
+        raise
+    from src.formats import read_word_counts
+
+    # Read the counts back so that cached and fresh runs combine in the same order
+    df = read_word_counts(counts_file)
+    return Counter(dict(zip(df["word"], df["count"].tolist())))
+
+
+def _process_task(task: Tuple[str, str, str, int, bool]) -> Counter[str]:
+    """
+    Unpack a task tuple and run process_book; runs in a worker process.
+    """
+    return process_book(*task)
+
+
+def run_corpus(
+    books: List[Path],
+    processed_dir: Path,
+    analyzed_dir: Path,
+    min_length: int = 1,
+    workers: int = 1,
+    use_cache: bool = True,
+) -> Tuple[Counter[str], List[Path]]:
+    """
+    Clean and count every book, in a pool of worker processes when workers > 1.
+
+    The outputs of every book are named by `output_paths`. Books that fail are logged and
+    skipped without aborting the batch. The per-book counts
+    are merged in the order of `books`, so the combined counts do not depend on which
+    worker finishes first.
+
+    Args:
+        books (List[Path]): Raw books to process.
+        processed_dir (Path): Directory for the cleaned books.
+        analyzed_dir (Path): Directory for the per-book word counts.
+        min_length (int): Minimum length of the counted words.
+        workers (int): Number of worker processes.
+        use_cache (bool): Whether to reuse and store cached outputs.
+
+    Returns:
+        Tuple[Counter[str], List[Path]]: Corpus-wide word counts and the books that failed.
+    """
+    from tqdm import tqdm
+
+    tasks = {}
+    for book, (processed_file, counts_file) in zip(
+        books, output_paths(books, processed_dir, analyzed_dir)
+    ):
+        processed_file.parent.mkdir(parents=True, exist_ok=True)
+        counts_file.parent.mkdir(parents=True, exist_ok=True)
+        tasks[book] = (str(book), str(processed_file), str(counts_file), min_length, use_cache)
+    results: Dict[Path, Counter[str]] = {}
+    failed: List[Path] = []
+
+    if workers <= 1:
+        for book, task in tqdm(tasks.items(), total=len(tasks), unit="book"):
+            try:
+                results[book] = _process_task(task)
+            except Exception as e:
+                logger.warning(f"Skipping {book}: {e}")
+                failed.append(book)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(_process_task, task): book for book, task in tasks.items()}
+            for future in tqdm(as_completed(futures), total=len(futures), unit="book"):
+                book = futures[future]
+                try:
+                    results[book] = future.result()
+                except Exception as e:
+                    logger.warning(f"Skipping {book}: {e}")
+                    failed.append(book)
+
+    combined: Counter[str] = Counter()
+    for book in books:
+        if book in results:
+            combined.update(results[book])
+    return combined, sorted(failed)
+
+
+@app.command()
+def main(
+    input_path: str = str(RAW_DATA_DIR),
+    processed_dir: Path = PROCESSED_DATA_DIR,
+    analyzed_dir: Path = ANALYZED_DIR,
+    min_length: int = 1,
+    workers: int = os.cpu_count() or 1,
+    use_cache: bool = typer.Option(True, "--cache/--no-cache"),
+):
+    """
+    Clean and count every book in a directory or glob, saving per-book and corpus-wide counts.
+    """
+    books = find_books(input_path)
+    try:
+        output_paths(books, processed_dir, analyzed_dir)
+    except ValueError as e:
+        raise typer.BadParameter(str(e), param_hint="input_path")
+    analyzed_dir.mkdir(parents=True, exist_ok=True)
+    logger.info(f"Processing {len(books)} books from {input_path} with {workers} workers")
+    start = time.perf_counter()
+    combined, failed = run_corpus(
+        books, processed_dir, analyzed_dir, min_length, workers, use_cache
+    )
+    elapsed = time.perf_counter() - start
+    output_path = analyzed_dir / CORPUS_COUNTS_FILE
+    save_word_counts(str(output_path), counts_to_dataframe(combined))
+    done = len(books) - len(failed)
+    books_per_second = done / max(elapsed, 1e-9)
+    logger.info(f"Processed {done} books in {elapsed:.2f} s ({books_per_second:.1f} books/s)")
+    if failed:
+        logger.warning(f"{len(failed)} books failed: {', '.join(str(book) for book in failed)}")
+    logger.success(f"Corpus word counts saved to {output_path}")
+
+
+if __name__ == "__main__":
+    app()
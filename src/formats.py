@@ -0,0 +1,137 @@
+from pathlib import Path
+import struct
+from typing import Optional
+import zipfile
+
+import numpy as np
+import pandas as pd
+
+# Word counts are stored as CSV, Feather (requires pyarrow) or NumPy .npz, by file extension.
+# Any other extension, or none, is CSV, like the output of the original count script.
+# The .npz layout is columnar: "words" holds the UTF-8 encoded words joined by newlines,
+# "offsets" the end byte of every word in "words", and "counts" the int64 counts.
+FORMATS = (".csv", ".feather", ".npz")
+
+_ZIP_LOCAL_HEADER = struct.Struct("<4s5H3L2H")
+
+
+def _suffix(filename: str) -> str:
+    """
+    Return the format of a word counts file, its lower-case suffix if it is one of FORMATS
+    and ".csv" otherwise.
+    """
+    suffix = Path(filename).suffix.lower()
+    return suffix if suffix in FORMATS else ".csv"
+
+
+def _require_pyarrow():
+    """
+    Import pyarrow.feather, which is only needed for the Feather format.
+    """
+    try:
+        import pyarrow.feather as feather
+    except ImportError as e:
+        raise ImportError("The Feather format requires pyarrow: pip install pyarrow") from e
+    return feather
+
+
+def _save_npz(filename: str, df: pd.DataFrame) -> None:
+    """
+    Save word counts in the columnar .npz layout, uncompressed so it can be memory-mapped.
+    """
+    words = np.frombuffer("\n".join(df["word"].tolist()).encode("utf-8"), dtype=np.uint8)
+    # Words never contain whitespace, so every newline ends a word
+    offsets = np.append(np.flatnonzero(words == ord("\n")), len(words)).astype(np.int64)
+    if len(df) == 0:
+        offsets = offsets[:0]
+    counts = df["count"].to_numpy(dtype=np.int64)
+    with open(filename, "wb") as f:
+        np.savez(f, words=words, offsets=offsets, counts=counts)
+
+
+def _memmap_npz_member(filename: str, name: str) -> np.ndarray:
+    """
+    Memory-map one uncompressed array of an .npz file without reading it.
+    Compressed members are read into memory instead.
+    """
+    with zipfile.ZipFile(filename) as zf:
+        info = zf.getinfo(f"{name}.npy")
+        if info.compress_type != zipfile.ZIP_STORED:
+            with zf.open(info) as f:
+                return np.lib.format.read_array(f)
+    with open(filename, "rb") as f:
+        f.seek(info.header_offset)
+        header = _ZIP_LOCAL_HEADER.unpack(f.read(_ZIP_LOCAL_HEADER.size))
+        name_length, extra_length = header[-2:]
+        f.seek(name_length + extra_length, 1)
+        version = np.lib.format.read_magic(f)
+        if version == (1, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+        else:
+            shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+        offset = f.tell()
+    if shape == (0,):
+        return np.empty(shape, dtype=dtype)
+    order = "F" if fortran_order else "C"
+    return np.memmap(filename, dtype=dtype, mode="r", offset=offset, shape=shape, order=order)
+
+
+def _load_npz(filename: str, limit: Optional[int] = None) -> pd.DataFrame:
+    """
+    Load word counts saved in the columnar .npz layout, memory-mapping the arrays so that
+    only the first `limit` rows are read when a limit is given.
+    """
+    counts = _memmap_npz_member(filename, "counts")
+    offsets = _memmap_npz_member(filename, "offsets")
+    words = _memmap_npz_member(filename, "words")
+    n = len(counts) if limit is None else min(max(limit, 0), len(counts))
+    if n == 0:
+        return pd.DataFrame({"word": pd.Series([], dtype=object), "count": np.array([], np.int64)})
+    text = words[: offsets[n - 1]].tobytes().decode("utf-8")
+    return pd.DataFrame({"word": text.split("\n"), "count": np.array(counts[:n], dtype=np.int64)})
+
+
+def write_word_counts(filename: str, df: pd.DataFrame) -> None:
+    """
+    Save a DataFrame of word counts in the format given by the file extension.
+
+    Args:
+        filename (str): Path to the output file, ending with .feather or .npz for those
+            formats and saved as CSV otherwise.
+        df (pd.DataFrame): DataFrame with columns 'word' and 'count'.
+    """
+    suffix = _suffix(filename)
+    if suffix == ".npz":
+        _save_npz(filename, df)
+    elif suffix == ".feather":
+        _require_pyarrow()
+        df.reset_index(drop=True).to_feather(filename)
+    else:
+        df.to_csv(filename, index=False)
+
+
+def read_word_counts(filename: str, limit: Optional[int] = None) -> pd.DataFrame:
+    """
+    Load a DataFrame of word counts in the format given by the file extension.
+
+    Binary formats are memory-mapped, so reading only the top `limit` rows does not read
+    the whole vocabulary.
+
+    Args:
+        filename (str): Path to the input file, ending with .feather or .npz for those
+            formats and read as CSV otherwise.
+        limit (Optional[int]): Number of rows to read from the top, or None for all rows.
+
+    Returns:
+        pd.DataFrame: DataFrame with columns 'word' and 'count'.
+    """
+    suffix = _suffix(filename)
+    if suffix == ".npz":
+        return _load_npz(filename, limit)
+    if suffix == ".feather":
+        feather = _require_pyarrow()
+        table = feather.read_table(filename, memory_map=True)
+        if limit is not None:
+            table = table.slice(0, max(limit, 0))
+        return table.to_pandas()
+    return pd.read_csv(filename, nrows=limit, keep_default_na=False)
@@ -0,0 +1,650 @@
+from array import array
+import bisect
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+import os
+from pathlib import Path
+import time
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from loguru import logger
+import typer
+
+from src.config import ANALYZED_DIR, PROCESSED_DATA_DIR
+from src.dataset import compression, iter_chunks
+from src.vocab import Vocabulary
+
+# numpy and the tokenizers are imported when an index is built or queried
+if TYPE_CHECKING:
+    import numpy as np
+
+app = typer.Typer()
+
+# Bump when the layout of the saved index changes
+INDEX_VERSION = 1
+INDEX_FILE = ANALYZED_DIR / "word_index.npz"
+
+# Byte offsets of the lines of every posting: the start and end of its offsets in an array
+LineSlices = Tuple["np.ndarray", "np.ndarray", "np.ndarray"]
+# Word IDs, book IDs and counts of some postings, and optionally their line offsets
+Part = Tuple["np.ndarray", "np.ndarray", "np.ndarray", Optional[LineSlices]]
+
+
+def book_names(sources: Sequence[str]) -> List[str]:
+    """
+    Return the name of every book: its path relative to the common directory of the books,
+    without the .txt and compression suffixes, e.g. a/book for a/book.txt.gz. Raises
+    ValueError if two books have the same name, e.g. book.txt and book.txt.gz.
+    """
+    from src.corpus import relative_paths
+
+    names: Dict[str, str] = {}
+    for source, relative in zip(sources, relative_paths([Path(s) for s in sources])):
+        path = relative.with_suffix("") if compression(source) else relative
+        name = path.with_suffix("").as_posix()
+        if name in names:
+            raise ValueError(f"{names[name]} and {source} are both named {name}")
+        names[name] = source
+    return list(names)
+
+
+class SortedWords:
+    """
+    Sorted words stored as one UTF-8 buffer of newline-terminated words, with the offset of
+    every word in it. A word is only decoded when it is looked up, so the buffer can stay
+    memory-mapped, and `find` is a binary search.
+    """
+
+    def __init__(self, data: "np.ndarray", starts: "np.ndarray"):
+        self.data = data
+        self.starts = starts
+
+    @classmethod
+    def from_list(cls, words: List[str]) -> "SortedWords":
+        import numpy as np
+
+        data = np.frombuffer("".join(f"{word}\n" for word in words).encode("utf-8"), np.uint8)
+        starts = np.concatenate(([0], np.flatnonzero(data == ord("\n")) + 1)).astype(np.int64)
+        return cls(data, starts)
+
+    def __len__(self) -> int:
+        return len(self.starts) - 1
+
+    def __getitem__(self, i: int) -> str:
+        return self.data[self.starts[i] : self.starts[i + 1] - 1].tobytes().decode("utf-8")
+
+    def find(self, word: str) -> Optional[int]:
+        """
+        Return the position of a word, or None if it is not one of the words.
+        """
+        i = bisect.bisect_left(self, word)
+        return i if i < len(self) and self[i] == word else None
+
+    def tolist(self) -> List[str]:
+        return self.data.tobytes().decode("utf-8").split("\n")[:-1]
+
+
+def _count_book(
+    task: Tuple[str, int, bool],
+) -> Tuple[List[str], "np.ndarray", Optional[LineSlices]]:
+    """
+    Count the words of one book and, if asked, collect the byte offset of every line that
+    contains each word; runs in a worker process.
+    """
+    import numpy as np
+
+    from src.analysis import DEFAULT_TOKENIZER
+
+    filename, min_length, with_lines = task
+    counts: Counter[str] = Counter()
+    lines: Dict[str, array] = {}
+    offset = 0
+    for chunk in iter_chunks(filename):
+        if not with_lines:
+            counts.update(DEFAULT_TOKENIZER.tokenize(chunk, min_length))
+            continue
+        chunk_lines = chunk.split("\n")
+        if chunk.endswith("\n"):
+            chunk_lines.pop()
+        for line in chunk_lines:
+            words = DEFAULT_TOKENIZER.tokenize(line, min_length)
+            counts.update(words)
+            for word in dict.fromkeys(words):
+                lines.setdefault(word, array("q")).append(offset)
+            offset += len(line.encode("utf-8")) + 1
+    words = list(counts)
+    n = len(words)
+    positions = None
+    if with_lines:
+        flat = array("q")
+        for word in words:
+            flat.extend(lines[word])
+        sizes = np.fromiter((len(lines[word]) for word in words), dtype=np.int64, count=n)
+        bounds = np.concatenate(([0], np.cumsum(sizes))).astype(np.int64)
+        positions = (bounds[:-1], bounds[1:], np.array(flat, dtype=np.int64))
+    return words, np.fromiter(counts.values(), dtype=np.int64, count=n), positions
+
+
+def _count_books(
+    tasks: List[Tuple[str, int, bool]], workers: int
+) -> Iterator[Tuple[List[str], "np.ndarray", Optional[LineSlices]]]:
+    """
+    Count the books of tasks in order, in parallel if workers > 1.
+    """
+    if workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            yield from executor.map(_count_book, tasks)
+    else:
+        yield from map(_count_book, tasks)
+
+
+def _gather(
+    starts: "np.ndarray", ends: "np.ndarray", values: "np.ndarray"
+) -> Tuple["np.ndarray", "np.ndarray"]:
+    """
+    Concatenate the slices values[starts[i]:ends[i]] in order, returning the bounds of every
+    slice in the result and the result.
+    """
+    import numpy as np
+
+    lengths = ends - starts
+    bounds = np.concatenate(([0], np.cumsum(lengths))).astype(np.int64)
+    index = np.arange(bounds[-1]) + np.repeat(starts - bounds[:-1], lengths)
+    return bounds, values[index]
+
+
+class WordIndex:
+    """
+    Inverted index of the words of many books: for every word, the books it appears in, with
+    its count in each and optionally the byte offsets of the lines it appears on.
+
+    The words are sorted, and the postings of word `w` are `postings[offsets[w]:offsets[w + 1]]`
+    (book IDs) and the matching `counts`, in descending order of count. Line offsets, when
+    indexed, are laid out the same way once more: the offsets of posting `p` are
+    `lines[line_starts[p]:line_starts[p + 1]]`. A loaded index memory-maps all of these
+    arrays, so a lookup is a binary search over the words plus a slice of the postings, and
+    only touches the pages it reads. The size and modification time of every book are kept,
+    so `update` recounts only new and changed books.
+    """
+
+    def __init__(
+        self,
+        books: List[str],
+        sources: List[str],
+        sizes: "np.ndarray",
+        mtimes: "np.ndarray",
+        totals: "np.ndarray",
+        min_length: int,
+        words: SortedWords,
+        offsets: "np.ndarray",
+        postings: "np.ndarray",
+        counts: "np.ndarray",
+        line_starts: Optional["np.ndarray"] = None,
+        lines: Optional["np.ndarray"] = None,
+    ):
+        self.books = books
+        self.sources = sources
+        self.sizes = sizes
+        self.mtimes = mtimes
+        self.totals = totals
+        self.min_length = min_length
+        self.words = words
+        self.offsets = offsets
+        self.postings = postings
+        self.counts = counts
+        self.line_starts = line_starts
+        self.lines = lines
+        self._book_ids = {book: b for b, book in enumerate(books)}
+
+    @property
+    def has_lines(self) -> bool:
+        return self.lines is not None
+
+    @classmethod
+    def empty(cls, min_length: int = 1, lines: bool = False) -> "WordIndex":
+        """
+        Return an index of no books, which counts words of at least `min_length` characters
+        and indexes their lines if `lines` is True.
+        """
+        import numpy as np
+
+        int64 = np.empty(0, dtype=np.int64)
+        return cls(
+            [],
+            [],
+            int64,
+            int64,
+            int64,
+            min_length,
+            SortedWords.from_list([]),
+            np.zeros(1, dtype=np.int64),
+            np.empty(0, dtype=np.int32),
+            int64,
+            np.zeros(1, dtype=np.int64) if lines else None,
+            int64 if lines else None,
+        )
+
+    @classmethod
+    def build(
+        cls, sources: Sequence[str], min_length: int = 1, lines: bool = False, workers: int = 1
+    ) -> "WordIndex":
+        """
+        Build the index of the processed books.
+
+        Args:
+            sources (Sequence[str]): Paths to the processed books, plain or compressed.
+            min_length (int): Minimum length of the indexed words.
+            lines (bool): Also index the byte offsets of the lines every word appears on.
+            workers (int): Number of worker processes counting the books.
+
+        Returns:
+            WordIndex: Index of the books, named by their paths as in `book_names`.
+        """
+        return cls.empty(min_length, lines).update(sources, workers)
+
+    def stale(self, sources: Sequence[str]) -> List[str]:
+        """
+        Return the books of `sources` that are not in the index, or changed since.
+        """
+        indexed = {
+            source: (size, mtime)
+            for source, size, mtime in zip(self.sources, self.sizes.tolist(), self.mtimes.tolist())
+        }
+        result = []
+        for source in map(str, sources):
+            stat = os.stat(source)
+            if indexed.get(source) != (stat.st_size, stat.st_mtime_ns):
+                result.append(source)
+        return result
+
+    def update(self, sources: Sequence[str], workers: int = 1) -> "WordIndex":
+        """
+        Return the index of `sources`, counting only the books that are new or changed since
+        this index was built. The postings of the other books are carried over as arrays, and
+        books that are no longer in `sources` are dropped.
+
+        Args:
+            sources (Sequence[str]): Paths to the processed books, in the order of their IDs.
+                Books are named by `book_names`, which must give every book its own name.
+            workers (int): Number of worker processes counting the books.
+
+        Returns:
+            WordIndex: Updated index; this index is left unchanged.
+        """
+        import numpy as np
+
+        sources = [str(source) for source in sources]
+        names = book_names(sources)
+        book_ids = {source: b for b, source in enumerate(sources)}
+        stale = self.stale(sources)
+        recounted = set(stale)
+        tasks = [(source, self.min_length, self.has_lines) for source in stale]
+        # Words are interned as the books are counted; IDs are sorted with the words at the end
+        vocabulary = Vocabulary()
+        parts: List[Part] = []
+        for source, (words, counts, positions) in zip(stale, _count_books(tasks, workers)):
+            book = np.full(len(words), book_ids[source])
+            parts.append((vocabulary.add_all(words), book, counts, positions))
+
+        # Carry over the postings of the unchanged books, renumbered
+        renumber = np.full(len(self.sources), -1, dtype=np.int64)
+        for b, source in enumerate(self.sources):
+            if source in book_ids and source not in recounted:
+                renumber[b] = book_ids[source]
+        kept = np.flatnonzero(renumber[self.postings] >= 0)
+        if len(kept):
+            word_idx = np.repeat(np.arange(len(self.words)), np.diff(self.offsets))[kept]
+            used, word_idx = np.unique(word_idx, return_inverse=True)
+            words = self.words.tolist()
+            ids = vocabulary.add_all([words[i] for i in used.tolist()])[word_idx]
+            positions = None
+            if self.has_lines:
+                starts = np.asarray(self.line_starts)
+                positions = (starts[kept], starts[kept + 1], np.asarray(self.lines))
+            books = renumber[self.postings[kept]]
+            parts.append((ids, books, np.asarray(self.counts[kept]), positions))
+
+        stats = [os.stat(source) for source in sources]
+        return self._merge(
+            parts,
+            vocabulary,
+            names,
+            sources,
+            np.array([stat.st_size for stat in stats], dtype=np.int64),
+            np.array([stat.st_mtime_ns for stat in stats], dtype=np.int64),
+        )
+
+    def _merge(
+        self,
+        parts: List[Part],
+        vocabulary: Vocabulary,
+        names: List[str],
+        sources: List[str],
+        sizes: "np.ndarray",
+        mtimes: "np.ndarray",
+    ) -> "WordIndex":
+        """
+        Return an index with the settings of this one, of the postings of all parts, for
+        the books `names` read from `sources`.
+        """
+        import numpy as np
+
+        words = vocabulary.words
+        by_word = sorted(range(len(words)), key=words.__getitem__)
+        rank = np.empty(len(words), dtype=np.int64)
+        rank[by_word] = np.arange(len(words))
+        word_ids, books, counts = [], [], []
+        starts, ends, values = [], [], []
+        base = 0
+        for ids, part_books, part_counts, positions in parts:
+            word_ids.append(rank[ids])
+            books.append(part_books)
+            counts.append(part_counts)
+            if positions is not None:
+                part_starts, part_ends, part_values = positions
+                starts.append(part_starts + base)
+                ends.append(part_ends + base)
+                values.append(part_values)
+                base += len(part_values)
+        empty = np.empty(0, dtype=np.int64)
+        word_ids_all = np.concatenate(word_ids) if word_ids else empty
+        books_all = np.concatenate(books).astype(np.int64) if books else empty
+        counts_all = np.concatenate(counts) if counts else empty
+        order = np.lexsort((books_all, -counts_all, word_ids_all))
+        frequencies = np.bincount(word_ids_all, minlength=len(words))
+        offsets = np.concatenate(([0], np.cumsum(frequencies))).astype(np.int64)
+        postings = books_all[order].astype(np.int32)
+        counts_all = counts_all[order]
+        line_starts = lines = None
+        if self.has_lines:
+            line_starts, lines = _gather(
+                np.concatenate(starts)[order] if starts else empty,
+                np.concatenate(ends)[order] if ends else empty,
+                np.concatenate(values) if values else empty,
+            )
+        totals = np.bincount(postings, weights=counts_all, minlength=len(sources))
+        return WordIndex(
+            names,
+            sources,
+            sizes,
+            mtimes,
+            totals.astype(np.int64),
+            self.min_length,
+            SortedWords.from_list([words[i] for i in by_word]),
+            offsets,
+            postings,
+            counts_all,
+            line_starts,
+            lines,
+        )
+
+    def save(self, filename: str) -> None:
+        """
+        Save the index as an uncompressed .npz file, which `load` memory-maps. The file is
+        replaced atomically, so readers see either the old or the new index.
+        """
+        import numpy as np
+
+        arrays = {
+            "version": np.array(INDEX_VERSION),
+            "books": np.array(self.books, dtype=str),
+            "sources": np.array(self.sources, dtype=str),
+            "sizes": self.sizes,
+            "mtimes": self.mtimes,
+            "totals": self.totals,
+            "min_length": np.array(self.min_length),
+            "words": self.words.data,
+            "word_starts": self.words.starts,
+            "offsets": self.offsets,
+            "postings": self.postings,
+            "counts": self.counts,
+        }
+        if self.has_lines:
+            arrays["line_starts"] = self.line_starts
+            arrays["lines"] = self.lines
+        temporary = f"{filename}.tmp"
+        with open(temporary, "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(temporary, filename)
+
+    @classmethod
+    def load(cls, filename: str) -> "WordIndex":
+        """
+        Load an index saved by `save`. The words, postings and line offsets are memory-mapped
+        rather than read.
+        """
+        import numpy as np
+
+        from src.formats import _memmap_npz_member
+
+        with np.load(filename) as data:
+            if int(data["version"]) != INDEX_VERSION:
+                raise ValueError(f"{filename} is an index of another version")
+            books = data["books"].tolist()
+            sources = data["sources"].tolist()
+            sizes, mtimes, totals = data["sizes"], data["mtimes"], data["totals"]
+            min_length = int(data["min_length"])
+            has_lines = "lines" in data.files
+
+        def member(name: str) -> "np.ndarray":
+            return _memmap_npz_member(filename, name)
+
+        return cls(
+            books,
+            sources,
+            sizes,
+            mtimes,
+            totals,
+            min_length,
+            SortedWords(member("words"), member("word_starts")),
+            member("offsets"),
+            member("postings"),
+            member("counts"),
+            member("line_starts") if has_lines else None,
+            member("lines") if has_lines else None,
+        )
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    def __contains__(self, word: object) -> bool:
+        return isinstance(word, str) and self.words.find(word.lower()) is not None
+
+    def book_id(self, book: str) -> int:
+        """
+        Return the ID of a book, given its name; raises KeyError for unknown books.
+        """
+        return self._book_ids[book]
+
+    def _slice(self, word: str) -> slice:
+        w = self.words.find(word.lower())
+        if w is None:
+            return slice(0, 0)
+        return slice(int(self.offsets[w]), int(self.offsets[w + 1]))
+
+    def postings_of(self, word: str) -> Tuple["np.ndarray", "np.ndarray"]:
+        """
+        Return the IDs of the books a word appears in and its count in each, in descending
+        order of count and then by book ID. Words are looked up in lower case.
+        """
+        span = self._slice(word)
+        return self.postings[span], self.counts[span]
+
+    def term_frequency(self, word: str, book: Optional[str] = None) -> int:
+        """
+        Return the count of a word in one book, or in all books together.
+        """
+        books, counts = self.postings_of(word)
+        if book is None:
+            return int(counts.sum())
+        found = (books == self.book_id(book)).nonzero()[0]
+        return int(counts[found[0]]) if len(found) else 0
+
+    def frequencies(self, word: str) -> Dict[str, int]:
+        """
+        Return the count of a word in every book it appears in, in descending order.
+        """
+        books, counts = self.postings_of(word)
+        return {self.books[b]: c for b, c in zip(books.tolist(), counts.tolist())}
+
+    def top_books(self, word: str, k: int = 10, relative: bool = False) -> List[Tuple[str, float]]:
+        """
+        Return the k books in which a word is most frequent, with its count in each, or with
+        its frequency relative to the number of words of the book if `relative` is True.
+        """
+        import numpy as np
+
+        books, counts = self.postings_of(word)
+        if not relative:
+            return [(self.books[b], c) for b, c in zip(books[:k].tolist(), counts[:k].tolist())]
+        frequencies = counts / np.maximum(self.totals[books], 1)
+        order = np.lexsort((books, -frequencies))[:k]
+        return [
+            (self.books[b], f) for b, f in zip(books[order].tolist(), frequencies[order].tolist())
+        ]
+
+    def line_offsets(self, word: str, book: str) -> "np.ndarray":
+        """
+        Return the byte offsets of the lines of a book that contain a word, in increasing
+        order. Offsets of compressed books refer to the uncompressed text.
+        """
+        import numpy as np
+
+        if not self.has_lines:
+            raise ValueError("The index was built without line offsets")
+        span = self._slice(word)
+        found = (self.postings[span] == self.book_id(book)).nonzero()[0]
+        if not len(found):
+            return np.empty(0, dtype=np.int64)
+        p = span.start + int(found[0])
+        return self.lines[self.line_starts[p] : self.line_starts[p + 1]]
+
+    def read_line(self, book: str, offset: int) -> str:
+        """
+        Return the line of a book that starts at a byte offset, without its newline.
+        """
+        source = self.sources[self.book_id(book)]
+        return next(iter_chunks(source, 1, start=int(offset)), "").rstrip("\n")
+
+
+def find_books(pattern: str) -> List[str]:
+    """
+    Find the processed books to index, given a directory, whose `*.txt` files are used, or a
+    glob pattern.
+    """
+    from src.corpus import find_books as find
+
+    return [str(path) for path in find(pattern)]
+
+
+def load_index(index_path: Path) -> WordIndex:
+    """
+    Load the index of the CLI, or exit with an error if it does not exist.
+    """
+    if not index_path.exists():
+        raise typer.BadParameter(
+            f"{index_path} does not exist, build it with `index build`", param_hint="index_path"
+        )
+    return WordIndex.load(str(index_path))
+
+
+@app.command()
+def build(
+    input_path: str = typer.Option(
+        str(PROCESSED_DATA_DIR), help="Directory of processed books (*.txt), or a glob pattern."
+    ),
+    index_path: Path = INDEX_FILE,
+    min_length: int = 1,
+    lines: bool = typer.Option(
+        False, "--lines/--no-lines", help="Also index the byte offsets of the lines of words."
+    ),
+    rebuild: bool = typer.Option(
+        False, help="Count every book again, instead of only new and changed books."
+    ),
+    workers: int = os.cpu_count() or 1,
+):
+    """
+    Build or update the inverted index of the processed books.
+    """
+    sources = find_books(input_path)
+    try:
+        book_names(sources)
+    except ValueError as e:
+        raise typer.BadParameter(str(e), param_hint="input_path")
+    index = WordIndex.empty(min_length, lines)
+    if index_path.exists() and not rebuild:
+        try:
+            saved = WordIndex.load(str(index_path))
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Rebuilding the index, {index_path} cannot be read: {e}")
+        else:
+            if (saved.min_length, saved.has_lines) == (min_length, lines):
+                index = saved
+            else:
+                logger.info(f"Rebuilding the index, {index_path} has other settings")
+    stale = index.stale(sources)
+    removed = len(set(index.sources) - set(sources))
+    if not stale and not removed:
+        logger.success(f"The index of {len(sources)} books in {index_path} is up to date")
+        return
+    logger.info(
+        f"Indexing {len(stale)} new or changed books of {len(sources)}, dropping {removed}"
+    )
+    start = time.perf_counter()
+    index = index.update(sources, workers)
+    index.save(str(index_path))
+    logger.success(
+        f"Indexed {len(index)} words of {len(index.books)} books in "
+        f"{time.perf_counter() - start:.2f} s, saved to {index_path}"
+    )
+
+
+@app.command()
+def query(
+    words: List[str] = typer.Argument(..., help="Words to look up."),
+    index_path: Path = INDEX_FILE,
+    book: Optional[str] = typer.Option(None, help="Only print the count in this book."),
+    show_lines: int = typer.Option(
+        0, "--lines", help="Print up to this many lines of every book that contain the word."
+    ),
+):
+    """
+    Print the count of words in every book they appear in, and in all books together.
+    """
+    index = load_index(index_path)
+    if book is not None and book not in index.books:
+        raise typer.BadParameter(f"{book} is not an indexed book", param_hint="book")
+    if show_lines and not index.has_lines:
+        raise typer.BadParameter("the index was built without --lines", param_hint="--lines")
+    start = time.perf_counter()
+    for word in words:
+        if book is not None:
+            print(f"{word}\t{book}\t{index.term_frequency(word, book)}")
+            continue
+        print(f"{word}\t*\t{index.term_frequency(word)}")
+        for name, count in index.frequencies(word).items():
+            print(f"{word}\t{name}\t{count}")
+            for offset in index.line_offsets(word, name)[:show_lines].tolist():
+                print(f"\t{offset}: {index.read_line(name, offset)}")
+    logger.info(f"Looked up {len(words)} words in {(time.perf_counter() - start) * 1000:.2f} ms")
+
+
+@app.command()
+def top(
+    word: str,
+    index_path: Path = INDEX_FILE,
+    k: int = 10,
+    relative: bool = typer.Option(False, "--relative/--absolute"),
+):
+    """
+    Print the books in which a word is most frequent.
+    """
+    index = load_index(index_path)
+    start = time.perf_counter()
+    for name, value in index.top_books(word, k, relative):
+        print(f"{name}\t{value:.6g}" if relative else f"{name}\t{value}")
+    logger.info(f"Looked up {word!r} in {(time.perf_counter() - start) * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    app()
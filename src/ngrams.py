@@ -0,0 +1,139 @@
+from typing import TYPE_CHECKING, List, Optional, Tuple
+
+from src.vocab import Vocabulary
+
+# numpy and pandas are imported by the methods that need them, to keep startup fast
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+
+# Chunk tables are merged into the main table once they hold at least this many n-grams
+# and as many as the main table, so every n-gram is merged O(log n) times
+COMPACT_MIN = 1 << 16
+
+
+class NgramCounter:
+    """
+    Streaming counter of the n-grams of a token stream.
+
+    Words are interned in a Vocabulary and every n-gram is stored as one int64 key that packs
+    the word IDs of its n words, 63 // n bits each, so an n-gram costs three int64 (key,
+    count and position of first appearance) instead of a tuple of strings in a dict. The
+    keys of one chunk of tokens are computed at once from a rolling window over the IDs,
+    which carries the last n - 1 IDs over to the next chunk, so n-grams span chunk and line
+    boundaries exactly as in the joined text. Counts are kept per chunk and merged with
+    array operations.
+    """
+
+    def __init__(self, n: int = 2, vocabulary: Optional[Vocabulary] = None):
+        import numpy as np
+
+        if n < 1 or 63 // n < 1:
+            raise ValueError(f"n must be between 1 and 63, not {n}")
+        self.n = n
+        self.bits = 63 // n
+        self.vocabulary = vocabulary if vocabulary is not None else Vocabulary()
+        self.keys = np.empty(0, dtype=np.int64)
+        self.counts = np.empty(0, dtype=np.int64)
+        self.first = np.empty(0, dtype=np.int64)
+        self._pending: List[Tuple["np.ndarray", "np.ndarray", "np.ndarray"]] = []
+        self._pending_size = 0
+        # Last n - 1 word IDs of the stream, the start of the next n-gram
+        self._window = np.empty(0, dtype=np.int64)
+        # Number of n-grams counted so far, i.e. the position of the next one
+        self.total = 0
+
+    def update(self, words: List[str]) -> None:
+        """
+        Count the n-grams ending in a list of words, e.g. the tokens of one chunk of text,
+        that continue the words of the previous updates.
+        """
+        import numpy as np
+
+        ids = self.vocabulary.encode(words)
+        if len(self.vocabulary) > 1 << self.bits:
+            raise ValueError(
+                f"{len(self.vocabulary)} distinct words do not fit in {self.bits}-bit IDs "
+                f"of {self.n}-grams"
+            )
+        ids = np.concatenate((self._window, ids))
+        m = len(ids) - self.n + 1
+        if m <= 0:
+            self._window = ids
+            return
+        keys = ids[:m].copy()
+        for j in range(1, self.n):
+            keys <<= self.bits
+            keys |= ids[j : j + m]
+        self._window = ids[m:]
+        keys, first, counts = np.unique(keys, return_index=True, return_counts=True)
+        self._pending.append((keys, counts, first + self.total))
+        self._pending_size += len(keys)
+        self.total += m
+        if self._pending_size >= max(len(self.keys), COMPACT_MIN):
+            self._compact()
+
+    def _compact(self) -> None:
+        """
+        Merge the chunk tables into the main table, which is sorted by key.
+        """
+        import numpy as np
+
+        if not self._pending:
+            return
+        parts = [(self.keys, self.counts, self.first)] + self._pending
+        keys = np.concatenate([part[0] for part in parts])
+        order = np.argsort(keys, kind="stable")
+        keys = keys[order]
+        starts = np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1])))
+        counts = np.concatenate([part[1] for part in parts])[order]
+        first = np.concatenate([part[2] for part in parts])[order]
+        self.keys = keys[starts]
+        self.counts = np.add.reduceat(counts, starts) if len(keys) else counts
+        self.first = np.minimum.reduceat(first, starts) if len(keys) else first
+        self._pending = []
+        self._pending_size = 0
+
+    def __len__(self) -> int:
+        self._compact()
+        return len(self.keys)
+
+    def decode(self, keys: "np.ndarray") -> List[str]:
+        """
+        Return the n-grams of keys as their words joined by single spaces.
+        """
+        import numpy as np
+
+        mask = (1 << self.bits) - 1
+        ids = np.stack(
+            [(keys >> (self.bits * (self.n - 1 - j))) & mask for j in range(self.n)], axis=1
+        )
+        words = self.vocabulary.words
+        return [" ".join([words[i] for i in row]) for row in ids.tolist()]
+
+    def to_dataframe(self, top_k: Optional[int] = None) -> "pd.DataFrame":
+        """
+        Return the n-gram counts in descending order, with ties in order of first
+        appearance, as columns 'word' and 'count' exactly as counts_to_dataframe, with the
+        words of every n-gram joined by single spaces in 'word', so the table is read and
+        written like any word count table. Only the returned n-grams are decoded into
+        strings.
+
+        Args:
+            top_k (Optional[int]): Only return the top_k most frequent n-grams.
+
+        Returns:
+            pd.DataFrame: The n-gram counts.
+        """
+        import numpy as np
+        import pandas as pd
+
+        self._compact()
+        order = np.lexsort((self.first, -self.counts))
+        if top_k is not None:
+            order = order[: max(top_k, 0)]
+        # Built like counts_to_dataframe, so that the columns get the same dtypes
+        index = pd.Index(self.decode(self.keys[order]))
+        counts_df = pd.Series(self.counts[order], index=index, dtype="int64").reset_index()
+        counts_df.columns = ["word", "count"]
+        return counts_df
@@ -0,0 +1,181 @@
+from pathlib import Path
+import queue
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+from loguru import logger
+import typer
+
+from src.analysis import calculate_word_counts, save_word_counts
+from src.config import RAW_DATA_DIR, RESULT_DIR
+from src.dataset import iter_blocks, iter_body, iter_chunks, open_text
+from src.plots import plot_word_counts, pyplot
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+app = typer.Typer()
+
+# Maximum number of items waiting between two stages
+QUEUE_SIZE = 8
+# Minimum number of characters of cleaned text handed to the count stage at a time
+BLOCK_CHARS = 1 << 20
+
+_DONE = object()
+
+
+class _Stage(threading.Thread):
+    """
+    Thread that feeds the items of an iterable into a bounded queue, timing itself.
+    An exception is passed through the queue and raised again by the consumer.
+    """
+
+    def __init__(self, name: str, items: Callable[[], Iterable[Any]], stop: threading.Event):
+        super().__init__(name=name, daemon=True)
+        self.items = items
+        self.stop = stop
+        self.queue: "queue.Queue[Any]" = queue.Queue(maxsize=QUEUE_SIZE)
+        self.elapsed = 0.0
+
+    def _put(self, item: Any) -> bool:
+        while not self.stop.is_set():
+            try:
+                self.queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def run(self) -> None:
+        start = time.perf_counter()
+        try:
+            for item in self.items():
+                if not self._put(item):
+                    return
+            self._put(_DONE)
+        except BaseException as e:  # handed over to the consumer thread
+            self._put(e)
+        finally:
+            self.elapsed = time.perf_counter() - start
+
+    def __iter__(self) -> Iterator[Any]:
+        while True:
+            try:
+                item = self.queue.get(timeout=0.1)
+            except queue.Empty:
+                if self.stop.is_set():
+                    return
+                continue
+            if item is _DONE:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+
+
+def _clean_blocks(chunks: Iterable[str], processed_file: Optional[str]) -> Iterator[str]:
+    """
+    Strip the headers from a stream of raw chunks and yield the body in large blocks,
+    writing it to `processed_file` on the way if given.
+    Every piece of the body after the first starts with a newline, so no word spans two
+    blocks.
+    """
+    lines = (line for chunk in chunks for line in chunk.splitlines())
+    f = open_text(processed_file, "w") if processed_file else None
+    try:
+        for block in iter_blocks(iter_body(lines), BLOCK_CHARS):
+            if f is not None:
+                f.write(block)
+            yield block
+    finally:
+        if f is not None:
+            f.close()
+
+
+def run_pipeline(
+    raw_file: str,
+    processed_file: Optional[str] = None,
+    counts_file: Optional[str] = None,
+    plot_file: Optional[str] = None,
+    min_length: int = 1,
+    limit: int = 10,
+) -> Tuple["pd.DataFrame", Dict[str, float]]:
+    """
+    Clean, count and plot a raw Project Gutenberg book in one process.
+
+    Reading, cleaning and counting run concurrently in threads linked by bounded queues, so
+    only a few chunks of the book are held in memory at a time. Intermediate files are only
+    written when their paths are given.
+
+    Args:
+        raw_file (str): Path to the raw Project Gutenberg text file.
+        processed_file (Optional[str]): Path to save the cleaned text, or None.
+        counts_file (Optional[str]): Path to save the word counts, or None.
+        plot_file (Optional[str]): Path to save the histogram, or None.
+        min_length (int): Minimum length of the counted words.
+        limit (int): Number of top words to plot.
+
+    Returns:
+        Tuple[pd.DataFrame, Dict[str, float]]: Word counts and the wall-clock time in seconds
+        of every stage and of the whole pipeline ("total").
+    """
+    timings: Dict[str, float] = {}
+    stop = threading.Event()
+    start = time.perf_counter()
+    read = _Stage("read", lambda: iter_chunks(raw_file), stop)
+    clean = _Stage("clean", lambda: _clean_blocks(read, processed_file), stop)
+    read.start()
+    clean.start()
+    try:
+        count_start = time.perf_counter()
+        df = calculate_word_counts(clean, min_length)
+        if counts_file:
+            save_word_counts(counts_file, df)
+        count_elapsed = time.perf_counter() - count_start
+    finally:
+        stop.set()
+        read.join()
+        clean.join()
+    timings["read"] = read.elapsed
+    timings["clean"] = clean.elapsed
+    timings["count"] = count_elapsed
+    if plot_file:
+        plot_start = time.perf_counter()
+        plot_word_counts(df, limit)
+        plt = pyplot()
+        plt.savefig(plot_file)
+        plt.close()
+        timings["plot"] = time.perf_counter() - plot_start
+    timings["total"] = time.perf_counter() - start
+    return df, timings
+
+
+@app.command()
+def main(
+    input_path: Path = RAW_DATA_DIR / "book.txt",
+    output_path: Path = RESULT_DIR / "histogram.pdf",
+    processed_path: Optional[Path] = typer.Option(None, help="Also save the cleaned text."),
+    counts_path: Optional[Path] = typer.Option(None, help="Also save the word counts."),
+    min_length: int = 1,
+    limit: int = 10,
+):
+    """
+    Clean, count and plot a raw book in one process, overlapping the stages.
+    """
+    logger.info(f"Running the pipeline on {input_path}")
+    df, timings = run_pipeline(
+        str(input_path),
+        str(processed_path) if processed_path else None,
+        str(counts_path) if counts_path else None,
+        str(output_path),
+        min_length,
+        limit,
+    )
+    for stage, elapsed in timings.items():
+        logger.info(f"{stage:>6}: {elapsed:.3f} s")
+    logger.success(f"Counted {len(df)} words, plot saved to {output_path}")
+
+
+if __name__ == "__main__":
+    app()
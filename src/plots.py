@@ -1,28 +1,92 @@
+from concurrent.futures import ProcessPoolExecutor
+import glob
+import math
+import os
 from pathlib import Path
+import sys
+import time
+from types import ModuleType
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Tuple
 
 from loguru import logger
-import matplotlib.pyplot as plt
-import pandas as pd
-from tqdm import tqdm
 import typer
+from typer.core import TyperGroup
 
+from src.analysis import top_k_dataframe
 from src.config import ANALYZED_DIR, RESULT_DIR
+from src.profiling import profile_command
 
-app = typer.Typer()
+# matplotlib and pandas are imported when a plot is made, to keep startup fast
+if TYPE_CHECKING:
+    import click
+    import numpy as np
+    import pandas as pd
 
+    from src.zipf import ZipfFit
 
-def plot_word_counts(df: pd.DataFrame, limit: int = 10) -> None:
+
+class _HistogramByDefault(TyperGroup):
+    """
+    Run the histogram command `main` when no command is named, so that
+    `plots --input-path ...` keeps working now that there is also a `batch` command.
+    """
+
+    def parse_args(self, ctx: "click.Context", args: List[str]) -> List[str]:
+        if not args or (args[0] not in self.commands and args[0] not in ctx.help_option_names):
+            args = ["main", *args]
+        return super().parse_args(ctx, args)
+
+
+app = typer.Typer(cls=_HistogramByDefault)
+
+# File formats of the batch plots
+PLOT_FORMATS = ("png", "pdf", "svg")
+
+
+def pyplot(interactive: bool = False) -> ModuleType:
+    """
+    Import matplotlib.pyplot, selecting the non-interactive Agg backend on first use unless
+    the plot is to be shown. Agg can save every file format and loads much faster than a
+    GUI backend.
+
+    Args:
+        interactive (bool): Keep matplotlib's default backend, e.g. to show the plot.
+
+    Returns:
+        ModuleType: The matplotlib.pyplot module.
+    """
+    if not interactive and "matplotlib.pyplot" not in sys.modules:
+        import matplotlib
+
+        matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    return plt
+
+
+def plot_word_counts(df: "pd.DataFrame", limit: int = 10, fit: Optional["ZipfFit"] = None) -> None:
     """
     Plot a histogram of word counts from a pandas DataFrame.
 
     Args:
-        df (pd.DataFrame): DataFrame with columns 'word' and 'count'.
+        df (pd.DataFrame): DataFrame with columns 'word' and 'count', sorted by count.
         limit (int): Number of top words to plot.
+        fit (Optional[ZipfFit]): Zipf's law fit whose counts are drawn over the bars.
     """
+    plt = pyplot()
     limited_df = df.head(limit)
     position = range(len(limited_df))
     plt.figure(figsize=(6, 4))
     plt.bar(position, limited_df["count"], width=0.8)
+    if fit is not None:
+        plt.plot(
+            position,
+            fit.predict(range(1, len(limited_df) + 1)),
+            color="C1",
+            marker="o",
+            label=f"Zipf fit ({fit.method}), exponent {fit.exponent:.3f}",
+        )
+        plt.legend()
     plt.xticks(position, limited_df["word"].tolist(), rotation=45, ha="right")
     plt.title("Word Counts")
     plt.ylabel("Counts")
@@ -30,24 +94,261 @@ def plot_word_counts(df: pd.DataFrame, limit: int = 10) -> None:
     plt.tight_layout()
 
 
+def plot_rank_frequency(
+    counts: "np.ndarray", fits: Sequence["ZipfFit"] = (), points: int = 1000
+) -> None:
+    """
+    Plot the counts of a table against their rank on log-log axes, with the fitted Zipf's
+    law curves. Only about `points` ranks, evenly spaced in log scale, are drawn.
+
+    Args:
+        counts (np.ndarray): Word counts in any order.
+        fits (Sequence[ZipfFit]): Fits to draw over their ranks.
+        points (int): Maximum number of plotted ranks.
+    """
+    import numpy as np
+
+    plt = pyplot()
+    counts = np.sort(np.asarray(counts, dtype=np.int64))[::-1]
+    counts = counts[counts > 0]
+    ranks = np.unique(np.geomspace(1, max(len(counts), 1), points).astype(np.int64))
+    ranks = ranks[ranks <= len(counts)]
+    plt.figure(figsize=(6, 4))
+    plt.loglog(ranks, counts[ranks - 1], ".", markersize=3, label="Observed")
+    for fit in fits:
+        fit_ranks = ranks[ranks <= fit.n_ranks]
+        plt.loglog(
+            fit_ranks,
+            fit.predict(fit_ranks),
+            label=f"{fit.method}, exponent {fit.exponent:.3f}",
+        )
+    plt.title("Rank-Frequency")
+    plt.ylabel("Counts")
+    plt.xlabel("Rank")
+    plt.legend()
+    plt.tight_layout()
+
+
+class HistogramRenderer:
+    """
+    Render histograms of word counts to files with one reusable Figure and Axes.
+
+    The figure uses the object-oriented Agg API, so it is not registered with pyplot and
+    nothing is kept alive between plots. The bars are created once and only their heights
+    and labels change from one plot to the next. The tight layout, which costs as much as
+    drawing the plot, is computed once for every length of the longest word and width of
+    the largest count, with a wide letter as placeholder, and then reused. Call `close`
+    (or use the renderer as a context manager) to free the figure.
+    """
+
+    def __init__(self, limit: int = 10, figsize: Tuple[float, float] = (6, 4)):
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+
+        self.limit = limit
+        self.figure = Figure(figsize=figsize)
+        FigureCanvasAgg(self.figure)
+        self.ax = self.figure.add_subplot()
+        self.bars = self.ax.bar(range(limit), [0] * limit, width=0.8).patches
+        self.ax.set_title("Word Counts")
+        self.ax.set_ylabel("Counts")
+        self.ax.set_xlabel("Word")
+        self._layouts: Dict[Tuple[int, int], Dict[str, float]] = {}
+
+    def _layout(self, key: Tuple[int, int], n_words: int) -> Dict[str, float]:
+        if key not in self._layouts:
+            from matplotlib.layout_engine import TightLayoutEngine
+
+            self.ax.set_xticks(range(n_words), ["w" * key[0]] * n_words, rotation=45, ha="right")
+            # Figure.tight_layout would leave a layout engine set, making savefig draw twice
+            TightLayoutEngine().execute(self.figure)
+            params = self.figure.subplotpars
+            self._layouts[key] = {
+                "left": params.left,
+                "bottom": params.bottom,
+                "right": params.right,
+                "top": params.top,
+            }
+        return self._layouts[key]
+
+    def update(self, df: "pd.DataFrame") -> None:
+        """
+        Show the top `limit` words of a DataFrame with columns 'word' and 'count'.
+        """
+        top = df.head(self.limit)
+        words = top["word"].astype(str).tolist()
+        counts = top["count"].tolist()
+        for i, bar in enumerate(self.bars):
+            bar.set_visible(i < len(counts))
+            bar.set_height(counts[i] if i < len(counts) else 0)
+        self.ax.set_xlim(-0.5, max(len(words), 1) - 0.5)
+        self.ax.set_ylim(0, max(counts, default=0) * 1.05 or 1)
+        key = (max(map(len, words), default=0), len(str(max(counts, default=0))))
+        self.figure.subplots_adjust(**self._layout(key, len(words)))
+        self.ax.set_xticks(range(len(words)), words, rotation=45, ha="right")
+
+    def render(self, df: "pd.DataFrame", output_file: str) -> None:
+        """
+        Plot the top words of a DataFrame and save the plot, in the format given by the
+        file extension.
+        """
+        self.update(df)
+        self.figure.savefig(output_file)
+
+    def close(self) -> None:
+        self.figure.clear()
+        self.bars = []
+
+    def __enter__(self) -> "HistogramRenderer":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def _render_tables(task: Tuple[List[Tuple[str, str]], int]) -> List[Tuple[str, Optional[str]]]:
+    """
+    Render a list of (count table, plot file) pairs with one renderer. Returns every count
+    table with None, or the error message if it could not be plotted.
+    """
+    from src.formats import read_word_counts
+
+    pairs, limit = task
+    results: List[Tuple[str, Optional[str]]] = []
+    with HistogramRenderer(limit) as renderer:
+        for table, output_file in pairs:
+            try:
+                renderer.render(read_word_counts(table, limit), output_file)
+                results.append((table, None))
+            except Exception as e:
+                results.append((table, f"{type(e).__name__}: {e}"))
+    return results
+
+
+def plot_batch(
+    tables: Sequence[str],
+    output_dir: Path,
+    fmt: str = "png",
+    limit: int = 10,
+    workers: int = 1,
+) -> Tuple[List[Path], List[str]]:
+    """
+    Plot a histogram of every count table into `output_dir`, as <table name>.<fmt>.
+
+    The tables are split into a few batches per worker process. Every batch is rendered
+    with one HistogramRenderer, so the cost of creating a figure is paid once per batch.
+
+    Args:
+        tables (Sequence[str]): Paths to CSV, Feather or .npz count tables sorted by count.
+        output_dir (Path): Directory to save the plots to.
+        fmt (str): File format of the plots, one of PLOT_FORMATS.
+        limit (int): Number of top words to plot.
+        workers (int): Number of worker processes; 1 renders in this process.
+
+    Returns:
+        Tuple[List[Path], List[str]]: The saved plots and the tables that failed.
+    """
+    if fmt not in PLOT_FORMATS:
+        raise ValueError(f"Unknown plot format {fmt!r}, use one of {PLOT_FORMATS}")
+    output_dir.mkdir(parents=True, exist_ok=True)
+    pairs = [(str(table), str(output_dir / f"{Path(table).stem}.{fmt}")) for table in tables]
+    if not pairs:
+        return [], []
+    size = math.ceil(len(pairs) / (max(workers, 1) * 4))
+    tasks = [(pairs[i : i + size], limit) for i in range(0, len(pairs), size)]
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = [result for batch in executor.map(_render_tables, tasks) for result in batch]
+    else:
+        results = [result for task in tasks for result in _render_tables(task)]
+    outputs = dict(pairs)
+    failed = []
+    for table, error in results:
+        if error is not None:
+            logger.warning(f"Skipping {table}: {error}")
+            failed.append(table)
+    saved = [Path(outputs[table]) for table, error in results if error is None]
+    return saved, failed
+
+
 @app.command()
 def main(
     input_path: Path = ANALYZED_DIR / "word_counts.csv",
     output_path: Path = RESULT_DIR / "histogram.pdf",
     limit: int = 10,
+    top_k: Optional[int] = typer.Option(
+        None, help="Plot the K most frequent words of a table that is not sorted by count."
+    ),
+    fit: Optional[str] = typer.Option(
+        None, help="Overlay Zipf's law fitted to the whole table: lsq or mle."
+    ),
+    profile: Optional[Path] = typer.Option(None, help="Save a JSON profile of the stages."),
+    pstats: Optional[Path] = typer.Option(None, help="Save a cProfile dump (pstats)."),
 ):
     """
-    Plot a histogram of word counts from a CSV file and save or show the plot.
+    Plot a histogram of word counts from a CSV, Feather or .npz file and save or show the plot.
     """
+    from src.formats import read_word_counts
+    from src.zipf import METHODS, fit_zipf
+
+    if fit is not None and fit not in METHODS:
+        raise typer.BadParameter(f"choose from {', '.join(METHODS)}", param_hint="--fit")
+    plt = pyplot(interactive=str(output_path) == "show")
     logger.info(f"Reading word counts from {input_path}")
-    df = pd.read_csv(input_path)
-    plot_word_counts(df, limit)
-    if str(output_path) == "show":
-        plt.show()
-        logger.success("Plot displayed.")
-    else:
-        plt.savefig(output_path)
-        logger.success(f"Plot saved to {output_path}")
+    with profile_command("plots", profile, pstats) as profiler:
+        with profiler.stage("load") as load:
+            df = read_word_counts(str(input_path), None if top_k or fit else limit)
+            load.lines = len(df)
+        zipf_fit = None
+        if fit is not None:
+            with profiler.stage("fit"):
+                try:
+                    zipf_fit = fit_zipf(df["count"].to_numpy(dtype="int64"), fit)
+                except ValueError as e:
+                    raise typer.BadParameter(f"{input_path}: {e}", param_hint="--fit")
+            logger.info(f"Zipf exponent ({fit}): {zipf_fit.exponent:.4f}")
+        if top_k:
+            with profiler.stage("sort"):
+                df = top_k_dataframe(dict(zip(df["word"], df["count"].tolist())), top_k)
+            limit = top_k
+        with profiler.stage("render"):
+            plot_word_counts(df, limit, zipf_fit)
+        if str(output_path) == "show":
+            plt.show()
+            logger.success("Plot displayed.")
+        else:
+            with profiler.stage("save"):
+                plt.savefig(output_path)
+            if profiler.enabled:
+                profiler.stats("load").bytes_read = input_path.stat().st_size
+                profiler.stats("save").bytes_written = output_path.stat().st_size
+            logger.success(f"Plot saved to {output_path}")
+
+
+@app.command()
+def batch(
+    input_path: str = typer.Option(
+        str(ANALYZED_DIR), help="Directory of CSV count tables, or a glob pattern."
+    ),
+    output_dir: Path = RESULT_DIR / "histograms",
+    fmt: str = typer.Option("png", "--format", help=f"One of {', '.join(PLOT_FORMATS)}."),
+    limit: int = 10,
+    workers: int = os.cpu_count() or 1,
+):
+    """
+    Plot a histogram of every count table in a directory or glob, in worker processes.
+    """
+    pattern = os.path.join(input_path, "*.csv") if os.path.isdir(input_path) else input_path
+    tables = sorted(p for p in glob.glob(pattern, recursive=True) if os.path.isfile(p))
+    logger.info(f"Plotting {len(tables)} count tables from {input_path} with {workers} workers")
+    start = time.perf_counter()
+    saved, failed = plot_batch(tables, output_dir, fmt, limit, workers)
+    elapsed = time.perf_counter() - start
+    plots_per_second = len(saved) / max(elapsed, 1e-9)
+    logger.info(f"Rendered {len(saved)} plots in {elapsed:.2f} s ({plots_per_second:.1f} plots/s)")
+    if failed:
+        logger.warning(f"{len(failed)} tables failed: {', '.join(failed)}")
+    logger.success(f"Plots saved to {output_dir}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,218 @@
+from contextlib import contextmanager
+import cProfile
+import json
+import os
+from pathlib import Path
+import sys
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, TypeVar
+
+from loguru import logger
+
+T = TypeVar("T")
+
+# Inputs smaller than this are processed without a progress bar
+PROGRESS_MIN_BYTES = 64 << 20
+
+
+def peak_rss_mb() -> Optional[float]:
+    """
+    Return the peak resident set size of this process in MB, or None if it is unknown.
+    """
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    return peak / (1 << 20) if sys.platform == "darwin" else peak / (1 << 10)
+
+
+class StageStats:
+    """
+    Counters of one profiled stage. Times are exclusive: the time spent in stages nested
+    inside this one is only counted for the nested stages.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.calls = 0
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.lines = 0
+        self.tokens = 0
+        self.peak_rss_mb: Optional[float] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        wall = max(self.wall, 1e-9)
+        return {
+            "name": self.name,
+            "wall_s": self.wall,
+            "cpu_s": self.cpu,
+            "calls": self.calls,
+            "peak_rss_mb": self.peak_rss_mb,
+            "bytes_read": self.bytes_read,
+            "bytes_written": self.bytes_written,
+            "lines": self.lines,
+            "tokens": self.tokens,
+            "tokens_per_s": self.tokens / wall,
+            "mb_per_s": (self.bytes_read + self.bytes_written) / 1e6 / wall,
+        }
+
+
+class Profiler:
+    """
+    Per-stage wall time, CPU time, peak RSS and I/O counters of one command.
+
+    Stages are timed with the `stage` context manager or, for generators, with `iterate`.
+    A disabled profiler does not time anything and adds no overhead.
+    """
+
+    def __init__(self, command: str = "", enabled: bool = True):
+        self.command = command
+        self.enabled = enabled
+        self.stages: Dict[str, StageStats] = {}
+        # Active stages with the wall and CPU time at which they last resumed
+        self._stack: List[Tuple[StageStats, float, float]] = []
+        self._start = (time.perf_counter(), time.process_time())
+
+    def stats(self, name: str) -> StageStats:
+        """
+        Return the counters of a stage, creating them on first use.
+        A disabled profiler returns counters that are not kept.
+        """
+        if not self.enabled:
+            return StageStats(name)
+        if name not in self.stages:
+            self.stages[name] = StageStats(name)
+        return self.stages[name]
+
+    def _enter(self, name: str) -> StageStats:
+        wall, cpu = time.perf_counter(), time.process_time()
+        if self._stack:
+            outer, outer_wall, outer_cpu = self._stack[-1]
+            outer.wall += wall - outer_wall
+            outer.cpu += cpu - outer_cpu
+        stats = self.stats(name)
+        stats.calls += 1
+        self._stack.append((stats, wall, cpu))
+        return stats
+
+    def _exit(self) -> None:
+        wall, cpu = time.perf_counter(), time.process_time()
+        stats, start_wall, start_cpu = self._stack.pop()
+        stats.wall += wall - start_wall
+        stats.cpu += cpu - start_cpu
+        stats.peak_rss_mb = peak_rss_mb()
+        if self._stack:
+            outer = self._stack[-1][0]
+            self._stack[-1] = (outer, wall, cpu)
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[StageStats]:
+        """
+        Time the enclosed block as the stage `name` and yield its counters.
+        """
+        if not self.enabled:
+            yield self.stats(name)
+            return
+        stats = self._enter(name)
+        try:
+            yield stats
+        finally:
+            self._exit()
+
+    def iterate(self, name: str, iterable: Iterable[T]) -> Iterator[T]:
+        """
+        Yield the items of an iterable, timing the production of every item as the stage
+        `name`. Use it for coarse items such as chunks, since every item costs a few
+        microseconds.
+        """
+        if not self.enabled:
+            yield from iterable
+            return
+        iterator = iter(iterable)
+        while True:
+            self._enter(name)
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                self._exit()
+            yield item
+
+    def report(self) -> Dict[str, Any]:
+        """
+        Return the profile as a JSON-serialisable dictionary.
+        """
+        wall = time.perf_counter() - self._start[0]
+        cpu = time.process_time() - self._start[1]
+        return {
+            "command": self.command,
+            "total": {"wall_s": wall, "cpu_s": cpu, "peak_rss_mb": peak_rss_mb()},
+            "stages": [stats.to_dict() for stats in self.stages.values()],
+        }
+
+    def write(self, filename: str) -> Dict[str, Any]:
+        """
+        Save the profile as JSON and log a summary of every stage.
+        """
+        report = self.report()
+        with open(filename, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        for stage in report["stages"]:
+            logger.info(
+                f"{stage['name']:>8}: {stage['wall_s']:.3f} s wall, {stage['cpu_s']:.3f} s CPU"
+                + (f", {stage['tokens_per_s'] / 1e6:.2f} Mtokens/s" if stage["tokens"] else "")
+            )
+        logger.info(f"Profile saved to {filename}")
+        return report
+
+
+NULL_PROFILER = Profiler(enabled=False)
+
+
+@contextmanager
+def profile_command(
+    command: str, profile_path: Optional[Path] = None, pstats_path: Optional[Path] = None
+) -> Iterator[Profiler]:
+    """
+    Profile a command: yield a Profiler that is enabled if any output path is given, then
+    save its JSON profile to `profile_path` and a cProfile dump to `pstats_path`.
+    The dump can be read with `python -m pstats` or `pstats.Stats`.
+    """
+    profiler = Profiler(command, enabled=profile_path is not None or pstats_path is not None)
+    profile = cProfile.Profile() if pstats_path is not None else None
+    if profile is not None:
+        profile.enable()
+    try:
+        yield profiler
+    finally:
+        if profile is not None:
+            profile.disable()
+            profile.dump_stats(str(pstats_path))
+            logger.info(f"cProfile stats saved to {pstats_path}")
+        if profile_path is not None:
+            profiler.write(str(profile_path))
+
+
+def progress(chunks: Iterable[str], filename: str, desc: str, sized: bool = True) -> Iterator[str]:
+    """
+    Show a progress bar with the throughput in bytes per second while the chunks of text of
+    a file are consumed, if stderr is a terminal and the file is large. Otherwise the chunks
+    are passed through unchanged, without importing tqdm. With sized=False, e.g. for a
+    compressed file whose size is not the size of its text, the bar has no total.
+    """
+    if not sys.stderr.isatty() or os.path.getsize(filename) < PROGRESS_MIN_BYTES:
+        yield from chunks
+        return
+    from tqdm import tqdm
+
+    total_bytes = os.path.getsize(filename) if sized else None
+    with tqdm(total=total_bytes, desc=desc, unit="B", unit_scale=True, file=sys.stderr) as bar:
+        for chunk in chunks:
+            yield chunk
+            bar.update(len(chunk.encode("utf-8")))
@@ -0,0 +1,409 @@
+from collections import Counter, deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from functools import partial
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import math
+import os
+import queue
+import threading
+import time
+from typing import Any, Deque, Dict, List, Optional, Tuple, Union
+import urllib.error
+import urllib.request
+
+from loguru import logger
+import typer
+
+from src.analysis import count_words, counts_to_dataframe, top_k_dataframe
+from src.dataset import iter_chunks
+
+app = typer.Typer()
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_URL = f"http://{DEFAULT_HOST}:{DEFAULT_PORT}"
+# Requests that arrive within BATCH_WAIT seconds of each other are counted in one batch of
+# at most MAX_BATCH requests, so small requests share one round trip to a worker process
+MAX_BATCH = 32
+BATCH_WAIT = 0.005
+REQUEST_TIMEOUT = 300.0
+# Connections the kernel queues while all are waiting to be accepted. The default of
+# socketserver, 5, drops or resets connections when many clients connect at once
+REQUEST_QUEUE_SIZE = 128
+# Number of recent request latencies kept for the percentiles
+METRICS_WINDOW = 10_000
+
+# (text, path, min_length) of one count request; exactly one of text and path is set
+CountTask = Tuple[Optional[str], Optional[str], int]
+
+
+def _count_batch(tasks: List[CountTask]) -> List[Union[Counter, Exception]]:
+    """
+    Count the words of a batch of requests; runs in a worker process.
+    A failing request returns its exception instead of failing the whole batch.
+    """
+    results: List[Union[Counter, Exception]] = []
+    for text, path, min_length in tasks:
+        try:
+            lines = iter_chunks(path) if path is not None else [text]
+            results.append(count_words(lines, min_length))
+        except Exception as e:
+            results.append(e)
+    return results
+
+
+def percentile(values: List[float], q: float) -> float:
+    """
+    Return the q-th percentile (0 < q <= 100) of a list of values by the nearest-rank method.
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(math.ceil(q / 100 * len(ordered)) - 1, 0)]
+
+
+class Metrics:
+    """
+    Thread-safe request latency, throughput and batching statistics of the count service.
+    """
+
+    def __init__(self, window: int = METRICS_WINDOW):
+        self.lock = threading.Lock()
+        self.latencies: Deque[float] = deque(maxlen=window)
+        self.started = time.perf_counter()
+        self.requests = 0
+        self.errors = 0
+        self.batches = 0
+        self.batched_requests = 0
+
+    def record_request(self, latency: float, ok: bool = True) -> None:
+        with self.lock:
+            self.latencies.append(latency)
+            self.requests += 1
+            self.errors += not ok
+
+    def record_batch(self, size: int) -> None:
+        with self.lock:
+            self.batches += 1
+            self.batched_requests += size
+
+    def snapshot(self) -> Dict[str, float]:
+        """
+        Return the current metrics; latencies are in milliseconds over the recent window.
+        """
+        with self.lock:
+            latencies = list(self.latencies)
+            uptime = time.perf_counter() - self.started
+            return {
+                "requests": self.requests,
+                "errors": self.errors,
+                "uptime_s": uptime,
+                "throughput_rps": self.requests / max(uptime, 1e-9),
+                "p50_ms": percentile(latencies, 50) * 1000,
+                "p99_ms": percentile(latencies, 99) * 1000,
+                "batches": self.batches,
+                "mean_batch_size": self.batched_requests / max(self.batches, 1),
+            }
+
+
+class CountService:
+    """
+    Warm pool of worker processes that counts words for concurrent requests in batches.
+    """
+
+    def __init__(
+        self, workers: int = 1, max_batch: int = MAX_BATCH, batch_wait: float = BATCH_WAIT
+    ):
+        self.executor = ProcessPoolExecutor(max_workers=workers)
+        self.workers = workers
+        self.max_batch = max_batch
+        self.batch_wait = batch_wait
+        self.metrics = Metrics()
+        self.requests: "queue.Queue[Tuple[CountTask, Future]]" = queue.Queue()
+        self.closed = threading.Event()
+        self.thread = threading.Thread(target=self._batch_loop, name="batcher", daemon=True)
+
+    def start(self) -> "CountService":
+        """
+        Start the worker processes and the batching thread.
+        """
+        # Start every worker now, so that the first requests do not pay for it
+        warm = [self.executor.submit(_count_batch, []) for _ in range(self.workers)]
+        for future in warm:
+            future.result()
+        # Load pandas for formatting the responses
+        format_counts(Counter())
+        self.thread.start()
+        return self
+
+    def close(self) -> None:
+        self.closed.set()
+        self.thread.join()
+        self.executor.shutdown()
+
+    def submit(
+        self, text: Optional[str] = None, path: Optional[str] = None, min_length: int = 1
+    ) -> "Future[Counter]":
+        """
+        Queue a count request for a text or a file and return a future of its word counts.
+        """
+        if (text is None) == (path is None):
+            raise ValueError("Give exactly one of text and path")
+        if not isinstance(text if path is None else path, str):
+            raise ValueError("text and path must be strings")
+        future: "Future[Counter]" = Future()
+        self.requests.put(((text, path, min_length), future))
+        return future
+
+    def _next_batch(self) -> List[Tuple[CountTask, Future]]:
+        """
+        Wait for a request, then collect the requests that arrive within batch_wait.
+        """
+        try:
+            batch = [self.requests.get(timeout=0.1)]
+        except queue.Empty:
+            return []
+        deadline = time.perf_counter() + self.batch_wait
+        while len(batch) < self.max_batch:
+            try:
+                batch.append(self.requests.get_nowait())
+                continue
+            except queue.Empty:
+                pass
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.requests.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _batch_loop(self) -> None:
+        while not self.closed.is_set():
+            batch = self._next_batch()
+            if not batch:
+                continue
+            self.metrics.record_batch(len(batch))
+            done = self.executor.submit(_count_batch, [task for task, _ in batch])
+            done.add_done_callback(partial(_deliver, [future for _, future in batch]))
+
+
+def _deliver(futures: List[Future], done: Future) -> None:
+    """
+    Hand the results of a batch to the futures of its requests.
+    """
+    if done.exception() is not None:
+        for future in futures:
+            future.set_exception(done.exception())
+        return
+    for future, result in zip(futures, done.result()):
+        if isinstance(result, Exception):
+            future.set_exception(result)
+        else:
+            future.set_result(result)
+
+
+def format_counts(counts: Counter, top_k: Optional[int] = None, fmt: str = "json") -> str:
+    """
+    Format word counts in descending order as JSON, a list of [word, count] pairs, or as
+    the word,count CSV written by save_word_counts.
+    """
+    df = top_k_dataframe(counts, top_k) if top_k else counts_to_dataframe(counts)
+    if fmt == "csv":
+        return df.to_csv(index=False)
+    if fmt == "json":
+        return json.dumps({"counts": list(zip(df["word"], df["count"].tolist()))})
+    raise ValueError(f"Unknown format {fmt!r}, use json or csv")
+
+
+class CountRequestHandler(BaseHTTPRequestHandler):
+    """
+    POST /count with a JSON body {"text": ...} or {"path": ...}, and optionally
+    "min_length", "top_k" and "format" ("json" or "csv"). GET /metrics returns the metrics.
+    """
+
+    server: "CountServer"
+
+    def _send(self, status: int, body: str, content_type: str = "application/json") -> None:
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", f"{content_type}; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _error(self, status: int, message: str) -> None:
+        self._send(status, json.dumps({"error": message}))
+
+    def do_GET(self) -> None:
+        if self.path == "/metrics":
+            self._send(200, json.dumps(self.server.service.metrics.snapshot()))
+        elif self.path == "/health":
+            self._send(200, json.dumps({"status": "ok"}))
+        else:
+            self._error(404, f"Unknown path {self.path}")
+
+    def do_POST(self) -> None:
+        if self.path != "/count":
+            self._error(404, f"Unknown path {self.path}")
+            return
+        start = time.perf_counter()
+        ok = False
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            request: Dict[str, Any] = json.loads(self.rfile.read(length) or b"{}")
+            fmt = request.get("format", "json")
+            if fmt not in ("json", "csv"):
+                raise ValueError(f"Unknown format {fmt!r}, use json or csv")
+            future = self.server.service.submit(
+                request.get("text"), request.get("path"), int(request.get("min_length", 1))
+            )
+            counts = future.result(timeout=REQUEST_TIMEOUT)
+            top_k = request.get("top_k")
+            body = format_counts(counts, int(top_k) if top_k is not None else None, fmt)
+            content_type = "text/csv" if fmt == "csv" else "application/json"
+            self._send(200, body, content_type)
+            ok = True
+        except (ValueError, TypeError) as e:
+            self._error(400, str(e))
+        except FileNotFoundError as e:
+            self._error(404, str(e))
+        except Exception as e:
+            logger.exception("Count request failed")
+            self._error(500, str(e))
+        finally:
+            self.server.service.metrics.record_request(time.perf_counter() - start, ok)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        logger.debug(f"{self.address_string()} {format % args}")
+
+
+class CountServer(ThreadingHTTPServer):
+    """
+    HTTP server that answers every request in its own thread using a shared CountService.
+    Up to `backlog` connections wait to be accepted, so bursts of clients are queued.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address: Tuple[str, int],
+        service: CountService,
+        backlog: int = REQUEST_QUEUE_SIZE,
+    ):
+        # Read by server_activate, which listen()s in the base constructor
+        self.request_queue_size = backlog
+        super().__init__(address, CountRequestHandler)
+        self.service = service
+
+
+def request_counts(
+    text: Optional[str] = None,
+    path: Optional[str] = None,
+    min_length: int = 1,
+    top_k: Optional[int] = None,
+    fmt: str = "json",
+    url: str = DEFAULT_URL,
+    timeout: float = REQUEST_TIMEOUT,
+) -> Union[List[Tuple[str, int]], str]:
+    """
+    Ask a running count server for the word counts of a text or a file.
+
+    Args:
+        text (Optional[str]): Text to count.
+        path (Optional[str]): Path of a file to count, as seen by the server.
+        min_length (int): Minimum length of the counted words.
+        top_k (Optional[int]): Only return the K most frequent words.
+        fmt (str): "json" for a list of (word, count) pairs or "csv" for the CSV text.
+        url (str): Base URL of the server.
+        timeout (float): Timeout of the request in seconds.
+
+    Returns:
+        Union[List[Tuple[str, int]], str]: Word counts in descending order.
+    """
+    payload = {"text": text, "path": path, "min_length": min_length, "format": fmt}
+    if top_k:
+        payload["top_k"] = top_k
+    request = urllib.request.Request(
+        f"{url}/count",
+        data=json.dumps({k: v for k, v in payload.items() if v is not None}).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            body = response.read().decode("utf-8")
+    except urllib.error.HTTPError as e:
+        message = json.loads(e.read().decode("utf-8")).get("error", e.reason)
+        raise RuntimeError(f"Count server error {e.code}: {message}") from e
+    if fmt == "csv":
+        return body
+    return [(word, count) for word, count in json.loads(body)["counts"]]
+
+
+def request_metrics(url: str = DEFAULT_URL) -> Dict[str, float]:
+    """
+    Return the metrics of a running count server.
+    """
+    with urllib.request.urlopen(f"{url}/metrics", timeout=10) as response:
+        return json.loads(response.read().decode("utf-8"))
+
+
+@app.command()
+def serve(
+    host: str = DEFAULT_HOST,
+    port: int = DEFAULT_PORT,
+    workers: int = os.cpu_count() or 1,
+    max_batch: int = MAX_BATCH,
+    batch_wait_ms: float = BATCH_WAIT * 1000,
+    backlog: int = typer.Option(
+        REQUEST_QUEUE_SIZE, help="Connections queued while waiting to be accepted."
+    ),
+):
+    """
+    Serve word counts over HTTP from a warm pool of worker processes.
+    """
+    service = CountService(workers, max_batch, batch_wait_ms / 1000).start()
+    server = CountServer((host, port), service, backlog)
+    logger.info(
+        f"Count server listening on http://{host}:{server.server_port} ({workers} workers)"
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+        logger.info(f"Count server stopped: {service.metrics.snapshot()}")
+
+
+@app.command()
+def count(
+    text: Optional[str] = typer.Option(None, help="Text to count."),
+    path: Optional[str] = typer.Option(None, help="File to count, as seen by the server."),
+    min_length: int = 1,
+    top_k: Optional[int] = None,
+    fmt: str = typer.Option("csv", "--format", help="Output format: csv or json."),
+    url: str = DEFAULT_URL,
+):
+    """
+    Print the word counts of a text or a file, counted by a running server.
+    """
+    result = request_counts(text, path, min_length, top_k, fmt, url)
+    print(result if isinstance(result, str) else json.dumps(result), end="\n" * (fmt == "json"))
+
+
+@app.command()
+def metrics(url: str = DEFAULT_URL):
+    """
+    Print the latency, throughput and batching metrics of a running server.
+    """
+    for name, value in request_metrics(url).items():
+        print(f"{name:>16}: {value:.3f}" if isinstance(value, float) else f"{name:>16}: {value}")
+
+
+if __name__ == "__main__":
+    app()
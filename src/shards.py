@@ -0,0 +1,196 @@
+import contextlib
+import heapq
+import itertools
+import os
+from pathlib import Path
+import tempfile
+import time
+from typing import Iterable, Iterator, List, Mapping, Optional, Tuple
+
+from loguru import logger
+import typer
+
+from src.config import ANALYZED_DIR
+
+app = typer.Typer()
+
+# A shard holds partial word counts as "word<TAB>count" lines sorted by word, so any number
+# of shards can be merged by streaming them side by side. Words never contain whitespace.
+SHARD_SUFFIX = ".shard"
+# Maximum number of shards opened at once by a merge pass
+MERGE_FAN_IN = 64
+# Number of rows sorted in memory at once by sort_shard_by_count
+SORT_RUN_SIZE = 1_000_000
+
+
+def write_shard(filename: str, counts: Mapping[str, int]) -> int:
+    """
+    Save word counts as a shard sorted by word.
+
+    Args:
+        filename (str): Path to the shard file.
+        counts (Mapping[str, int]): Word counts to save.
+
+    Returns:
+        int: Number of words in the shard.
+    """
+    return _write_items(filename, sorted(counts.items()))
+
+
+def _write_items(filename: str, items: Iterable[Tuple[str, int]]) -> int:
+    """
+    Write (word, count) pairs as shard lines and return the number of lines.
+    """
+    n = 0
+    with open(filename, "w", encoding="utf-8") as f:
+        for word, count in items:
+            f.write(f"{word}\t{count}\n")
+            n += 1
+    return n
+
+
+def iter_shard(filename: str) -> Iterator[Tuple[str, int]]:
+    """
+    Stream the (word, count) pairs of a shard, in the order they are stored.
+
+    Args:
+        filename (str): Path to the shard file.
+
+    Yields:
+        Tuple[str, int]: Word and count.
+    """
+    with open(filename, encoding="utf-8") as f:
+        for line in f:
+            word, _, count = line.rstrip("\n").rpartition("\t")
+            yield word, int(count)
+
+
+def _merge_into(shards: List[str], output_file: str) -> int:
+    """
+    Merge sorted shards into one sorted shard, adding the counts of equal words.
+    """
+    with contextlib.ExitStack() as stack:
+        streams = [stack.enter_context(contextlib.closing(iter_shard(s))) for s in shards]
+        merged = heapq.merge(*streams)
+        grouped = itertools.groupby(merged, key=lambda item: item[0])
+        return _write_items(
+            output_file, ((word, sum(count for _, count in group)) for word, group in grouped)
+        )
+
+
+def merge_shards(
+    shards: Iterable[str],
+    output_file: str,
+    fan_in: int = MERGE_FAN_IN,
+    tmp_dir: Optional[str] = None,
+) -> int:
+    """
+    Merge any number of shards into one shard with a streaming k-way merge.
+
+    Memory use is bounded by one line per open shard. When there are more than `fan_in`
+    shards they are merged in several passes through temporary shards.
+
+    Args:
+        shards (Iterable[str]): Paths to the input shards.
+        output_file (str): Path to the merged shard.
+        fan_in (int): Maximum number of shards merged at once.
+        tmp_dir (Optional[str]): Directory for the temporary shards.
+
+    Returns:
+        int: Number of distinct words in the merged shard.
+    """
+    if fan_in < 2:
+        raise ValueError("fan_in must be at least 2")
+    pending = [str(s) for s in shards]
+    with tempfile.TemporaryDirectory(dir=tmp_dir) as tmp:
+        level = 0
+        while len(pending) > fan_in:
+            merged = []
+            for i in range(0, len(pending), fan_in):
+                path = os.path.join(tmp, f"merge-{level}-{i // fan_in}{SHARD_SUFFIX}")
+                _merge_into(pending[i : i + fan_in], path)
+                merged.append(path)
+            pending = merged
+            level += 1
+        return _merge_into(pending, output_file)
+
+
+def _by_count(item: Tuple[str, int]) -> Tuple[int, str]:
+    return -item[1], item[0]
+
+
+def sort_shard_by_count(
+    shard_file: str,
+    output_file: str,
+    run_size: int = SORT_RUN_SIZE,
+    tmp_dir: Optional[str] = None,
+) -> int:
+    """
+    Save the words of a shard as a word,count CSV file in descending order of count.
+
+    At most `run_size` rows are sorted in memory at once. Larger shards are sorted in runs
+    that are spilled to disk and merged. Ties are broken by word.
+
+    Args:
+        shard_file (str): Path to the input shard.
+        output_file (str): Path to the output CSV file.
+        run_size (int): Maximum number of rows sorted in memory.
+        tmp_dir (Optional[str]): Directory for the sorted runs.
+
+    Returns:
+        int: Number of words written.
+    """
+    with tempfile.TemporaryDirectory(dir=tmp_dir) as tmp:
+        runs: List[str] = []
+        items = iter_shard(shard_file)
+        while True:
+            run = sorted(itertools.islice(items, run_size), key=_by_count)
+            if not run and runs:
+                break
+            path = os.path.join(tmp, f"run-{len(runs)}{SHARD_SUFFIX}")
+            _write_items(path, run)
+            runs.append(path)
+            if len(run) < run_size:
+                break
+        with contextlib.ExitStack() as stack:
+            streams = [stack.enter_context(contextlib.closing(iter_shard(r))) for r in runs]
+            n = 0
+            with open(output_file, "w", encoding="utf-8") as f:
+                f.write("word,count\n")
+                for word, count in heapq.merge(*streams, key=_by_count):
+                    f.write(f"{word},{count}\n")
+                    n += 1
+    return n
+
+
+@app.command()
+def merge(
+    shards: List[Path],
+    output_path: Path = ANALYZED_DIR / f"merged{SHARD_SUFFIX}",
+    fan_in: int = MERGE_FAN_IN,
+):
+    """
+    Merge word count shards into one shard sorted by word.
+    """
+    logger.info(f"Merging {len(shards)} shards into {output_path}")
+    start = time.perf_counter()
+    n = merge_shards([str(s) for s in shards], str(output_path), fan_in)
+    logger.success(f"Merged {n} words in {time.perf_counter() - start:.2f} s")
+
+
+@app.command()
+def sort(
+    shard_path: Path = ANALYZED_DIR / f"merged{SHARD_SUFFIX}",
+    output_path: Path = ANALYZED_DIR / "word_counts.csv",
+    run_size: int = SORT_RUN_SIZE,
+):
+    """
+    Save a shard as a word,count CSV file sorted by descending count.
+    """
+    logger.info(f"Sorting {shard_path} by count")
+    n = sort_shard_by_count(str(shard_path), str(output_path), run_size)
+    logger.success(f"Saved {n} word counts to {output_path}")
+
+
+if __name__ == "__main__":
+    app()
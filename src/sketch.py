@@ -0,0 +1,187 @@
+import hashlib
+import heapq
+import math
+from typing import Dict, List, Mapping, Tuple
+
+import numpy as np
+
+# Fixed-memory summaries for approximate word counts of unbounded corpora. Both summaries
+# take weighted updates, e.g. the exact counts of one chunk of text, and can be merged, so
+# summaries built by separate workers or on separate books combine into one.
+
+
+def _word_hashes(words: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Return two independent 64-bit hashes of every word, stable across processes.
+    """
+    digests = b"".join(hashlib.blake2b(w.encode("utf-8"), digest_size=16).digest() for w in words)
+    hashes = np.frombuffer(digests, dtype=np.uint64).reshape(-1, 2)
+    return hashes[:, 0], hashes[:, 1] | np.uint64(1)
+
+
+class CountMinSketch:
+    """
+    Count-Min Sketch of word counts with `depth` rows of `width` counters.
+    Point queries never underestimate, and overestimate by at most epsilon * total with
+    probability at least 1 - delta, where epsilon = e / width and delta = exp(-depth).
+    """
+
+    def __init__(self, width: int = 1 << 16, depth: int = 4):
+        if width < 1 or depth < 1:
+            raise ValueError("width and depth must be positive")
+        self.width = width
+        self.depth = depth
+        self.table = np.zeros((depth, width), dtype=np.int64)
+        self.total = 0
+
+    @property
+    def epsilon(self) -> float:
+        return math.e / self.width
+
+    @property
+    def delta(self) -> float:
+        return math.exp(-self.depth)
+
+    def _columns(self, words: List[str]) -> np.ndarray:
+        """
+        Return the (depth, len(words)) column indices of the words, by double hashing.
+        """
+        h1, h2 = _word_hashes(words)
+        rows = np.arange(self.depth, dtype=np.uint64)[:, None]
+        with np.errstate(over="ignore"):
+            return ((h1[None, :] + rows * h2[None, :]) % np.uint64(self.width)).astype(np.int64)
+
+    def update_counts(self, counts: Mapping[str, int]) -> None:
+        """
+        Add the counts of a word -> count mapping to the sketch.
+        """
+        if not counts:
+            return
+        columns = self._columns(list(counts))
+        weights = np.fromiter(counts.values(), dtype=np.int64, count=len(counts))
+        for row in range(self.depth):
+            np.add.at(self.table[row], columns[row], weights)
+        self.total += int(weights.sum())
+
+    def query(self, words: List[str]) -> np.ndarray:
+        """
+        Return the estimated counts of the words.
+        """
+        if not words:
+            return np.zeros(0, dtype=np.int64)
+        columns = self._columns(words)
+        return self.table[np.arange(self.depth)[:, None], columns].min(axis=0)
+
+    def merge(self, other: "CountMinSketch") -> None:
+        """
+        Add another sketch with the same width and depth into this one.
+        """
+        if (self.width, self.depth) != (other.width, other.depth):
+            raise ValueError("Only sketches with the same width and depth can be merged")
+        self.table += other.table
+        self.total += other.total
+
+
+class SpaceSaving:
+    """
+    Weighted Space-Saving summary that keeps at most `capacity` candidate heavy hitters.
+    Every kept word has an estimated count and an error: its true count lies in
+    [count - error, count], and the error never exceeds total / capacity. Any word whose
+    true count exceeds total / capacity is guaranteed to be kept.
+    """
+
+    def __init__(self, capacity: int = 10_000):
+        if capacity < 1:
+            raise ValueError("capacity must be positive")
+        self.capacity = capacity
+        self.counts: Dict[str, int] = {}
+        self.errors: Dict[str, int] = {}
+        self.total = 0
+        # Min-heap of (count, word) entries; entries are stale once the count has grown
+        self._heap: List[Tuple[int, str]] = []
+
+    def _rebuild_heap(self) -> None:
+        self._heap = [(count, word) for word, count in self.counts.items()]
+        heapq.heapify(self._heap)
+
+    def _pop_min(self) -> Tuple[int, str]:
+        """
+        Remove and return the word with the smallest count.
+        """
+        while True:
+            count, word = heapq.heappop(self._heap)
+            if self.counts.get(word) == count:
+                del self.counts[word]
+                del self.errors[word]
+                return count, word
+
+    def update(self, word: str, weight: int = 1) -> None:
+        """
+        Add `weight` occurrences of a word.
+        """
+        self.total += weight
+        if word in self.counts:
+            self.counts[word] += weight
+        elif len(self.counts) < self.capacity:
+            self.counts[word] = weight
+            self.errors[word] = 0
+        else:
+            min_count, _ = self._pop_min()
+            self.counts[word] = min_count + weight
+            self.errors[word] = min_count
+        heapq.heappush(self._heap, (self.counts[word], word))
+        if len(self._heap) > 4 * self.capacity:
+            self._rebuild_heap()
+
+    def update_counts(self, counts: Mapping[str, int]) -> None:
+        """
+        Add the counts of a word -> count mapping to the summary.
+        Heavier words are added first, so that light words only replace each other.
+        """
+        for word, weight in sorted(counts.items(), key=lambda item: -item[1]):
+            self.update(word, weight)
+
+    @property
+    def min_count(self) -> int:
+        """
+        Upper bound on the count of any word that is not kept: the smallest kept count if the
+        summary is full, otherwise 0.
+        """
+        if len(self.counts) < self.capacity:
+            return 0
+        return min(self.counts.values())
+
+    @property
+    def max_error(self) -> float:
+        """
+        Guaranteed bound on the overestimation of any count, total / capacity.
+        """
+        return self.total / self.capacity
+
+    def merge(self, other: "SpaceSaving") -> None:
+        """
+        Merge another summary into this one, keeping the `capacity` largest counts.
+        A word missing from one summary may have occurred up to that summary's min_count
+        times, which is added to both its count and its error.
+        """
+        self_min, other_min = self.min_count, other.min_count
+        counts: Dict[str, int] = {}
+        errors: Dict[str, int] = {}
+        for word in list(self.counts) + [w for w in other.counts if w not in self.counts]:
+            counts[word] = self.counts.get(word, self_min) + other.counts.get(word, other_min)
+            errors[word] = self.errors.get(word, self_min) + other.errors.get(word, other_min)
+        capacity = max(self.capacity, other.capacity)
+        kept = heapq.nlargest(capacity, counts, key=lambda w: counts[w])
+        self.capacity = capacity
+        self.counts = {word: counts[word] for word in kept}
+        self.errors = {word: errors[word] for word in kept}
+        self.total += other.total
+        self._rebuild_heap()
+
+    def top(self, k: int) -> List[Tuple[str, int, int]]:
+        """
+        Return up to k (word, count, error) triples with the largest counts.
+        Ties are broken by the word, so the result does not depend on update order.
+        """
+        ranked = sorted(self.counts.items(), key=lambda item: (-item[1], item[0]))
+        return [(word, count, self.errors[word]) for word, count in ranked[:k]]
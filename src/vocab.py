@@ -0,0 +1,224 @@
+from array import array
+from collections import Counter
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, Mapping, Optional
+
+# numpy and pandas are imported by the methods that need them, to keep startup fast
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+
+# Initial number of word IDs a CountVector has room for
+INITIAL_CAPACITY = 1 << 12
+
+
+class Vocabulary:
+    """
+    Interned vocabulary: maps every distinct word to an integer ID, in order of first
+    appearance. Every word string is stored once, however many books use it, so the counts
+    of several books can share one vocabulary and be compared and merged as arrays.
+    """
+
+    def __init__(self, words: Iterable[str] = ()):
+        self.words: List[str] = []
+        self._ids: Dict[str, int] = {}
+        self.add_all(words)
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    def __contains__(self, word: object) -> bool:
+        return word in self._ids
+
+    def get(self, word: str) -> Optional[int]:
+        """
+        Return the ID of a word, or None if it is not in the vocabulary.
+        """
+        return self._ids.get(word)
+
+    def add(self, word: str) -> int:
+        """
+        Return the ID of a word, adding the word if it is new.
+        """
+        word_id = self._ids.get(word)
+        if word_id is None:
+            word_id = self._ids[word] = len(self.words)
+            self.words.append(word)
+        return word_id
+
+    def add_all(self, words: Iterable[str]) -> "np.ndarray":
+        """
+        Return the IDs of words as an int64 array, adding the new words in order.
+
+        Args:
+            words (Iterable[str]): Words, e.g. the distinct words of a chunk of text.
+
+        Returns:
+            np.ndarray: ID of every word.
+        """
+        import numpy as np
+
+        ids = self._ids
+        words_list = self.words
+        result = array("q")
+        for word in words:
+            word_id = ids.get(word)
+            if word_id is None:
+                word_id = ids[word] = len(words_list)
+                words_list.append(word)
+            result.append(word_id)
+        return np.frombuffer(result, dtype=np.int64) if result else np.empty(0, np.int64)
+
+    def encode(self, words: List[str]) -> "np.ndarray":
+        """
+        Return the IDs of a sequence of words with repeats, e.g. the tokens of a chunk of
+        text, as an int64 array. The new words are added in order of first appearance, then
+        every word is looked up in one pass at C speed.
+        """
+        import numpy as np
+
+        self.add_all(dict.fromkeys(words))
+        return np.fromiter(map(self._ids.__getitem__, words), dtype=np.int64, count=len(words))
+
+    def save(self, filename: str) -> None:
+        """
+        Save the words, one per line in order of ID. Words never contain whitespace.
+        """
+        with open(filename, "w", encoding="utf-8") as f:
+            f.writelines(f"{word}\n" for word in self.words)
+
+    @classmethod
+    def load(cls, filename: str) -> "Vocabulary":
+        """
+        Load a vocabulary saved by `save`, with the same IDs.
+        """
+        with open(filename, encoding="utf-8") as f:
+            return cls(line.rstrip("\n") for line in f)
+
+
+class CountVector(Mapping[str, int]):
+    """
+    Word counts of one book, stored as a growable int64 array indexed by word ID.
+
+    The vector is a read-only word -> count mapping over the words it has counted, in
+    order of first appearance in the book, like the Counter of count_words. Vectors of the
+    same vocabulary can be added with `merge` and compared with `to_array`.
+    """
+
+    def __init__(self, vocabulary: Optional[Vocabulary] = None):
+        import numpy as np
+
+        self.vocabulary = vocabulary if vocabulary is not None else Vocabulary()
+        self.counts = np.zeros(INITIAL_CAPACITY, dtype=np.int64)
+        # IDs of the counted words, in order of first appearance in this book
+        self.order = array("q")
+
+    def _reserve(self, size: int) -> None:
+        if size > len(self.counts):
+            import numpy as np
+
+            counts = np.zeros(max(size, 2 * len(self.counts)), dtype=np.int64)
+            counts[: len(self.counts)] = self.counts
+            self.counts = counts
+
+    def _add_ids(self, ids: "np.ndarray", counts: "np.ndarray") -> None:
+        """
+        Add counts to distinct word IDs, given in order of first appearance.
+        """
+        if len(counts) and counts.min() <= 0:
+            if counts.min() < 0:
+                raise ValueError("Counts must not be negative")
+            ids, counts = ids[counts > 0], counts[counts > 0]
+        if len(ids):
+            self._reserve(int(ids.max()) + 1)
+        new = ids[self.counts[ids] == 0]
+        self.order.extend(new.tolist())
+        self.counts[ids] += counts
+
+    def update(self, words: Iterable[str]) -> None:
+        """
+        Count words, e.g. the tokens of one chunk of text. Only the distinct words of the
+        chunk are looked up in the vocabulary.
+        """
+        import numpy as np
+
+        chunk = Counter(words)
+        ids = self.vocabulary.add_all(chunk)
+        self._add_ids(ids, np.fromiter(chunk.values(), dtype=np.int64, count=len(chunk)))
+
+    def update_counts(self, counts: Mapping[str, int]) -> None:
+        """
+        Add the counts of a word -> count mapping.
+        """
+        import numpy as np
+
+        ids = self.vocabulary.add_all(counts)
+        self._add_ids(ids, np.fromiter(counts.values(), dtype=np.int64, count=len(counts)))
+
+    def merge(self, other: "CountVector") -> None:
+        """
+        Add the counts of another vector of the same vocabulary, as array operations.
+        """
+        if other.vocabulary is not self.vocabulary:
+            raise ValueError("Cannot merge count vectors of different vocabularies")
+        ids = other._order_ids()
+        self._add_ids(ids, other.counts[ids])
+
+    def to_array(self, size: Optional[int] = None) -> "np.ndarray":
+        """
+        Return the counts of the first `size` word IDs, by default of the whole vocabulary,
+        as a dense array: vectors of one vocabulary line up element by element.
+        """
+        import numpy as np
+
+        size = len(self.vocabulary) if size is None else size
+        result = np.zeros(size, dtype=np.int64)
+        n = min(size, len(self.counts))
+        result[:n] = self.counts[:n]
+        return result
+
+    def _order_ids(self) -> "np.ndarray":
+        import numpy as np
+
+        # A copy, since `order` cannot grow while a NumPy view of it exists
+        return np.array(self.order, dtype=np.int64)
+
+    def __getitem__(self, word: str) -> int:
+        word_id = self.vocabulary.get(word)
+        if word_id is None or word_id >= len(self.counts) or self.counts[word_id] == 0:
+            raise KeyError(word)
+        return int(self.counts[word_id])
+
+    def __iter__(self) -> Iterator[str]:
+        words = self.vocabulary.words
+        return (words[i] for i in self.order)
+
+    def __len__(self) -> int:
+        return len(self.order)
+
+    def keys(self) -> List[str]:  # type: ignore[override]
+        words = self.vocabulary.words
+        return [words[i] for i in self.order]
+
+    def values(self) -> List[int]:  # type: ignore[override]
+        return self.counts[self._order_ids()].tolist()
+
+    def items(self) -> List[tuple]:  # type: ignore[override]
+        return list(zip(self.keys(), self.values()))
+
+    def to_dataframe(self) -> "pd.DataFrame":
+        """
+        Return the DataFrame of word counts in descending order, with ties in order of first
+        appearance, exactly as counts_to_dataframe. Word strings are only gathered here.
+        """
+        import numpy as np
+        import pandas as pd
+
+        ids = self._order_ids()
+        counts = self.counts[ids]
+        order = np.argsort(-counts, kind="stable")
+        words = self.vocabulary.words
+        # Built like counts_to_dataframe, so that the columns get the same dtypes
+        index = pd.Index([words[i] for i in ids[order].tolist()])
+        counts_df = pd.Series(counts[order], index=index, dtype="int64").reset_index()
+        counts_df.columns = ["word", "count"]
+        return counts_df
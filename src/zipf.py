@@ -0,0 +1,397 @@
+from concurrent.futures import ProcessPoolExecutor
+import json
+import math
+import os
+from pathlib import Path
+import time
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Sequence, Tuple
+
+from loguru import logger
+import typer
+
+from src.config import ANALYZED_DIR, RESULT_DIR
+
+# numpy is imported when a fit is made, to keep startup fast
+if TYPE_CHECKING:
+    import numpy as np
+
+app = typer.Typer()
+
+# Zipf's law: the count of the word of rank r is about constant * r ** -exponent
+METHODS = ("lsq", "mle")
+# The maximum-likelihood fit stops when the exponent changes by less than this
+MLE_TOLERANCE = 1e-10
+MLE_MAX_ITERATIONS = 100
+# Number of bootstrap replicates fitted per worker task
+BOOTSTRAP_BATCH = 25
+# Words counted at most this often are resampled together, per count, see _resample_blocks
+POISSON_TABLE_MAX = 32
+# Largest resampled count tabulated for them; more is less likely than 1e-20
+POISSON_TABLE_SIZE = 128
+
+
+class ZipfFit:
+    """
+    Zipf's law fitted to the `n_ranks` most frequent words of a table, with an optional
+    bootstrap confidence interval of the exponent.
+    """
+
+    def __init__(
+        self,
+        method: str,
+        exponent: float,
+        constant: float,
+        n_ranks: int,
+        r_squared: Optional[float] = None,
+    ):
+        self.method = method
+        self.exponent = exponent
+        self.constant = constant
+        self.n_ranks = n_ranks
+        # Coefficient of determination of the log-log regression, for method "lsq"
+        self.r_squared = r_squared
+        self.interval: Optional[Tuple[float, float]] = None
+        # Median of the bootstrap replicates minus the exponent
+        self.bias: Optional[float] = None
+        self.confidence: Optional[float] = None
+        self.n_boot = 0
+
+    def predict(self, ranks: Sequence[int]) -> "np.ndarray":
+        """
+        Return the fitted counts of words of the given ranks, starting at 1.
+        """
+        import numpy as np
+
+        return self.constant * np.asarray(ranks, dtype=np.float64) ** -self.exponent
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "method": self.method,
+            "exponent": self.exponent,
+            "constant": self.constant,
+            "n_ranks": self.n_ranks,
+            "r_squared": self.r_squared,
+            "interval": list(self.interval) if self.interval else None,
+            "bias": self.bias,
+            "confidence": self.confidence,
+            "n_boot": self.n_boot,
+        }
+
+    def __repr__(self) -> str:
+        return f"ZipfFit({self.method!r}, exponent={self.exponent:.4f}, n_ranks={self.n_ranks})"
+
+
+def rank_blocks(
+    counts: "np.ndarray", max_rank: Optional[int] = None
+) -> Tuple["np.ndarray", "np.ndarray"]:
+    """
+    Group the positive counts of a table by value, in descending order. Words with equal
+    counts hold consecutive ranks, so the rank-frequency curve is a few thousand blocks
+    even for a million words, and sums over ranks are computed per block.
+
+    Args:
+        counts (np.ndarray): Word counts in any order; zero counts are ignored.
+        max_rank (Optional[int]): Only keep the ranks up to max_rank.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: Distinct counts in descending order, and the last
+        rank of every block.
+    """
+    import numpy as np
+
+    counts = np.asarray(counts, dtype=np.int64)
+    values, sizes = np.unique(counts[counts > 0], return_counts=True)
+    return _truncate(values[::-1], np.cumsum(sizes[::-1]), max_rank)
+
+
+def _truncate(
+    values: "np.ndarray", ends: "np.ndarray", max_rank: Optional[int]
+) -> Tuple["np.ndarray", "np.ndarray"]:
+    import numpy as np
+
+    if max_rank is not None and len(ends) and ends[-1] > max_rank:
+        keep = int(np.searchsorted(ends, max_rank)) + 1
+        values, ends = values[:keep], np.minimum(ends[:keep], max_rank)
+    return values, ends
+
+
+def _resample_blocks(
+    rng: "np.random.Generator", values: "np.ndarray", sizes: "np.ndarray"
+) -> Tuple["np.ndarray", "np.ndarray"]:
+    """
+    Redraw every word count from a Poisson distribution with the count as mean, and return
+    the new rank blocks as rank_blocks would. Only the number of words of every new count
+    matters, so the words sharing a small count are resampled together: how many of them
+    get each new count is one multinomial draw over the Poisson probabilities.
+    """
+    import numpy as np
+
+    small = values <= POISSON_TABLE_MAX
+    k = np.arange(POISSON_TABLE_SIZE)
+    log_factorial = np.concatenate(([0.0], np.cumsum(np.log(k[1:]))))
+    means = values[small].astype(np.float64)[:, None]
+    pmf = np.exp(k * np.log(means) - means - log_factorial)
+    table = rng.multinomial(sizes[small], pmf).sum(axis=0)
+    draws = rng.poisson(np.repeat(values[~small], sizes[~small]))
+    new_values = np.concatenate((k[1:], draws))
+    multiplicity = np.concatenate((table[1:], np.ones(len(draws), dtype=np.int64)))
+    values, inverse = np.unique(new_values, return_inverse=True)
+    sizes = np.bincount(inverse, weights=multiplicity).astype(np.int64)
+    values, sizes = values[sizes > 0][::-1], sizes[sizes > 0][::-1]
+    return values, np.cumsum(sizes)
+
+
+class _RankSums:
+    """
+    Logarithms of the ranks 1..n and their prefix sums, shared by the fits of one table
+    and of its bootstrap replicates, none of which has more than n ranks.
+    """
+
+    def __init__(self, n: int):
+        import numpy as np
+
+        self.log_ranks = np.log(np.arange(1, n + 1, dtype=np.float64))
+        self.log_ranks_sq = self.log_ranks**2
+        self.sum_log = np.concatenate(([0.0], np.cumsum(self.log_ranks)))
+        self.sum_log_sq = np.concatenate(([0.0], np.cumsum(self.log_ranks_sq)))
+
+    def fit_lsq(self, values: "np.ndarray", ends: "np.ndarray") -> ZipfFit:
+        """
+        Fit log(count) = log(constant) - exponent * log(rank) by least squares over every
+        rank, in closed form from the per-block sums.
+        """
+        import numpy as np
+
+        n = int(ends[-1]) if len(ends) else 0
+        if n < 2:
+            raise ValueError("At least two ranks are needed to fit Zipf's law")
+        starts = np.concatenate(([0], ends[:-1]))
+        sizes = ends - starts
+        log_values = np.log(values)
+        block_x = self.sum_log[ends] - self.sum_log[starts]
+        sx = block_x.sum()
+        sxx = (self.sum_log_sq[ends] - self.sum_log_sq[starts]).sum()
+        sy = (sizes * log_values).sum()
+        sxy = (log_values * block_x).sum()
+        syy = (sizes * log_values**2).sum()
+        var_x = sxx - sx * sx / n
+        var_y = syy - sy * sy / n
+        cov = sxy - sx * sy / n
+        slope = cov / var_x
+        intercept = (sy - slope * sx) / n
+        r_squared = cov * cov / (var_x * var_y) if var_y > 0 else 1.0
+        return ZipfFit("lsq", -slope, math.exp(intercept), n, float(r_squared))
+
+    def fit_mle(self, values: "np.ndarray", ends: "np.ndarray", start: float = 1.0) -> ZipfFit:
+        """
+        Fit the exponent by maximum likelihood: every token has rank r with probability
+        r ** -exponent / H, where H normalises over the fitted ranks. The log-likelihood is
+        concave in the exponent, so Newton's method converges from any positive start.
+        """
+        import numpy as np
+
+        n = int(ends[-1]) if len(ends) else 0
+        if n < 2:
+            raise ValueError("At least two ranks are needed to fit Zipf's law")
+        starts = np.concatenate(([0], ends[:-1]))
+        values = values.astype(np.float64)
+        total = (values * (ends - starts)).sum()
+        # Sum of log(rank) over every token
+        sum_log = (values * (self.sum_log[ends] - self.sum_log[starts])).sum()
+        log_ranks = self.log_ranks[:n]
+        log_ranks_sq = self.log_ranks_sq[:n]
+        exponent = max(start, 0.0)
+        for _ in range(MLE_MAX_ITERATIONS):
+            weights = np.exp(-exponent * log_ranks)
+            norm = weights.sum()
+            mean = weights @ log_ranks / norm
+            variance = weights @ log_ranks_sq / norm - mean * mean
+            if variance <= 0:
+                break
+            # Newton step on the derivative total * mean - sum_log of the log-likelihood
+            step = (total * mean - sum_log) / (total * variance)
+            new = exponent + step
+            new = new if new >= 0 else exponent / 2
+            converged = abs(new - exponent) < MLE_TOLERANCE
+            exponent = new
+            if converged:
+                break
+        norm = np.exp(-exponent * log_ranks).sum()
+        return ZipfFit("mle", float(exponent), float(total / norm), n)
+
+    def fit(self, method: str, values: "np.ndarray", ends: "np.ndarray", start: float) -> ZipfFit:
+        if method == "lsq":
+            return self.fit_lsq(values, ends)
+        return self.fit_mle(values, ends, start)
+
+
+def _bootstrap_task(
+    task: Tuple["np.ndarray", "np.ndarray", str, Optional[int], float, List[Any]],
+) -> List[float]:
+    """
+    Fit the exponent of bootstrap replicates of rank blocks; runs in a worker process.
+    """
+    import numpy as np
+
+    values, sizes, method, max_rank, start, seeds = task
+    n = int(sizes.sum())
+    sums = _RankSums(n if max_rank is None else min(n, max_rank))
+    exponents = []
+    for seed in seeds:
+        blocks = _resample_blocks(np.random.default_rng(seed), values, sizes)
+        exponents.append(sums.fit(method, *_truncate(*blocks, max_rank), start).exponent)
+    return exponents
+
+
+def bootstrap_exponents(
+    counts: "np.ndarray",
+    method: str = "mle",
+    n_boot: int = 200,
+    max_rank: Optional[int] = None,
+    workers: int = 1,
+    seed: int = 0,
+    start: float = 1.0,
+) -> "np.ndarray":
+    """
+    Fit the exponent of `n_boot` bootstrap replicates of a table in worker processes.
+
+    Every replicate redraws each word count from a Poisson distribution with the observed
+    count as mean, which approximates resampling the tokens of the text with replacement.
+    Words may drop out, and the ranks are assigned again.
+    Every replicate has its own seed spawned from `seed`, so the result does not depend on
+    the number of workers.
+
+    Args:
+        counts (np.ndarray): Word counts in any order.
+        method (str): Fitting method, one of METHODS.
+        n_boot (int): Number of replicates.
+        max_rank (Optional[int]): Only fit the ranks up to max_rank.
+        workers (int): Number of worker processes; 1 fits in this process.
+        seed (int): Seed of the random replicates.
+        start (float): Initial exponent of the maximum-likelihood fits, e.g. the point fit.
+
+    Returns:
+        np.ndarray: Fitted exponent of every replicate.
+    """
+    import numpy as np
+
+    if method not in METHODS:
+        raise ValueError(f"Unknown method {method!r}, choose from {', '.join(METHODS)}")
+    values, ends = rank_blocks(counts)
+    sizes = np.diff(ends, prepend=0)
+    seeds = np.random.SeedSequence(seed).spawn(n_boot)
+    tasks = [
+        (values, sizes, method, max_rank, start, seeds[i : i + BOOTSTRAP_BATCH])
+        for i in range(0, n_boot, BOOTSTRAP_BATCH)
+    ]
+    if workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_bootstrap_task, tasks))
+    else:
+        results = [_bootstrap_task(task) for task in tasks]
+    return np.array([exponent for result in results for exponent in result], dtype=np.float64)
+
+
+def fit_zipf(
+    counts: "np.ndarray",
+    method: str = "mle",
+    max_rank: Optional[int] = None,
+    n_boot: int = 0,
+    confidence: float = 0.95,
+    workers: int = 1,
+    seed: int = 0,
+) -> ZipfFit:
+    """
+    Fit Zipf's law to the word counts of a table, e.g. the 'count' column of word_count.
+
+    Args:
+        counts (np.ndarray): Word counts in any order.
+        method (str): "lsq" for a least-squares fit of the log-log rank-frequency curve,
+            or "mle" for the maximum-likelihood exponent.
+        max_rank (Optional[int]): Only fit the ranks up to max_rank.
+        n_boot (int): Number of bootstrap replicates of the confidence interval; 0 for none.
+        confidence (float): Confidence level of the interval.
+        workers (int): Number of worker processes of the bootstrap.
+        seed (int): Seed of the bootstrap.
+
+    Returns:
+        ZipfFit: The fit, with `interval` and `bias` set if n_boot > 0.
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown method {method!r}, choose from {', '.join(METHODS)}")
+    values, ends = rank_blocks(counts, max_rank)
+    sums = _RankSums(int(ends[-1]) if len(ends) else 0)
+    start = sums.fit_lsq(values, ends).exponent if method == "mle" else 1.0
+    fit = sums.fit(method, values, ends, max(start, 0.1))
+    if n_boot > 0:
+        import numpy as np
+
+        exponents = bootstrap_exponents(
+            counts, method, n_boot, max_rank, workers, seed, fit.exponent
+        )
+        # Resampling drops rare words, which biases the replicates; the percentile interval
+        # is taken once that bias is removed, so it always contains the median, i.e. the fit
+        fit.bias = float(np.median(exponents) - fit.exponent)
+        alpha = (1 - confidence) / 2
+        low, high = np.quantile(exponents - fit.bias, [alpha, 1 - alpha])
+        fit.interval = (min(float(low), fit.exponent), max(float(high), fit.exponent))
+        fit.confidence = confidence
+        fit.n_boot = n_boot
+    return fit
+
+
+@app.command()
+def main(
+    input_path: Path = ANALYZED_DIR / "word_counts.csv",
+    output_path: Path = RESULT_DIR / "zipf.json",
+    max_rank: Optional[int] = typer.Option(None, help="Only fit the MAX_RANK top words."),
+    bootstrap: int = typer.Option(200, help="Number of bootstrap replicates, 0 for none."),
+    confidence: float = 0.95,
+    workers: int = os.cpu_count() or 1,
+    seed: int = 0,
+    plot_path: Optional[Path] = typer.Option(
+        None, help="Also plot the rank-frequency curve with the fits."
+    ),
+):
+    """
+    Fit Zipf's law to a table of word counts by least squares and maximum likelihood.
+    """
+    from src.formats import read_word_counts
+
+    logger.info(f"Fitting Zipf's law to {input_path}")
+    counts = read_word_counts(str(input_path))["count"].to_numpy(dtype="int64")
+    fits = []
+    for method in METHODS:
+        start = time.perf_counter()
+        try:
+            fit = fit_zipf(counts, method, max_rank, bootstrap, confidence, workers, seed)
+        except ValueError as e:
+            raise typer.BadParameter(f"{input_path}: {e}", param_hint="input_path")
+        elapsed = time.perf_counter() - start
+        interval = (
+            f", {confidence:.0%} interval [{fit.interval[0]:.4f}, {fit.interval[1]:.4f}]"
+            f" (bootstrap bias {fit.bias:+.4f})"
+            if fit.interval
+            else ""
+        )
+        logger.info(
+            f"{method}: exponent {fit.exponent:.4f}{interval} over {fit.n_ranks} ranks "
+            f"in {elapsed:.2f} s"
+        )
+        fits.append(fit)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump([fit.to_dict() for fit in fits], f, indent=2)
+    logger.success(f"Zipf fits saved to {output_path}")
+    if plot_path:
+        from src.plots import plot_rank_frequency, pyplot
+
+        plot_rank_frequency(counts, fits)
+        plt = pyplot()
+        plt.savefig(plot_path)
+        plt.close()
+        logger.success(f"Rank-frequency plot saved to {plot_path}")
+
+
+if __name__ == "__main__":
+    app()
@@ -1,3 +1,4 @@
+import gzip
 from pathlib import Path
 from typing import Any, List
 
@@ -6,8 +7,23 @@ import pytest
 
 from src.analysis import (
     DELIMITERS,
+    RegexTokenizer,
+    SubSplitTokenizer,
+    Tokenizer,
+    approximate_word_count,
     calculate_word_counts,
+    count_words,
+    counts_to_dataframe,
+    incremental_state_path,
+    incremental_word_count,
+    ngram_count_words,
+    ngram_word_count,
+    pandas_count_words,
+    parallel_count_words,
     save_word_counts,
+    sketch_to_dataframe,
+    sketch_word_counts,
+    top_k_dataframe,
     word_count,
 )
 
@@ -104,6 +120,91 @@ def test_whitespace_handling(whitespace_lines: List[str]):
     assert word_counts["test"] == 1
 
 
+def test_count_words_generator(simple_lines: List[str]):
+    """Test that count_words consumes a generator and returns a running word -> count table."""
+    counts = count_words(line for line in simple_lines)
+    assert counts == {"hello": 2, "world": 2, "there": 1, "peace": 1}
+    assert list(counts) == ["hello", "world", "there", "peace"]
+
+
+def test_count_words_min_length_before_lowercase():
+    """Test that min_length is applied to the word as written, before case folding."""
+    counts = count_words(["\u0130 ab"], min_length=2)
+    assert counts == {"ab": 1}
+
+
+def test_counts_to_dataframe_matches_value_counts():
+    """Test that tied counts are ordered exactly as pd.Series.value_counts orders them."""
+    words = ["b", "a", "c", "a", "b", "d", "e", "c"] * 3 + ["z", "y"]
+    expected = pd.Series(words).value_counts().reset_index()
+    expected.columns = ["word", "count"]
+    result = counts_to_dataframe(count_words([" ".join(words)]))
+    assert result.to_csv(index=False) == expected.to_csv(index=False)
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "Hello, World! my-word(test) 'quoted' \"double\" a/b\\c",
+        "  tabs\tand\nnewlines\r\nand\x1cseparators\u2028here  ",
+        "\u0130stanbul \u0130 ab",
+        "ΟΔΟΣ.ABC ΟΔΟΣ Σ ΟΔΟΣ\u2019ABC",
+        "",
+    ],
+)
+@pytest.mark.parametrize("min_length", [1, 2, 4])
+def test_regex_tokenizer_matches_reference(text: str, min_length: int):
+    """Test that the single-pass tokenizer gives exactly the words of the reference tokenizer."""
+    expected = SubSplitTokenizer().tokenize(text, min_length)
+    assert RegexTokenizer().tokenize(text, min_length) == expected
+
+
+def test_tokenizer_requires_tokenize():
+    """Test that a tokenizer without a tokenize method cannot be created."""
+
+    class NoTokenizer(Tokenizer):
+        pass
+
+    with pytest.raises(TypeError):
+        NoTokenizer()
+
+
+def test_count_words_blocks_match_lines(simple_lines: List[str]):
+    """Test that counting whole blocks of text gives the same counts as counting lines."""
+    block = "\n".join(simple_lines)
+    assert list(count_words([block]).items()) == list(count_words(simple_lines).items())
+
+
+@pytest.mark.parametrize("min_length", [1, 3])
+def test_pandas_backend_matches_python(min_length: int):
+    """Test that the pandas backend gives the same DataFrame as the Python backend."""
+    lines = [
+        "Hello, World! my-word(test)",
+        "",
+        "  HELLO\tworld  ",
+        "a bb ccc \u0130 dddd",
+        "ΟΔΟΣ.ABC",
+    ]
+    expected = calculate_word_counts(lines, min_length)
+    result = calculate_word_counts(lines, min_length, backend="pandas")
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_pandas_backend_blocks_and_empty_input():
+    """Test that the pandas backend accepts blocks of lines and empty input."""
+    counts = pandas_count_words(["hello world\nhello there\n", "world peace"])
+    assert list(counts.items()) == [("hello", 2), ("world", 2), ("there", 1), ("peace", 1)]
+    result = calculate_word_counts([], backend="pandas")
+    assert list(result.columns) == ["word", "count"]
+    assert len(result) == 0
+
+
+def test_unknown_backend():
+    """Test that an unknown backend name raises a ValueError."""
+    with pytest.raises(ValueError):
+        calculate_word_counts(["hello"], backend="spark")
+
+
 @pytest.fixture
 def wordcount_df():
     return pd.DataFrame({"word": ["hello", "world", "test"], "count": [3, 2, 1]})
@@ -119,7 +220,9 @@ def test_save_to_csv(wordcount_df: pd.DataFrame, tmp_path: Path):
 
 def test_word_count_integration(mocker: Any):
     """Test integration of word_count with mocked load and save functions."""
-    mock_load = mocker.patch("src.analysis.load_text", return_value=["hello world", "hello there"])
+    mock_load = mocker.patch(
+        "src.analysis.iter_chunks", return_value=iter(["hello world\nhello there\n"])
+    )
     mock_save = mocker.patch("src.analysis.save_word_counts")
     word_count("input.txt", "output.csv", min_length=1)
     mock_load.assert_called_once_with("input.txt")
@@ -140,3 +243,179 @@ def test_delimiters_constant():
     expected_chars = ".,;:?$@^<>#%`!*-=()[]{}/'\""
     for char in expected_chars:
         assert char in DELIMITERS or f"\\{char}" in DELIMITERS
+
+
+def test_parallel_count_words_matches_serial(tmp_path: Path):
+    """Test that parallel counting gives the same counts and key order as a serial run."""
+    file_path = tmp_path / "book.txt"
+    lines = [f"Word{i % 7} line-{i % 5}, shared; tëxt {i % 3}" for i in range(200)]
+    file_path.write_text("\n".join(lines), encoding="utf-8")
+    expected = count_words(lines, min_length=2)
+    result = parallel_count_words(str(file_path), min_length=2, workers=3)
+    assert result == expected
+    assert list(result) == list(expected)
+
+
+def test_word_count_workers_same_csv(tmp_path: Path):
+    """Test that word_count writes byte-identical CSV files with and without workers."""
+    input_path = tmp_path / "book.txt"
+    input_path.write_text("b a c a\nb d e c\n" * 50 + "z y\n", encoding="utf-8")
+    serial_path = tmp_path / "serial.csv"
+    parallel_path = tmp_path / "parallel.csv"
+    word_count(str(input_path), str(serial_path))
+    word_count(str(input_path), str(parallel_path), workers=4)
+    assert parallel_path.read_text() == serial_path.read_text()
+
+
+@pytest.mark.parametrize("workers", [1, 3])
+def test_word_count_compressed_input(tmp_path: Path, workers: int):
+    """Test that a gzip-compressed input gives the same CSV as the plain file."""
+    content = "b a c a\nb d e c\n" * 50 + "z y\n"
+    input_path = tmp_path / "book.txt"
+    input_path.write_text(content, encoding="utf-8")
+    packed_path = tmp_path / "book.txt.gz"
+    packed_path.write_bytes(gzip.compress(content.encode("utf-8")))
+    plain_path = tmp_path / "plain.csv"
+    packed_csv_path = tmp_path / "packed.csv"
+    word_count(str(input_path), str(plain_path))
+    word_count(str(packed_path), str(packed_csv_path), workers=workers)
+    assert packed_csv_path.read_text() == plain_path.read_text()
+
+
+def test_incremental_word_count_rejects_compressed(tmp_path: Path):
+    """Test that a compressed file cannot be counted incrementally."""
+    packed_path = tmp_path / "log.txt.gz"
+    packed_path.write_bytes(gzip.compress(b"a b\n"))
+    with pytest.raises(ValueError, match="incrementally"):
+        incremental_word_count(str(packed_path), str(tmp_path / "counts.csv"))
+
+
+def test_ngram_count_words_spans_lines():
+    """Test that n-grams are formed over the token stream, across lines and delimiters."""
+    counts = ngram_count_words(["The cat, the", "cat sat.", "", "The cat"], n=2)
+    df = counts.to_dataframe()
+    assert df.values.tolist() == [["the cat", 3], ["cat the", 1], ["cat sat", 1], ["sat the", 1]]
+
+
+def test_ngram_word_count_csv(tmp_path: Path):
+    """Test that n-grams are saved in the word,count layout."""
+    input_path = tmp_path / "book.txt"
+    input_path.write_text("a b a b\nc a b\n", encoding="utf-8")
+    output_path = tmp_path / "bigrams.csv"
+    ngram_word_count(str(input_path), str(output_path), n=2, top_k=2)
+    assert output_path.read_text() == "word,count\na b,3\nb a,1\n"
+
+
+def test_incremental_word_count_appends(tmp_path: Path):
+    """Test that appended text is counted on its own and merged into identical output."""
+    input_path = tmp_path / "log.txt"
+    output_path = tmp_path / "counts.csv"
+    expected_path = tmp_path / "expected.csv"
+    input_path.write_text("b a c\na b\npartial wo", encoding="utf-8")
+    assert incremental_word_count(str(input_path), str(output_path)) == input_path.stat().st_size
+    word_count(str(input_path), str(expected_path))
+    assert output_path.read_text() == expected_path.read_text()
+
+    with open(input_path, "a", encoding="utf-8") as f:
+        f.write("rd\nd a new\n")
+    first_size = len("b a c\na b\n")
+    counted = incremental_word_count(str(input_path), str(output_path))
+    assert counted == input_path.stat().st_size - first_size
+    word_count(str(input_path), str(expected_path))
+    assert output_path.read_text() == expected_path.read_text()
+    assert incremental_state_path(str(output_path)).is_file()
+
+
+@pytest.mark.parametrize("new_content", ["b a\n", "x y z\nx y z\nx y z\n"])
+def test_incremental_word_count_rewritten_file(tmp_path: Path, new_content: str):
+    """Test that a truncated or rewritten file falls back to a full recount."""
+    input_path = tmp_path / "log.txt"
+    output_path = tmp_path / "counts.csv"
+    expected_path = tmp_path / "expected.csv"
+    input_path.write_text("b a c\na b\nc c\n", encoding="utf-8")
+    incremental_word_count(str(input_path), str(output_path))
+    input_path.write_text(new_content, encoding="utf-8")
+    assert incremental_word_count(str(input_path), str(output_path)) == len(new_content)
+    word_count(str(input_path), str(expected_path))
+    assert output_path.read_text() == expected_path.read_text()
+
+
+def test_incremental_word_count_rewritten_middle(tmp_path: Path):
+    """Test that a same-size rewrite deep inside the counted prefix forces a full recount."""
+    input_path = tmp_path / "log.txt"
+    output_path = tmp_path / "counts.csv"
+    expected_path = tmp_path / "expected.csv"
+    lines = ["alpha beta gamma\n"] * 30_000
+    input_path.write_text("".join(lines), encoding="utf-8")
+    incremental_word_count(str(input_path), str(output_path))
+    lines[len(lines) // 2] = "delta beta gamma\n"
+    input_path.write_text("".join(lines), encoding="utf-8")
+    size = input_path.stat().st_size
+    assert incremental_word_count(str(input_path), str(output_path)) == size
+    word_count(str(input_path), str(expected_path))
+    assert output_path.read_text() == expected_path.read_text()
+
+
+def test_incremental_word_count_min_length_change(tmp_path: Path):
+    """Test that changing min_length discards the stored counts."""
+    input_path = tmp_path / "log.txt"
+    output_path = tmp_path / "counts.csv"
+    input_path.write_text("a bb ccc\n", encoding="utf-8")
+    incremental_word_count(str(input_path), str(output_path))
+    assert incremental_word_count(str(input_path), str(output_path), min_length=2) == 9
+    result = pd.read_csv(output_path)
+    assert list(result["word"]) == ["bb", "ccc"]
+
+
+@pytest.mark.parametrize("k", [1, 2, 3, 4, 5, 10])
+def test_top_k_matches_full_sort(k: int):
+    """Test that the top-k selection equals the head of the full sort, including ties."""
+    counts = count_words(["b a c a b d e c f", "g f e e h a"])
+    expected = counts_to_dataframe(counts).head(k).reset_index(drop=True)
+    pd.testing.assert_frame_equal(top_k_dataframe(counts, k), expected)
+
+
+def test_top_k_zero():
+    """Test that k=0 gives an empty DataFrame of word counts."""
+    result = top_k_dataframe(count_words(["hello world"]), 0)
+    assert list(result.columns) == ["word", "count"]
+    assert len(result) == 0
+
+
+def test_word_count_top_k(tmp_path: Path):
+    """Test that word_count only saves the top_k rows."""
+    input_path = tmp_path / "book.txt"
+    output_path = tmp_path / "counts.csv"
+    input_path.write_text("b a c a\nb d e c a\n", encoding="utf-8")
+    word_count(str(input_path), str(output_path), top_k=2)
+    result = pd.read_csv(output_path)
+    assert list(zip(result["word"], result["count"])) == [("a", 3), ("b", 2)]
+
+
+def test_sketch_word_counts_exact_for_small_vocabulary(simple_lines: List[str]):
+    """Test that approximate counts equal the exact counts when every word fits."""
+    summary, sketch = sketch_word_counts(simple_lines, capacity=10)
+    result = sketch_to_dataframe(summary, sketch)
+    expected = counts_to_dataframe(count_words(simple_lines))
+    assert sorted(zip(result["word"], result["count"])) == sorted(
+        zip(expected["word"], expected["count"])
+    )
+
+
+def test_approximate_word_count_workers(tmp_path: Path):
+    """Test that sketches from several workers merge into the same word,count CSV."""
+    input_path = tmp_path / "book.txt"
+    input_path.write_text("the cat and the hat\n" * 50 + "a rare word\n", encoding="utf-8")
+    outputs = []
+    for workers in (1, 2):
+        output_path = tmp_path / f"counts_{workers}.csv"
+        bounds = approximate_word_count(
+            str(input_path), str(output_path), workers=workers, capacity=5, top_k=2
+        )
+        assert bounds["total"] == 253
+        assert bounds["space_saving_max_error"] == 253 / 5
+        outputs.append(output_path.read_text(encoding="utf-8"))
+    assert outputs[0] == outputs[1]
+    result = pd.read_csv(tmp_path / "counts_1.csv")
+    assert list(result.columns) == ["word", "count"]
+    assert list(zip(result["word"], result["count"])) == [("the", 100), ("and", 50)]
@@ -0,0 +1,130 @@
+import os
+from pathlib import Path
+from typing import List
+
+import pytest
+
+from src.cache import cache_get, cache_key, cache_put, cached_step, evict, file_digest
+
+# ------------------- Fixtures -------------------
+
+
+@pytest.fixture
+def cache_dir(tmp_path: Path):
+    return tmp_path / "cache"
+
+
+@pytest.fixture
+def input_file(tmp_path: Path):
+    file_path = tmp_path / "input.txt"
+    file_path.write_text("hello world", encoding="utf-8")
+    return file_path
+
+
+# ------------------- Tests -------------------
+
+
+def test_file_digest_depends_on_content(tmp_path: Path, input_file: Path):
+    """Test that the digest depends on the file content, not on its name."""
+    copy_path = tmp_path / "copy.txt"
+    copy_path.write_text("hello world", encoding="utf-8")
+    assert file_digest(str(input_file)) == file_digest(str(copy_path))
+    copy_path.write_text("hello there", encoding="utf-8")
+    assert file_digest(str(input_file)) != file_digest(str(copy_path))
+
+
+def test_cache_key_depends_on_params():
+    """Test that the cache key changes with the stage and its parameters."""
+    key = cache_key("count", "abc", {"min_length": 1})
+    assert key == cache_key("count", "abc", {"min_length": 1})
+    assert key != cache_key("count", "abc", {"min_length": 2})
+    assert key != cache_key("clean", "abc", {"min_length": 1})
+
+
+def test_cached_step_reuses_output(tmp_path: Path, input_file: Path, cache_dir: Path):
+    """Test that a second run with the same input content is served from the cache."""
+    output_file = tmp_path / "output.csv"
+    calls: List[int] = []
+
+    def compute():
+        calls.append(1)
+        output_file.write_text("word,count\nhello,1\n", encoding="utf-8")
+
+    assert not cached_step("count", str(input_file), str(output_file), {}, compute, cache_dir=cache_dir)
+    output_file.unlink()
+    assert cached_step("count", str(input_file), str(output_file), {}, compute, cache_dir=cache_dir)
+    assert len(calls) == 1
+    assert output_file.read_text(encoding="utf-8") == "word,count\nhello,1\n"
+
+
+def test_cached_step_no_cache(tmp_path: Path, input_file: Path, cache_dir: Path):
+    """Test that use_cache=False always runs the stage and leaves the cache empty."""
+    output_file = tmp_path / "output.csv"
+    calls: List[int] = []
+
+    def compute():
+        calls.append(1)
+        output_file.write_text("data", encoding="utf-8")
+
+    for _ in range(2):
+        cached_step("count", str(input_file), str(output_file), {}, compute, False, cache_dir)
+    assert len(calls) == 2
+    assert not cache_dir.exists()
+
+
+def test_evict_least_recently_used(tmp_path: Path, cache_dir: Path):
+    """Test that eviction removes the least recently used entries first."""
+    source = tmp_path / "source.txt"
+    source.write_text("x" * 100, encoding="utf-8")
+    for i, key in enumerate(["old", "mid", "new"]):
+        path = cache_put(key, str(source), ".txt", cache_dir, max_bytes=1000)
+        os.utime(path, (i, i))
+    assert cache_get("old", ".txt", cache_dir) is not None  # marks "old" as recently used
+    assert evict(max_bytes=250, cache_dir=cache_dir) == 1
+    assert cache_get("mid", ".txt", cache_dir) is None
+    assert cache_get("old", ".txt", cache_dir) is not None
+    assert cache_get("new", ".txt", cache_dir) is not None
+
+
+def test_entries_evicted_by_another_worker(
+    tmp_path: Path, input_file: Path, cache_dir: Path, monkeypatch: pytest.MonkeyPatch
+):
+    """Test that an entry removed by another worker mid-lookup is a miss, not an error."""
+    source = tmp_path / "source.txt"
+    source.write_text("x" * 100, encoding="utf-8")
+    path = cache_put("gone", str(source), ".txt", cache_dir)
+    utime = os.utime
+
+    def utime_after_eviction(filename, *args, **kwargs):
+        Path(filename).unlink()
+        utime(filename, *args, **kwargs)
+
+    monkeypatch.setattr(os, "utime", utime_after_eviction)
+    assert cache_get("gone", ".txt", cache_dir) is None
+    monkeypatch.undo()
+
+    cache_put("gone", str(source), ".txt", cache_dir)
+    is_file = Path.is_file
+
+    def is_file_before_eviction(self: Path) -> bool:
+        found = is_file(self)
+        self.unlink(missing_ok=True)
+        return found
+
+    monkeypatch.setattr(Path, "is_file", is_file_before_eviction)
+    assert evict(max_bytes=0, cache_dir=cache_dir) == 0
+    monkeypatch.undo()
+
+    output_file = tmp_path / "output.csv"
+    calls: List[int] = []
+
+    def compute():
+        calls.append(1)
+        output_file.write_text("word,count\nhello,1\n", encoding="utf-8")
+
+    monkeypatch.setattr("src.cache.cache_get", lambda *args: path)
+    assert not path.exists()
+    assert not cached_step(
+        "count", str(input_file), str(output_file), {}, compute, cache_dir=cache_dir
+    )
+    assert len(calls) == 1
@@ -0,0 +1,104 @@
+import os
+from pathlib import Path
+from typing import List
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.__main__ import main
+from src.compare import CountIndex, load_or_build_index, plot_comparison
+
+# ------------------- Fixtures -------------------
+
+
+@pytest.fixture
+def tables(tmp_path: Path) -> List[str]:
+    books = {
+        "alpha": {"the": 5, "cat": 3, "sat": 1},
+        "beta": {"the": 4, "dog": 4, "ran": 2},
+        "gamma": {"a": 1},
+        "empty": {},
+    }
+    paths = []
+    for name, counts in books.items():
+        path = tmp_path / f"{name}.csv"
+        df = pd.DataFrame({"word": list(counts), "count": list(counts.values())})
+        df.to_csv(path, index=False)
+        paths.append(str(path))
+    return paths
+
+
+# ------------------- Tests -------------------
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_build_index(tables: List[str], workers: int):
+    """Test that the index maps shared word IDs to the counts of every book."""
+    index = CountIndex.build(tables, workers)
+    assert index.books == ["alpha", "beta", "gamma", "empty"]
+    assert index.words == ["the", "cat", "sat", "dog", "ran", "a"]
+    assert index.totals.tolist() == [9, 10, 1, 0]
+    matrix = index.matrix(np.array([0, 3, 5]))
+    assert matrix.tolist() == [[5, 0, 0], [4, 4, 0], [0, 0, 1], [0, 0, 0]]
+
+
+def test_top_words(tables: List[str]):
+    """Test the top words of all books and of one book, with ties broken by first appearance."""
+    index = CountIndex.build(tables)
+    assert [index.words[i] for i in index.top_words(3)] == ["the", "dog", "cat"]
+    assert [index.words[i] for i in index.top_words(2, book=1)] == ["the", "dog"]
+    assert len(index.top_words(3, book=3)) == 0
+
+
+def test_save_and_load(tmp_path: Path, tables: List[str]):
+    """Test that a saved index loads back unchanged."""
+    index = CountIndex.build(tables)
+    index.save(str(tmp_path / "index.npz"))
+    loaded = CountIndex.load(str(tmp_path / "index.npz"))
+    assert loaded.books == index.books
+    assert loaded.words == index.words
+    np.testing.assert_array_equal(loaded.matrix(np.arange(6)), index.matrix(np.arange(6)))
+    assert loaded.is_current(tables)
+
+
+def test_load_or_build_index_rebuilds_changed_tables(tmp_path: Path, tables: List[str]):
+    """Test that the saved index is reused, and rebuilt once a table changes."""
+    index_file = str(tmp_path / "index.npz")
+    load_or_build_index(tables, index_file)
+    assert load_or_build_index(tables, index_file).is_current(tables)
+    pd.DataFrame({"word": ["new"], "count": [7]}).to_csv(tables[2], index=False)
+    stat = os.stat(tables[2])
+    os.utime(tables[2], ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    index = load_or_build_index(tables, index_file)
+    assert "new" in index.words
+    assert CountIndex.load(index_file).is_current(tables)
+
+
+@pytest.mark.parametrize("shared", [True, False])
+def test_plot_comparison_pdf(tmp_path: Path, tables: List[str], shared: bool):
+    """Test that all books go into one multi-page PDF."""
+    index = CountIndex.build(tables * 3)
+    output = tmp_path / "comparison.pdf"
+    saved = plot_comparison(index, str(output), limit=3, shared=shared, rows=2, cols=2)
+    assert saved == [str(output)]
+    assert b"/Count 3" in output.read_bytes()
+
+
+def test_plot_comparison_pages(tmp_path: Path, tables: List[str]):
+    """Test that other formats are saved as one file per page."""
+    index = CountIndex.build(tables)
+    saved = plot_comparison(index, str(tmp_path / "comparison.png"), rows=1, cols=3)
+    assert saved == [str(tmp_path / "comparison-001.png"), str(tmp_path / "comparison-002.png")]
+    assert all(Path(path).stat().st_size > 0 for path in saved)
+
+
+@pytest.mark.parametrize("suffix", [".pdf", ".png"])
+def test_main_without_tables(tmp_path: Path, suffix: str, capsys: pytest.CaptureFixture):
+    """Test that the command rejects an input path without count tables."""
+    output = tmp_path / f"comparison{suffix}"
+    with pytest.raises(SystemExit) as exc_info:
+        main(["compare", "--input-path", str(tmp_path), "--output-path", str(output)])
+    assert exc_info.value.code == 2
+    assert "no count tables match" in capsys.readouterr().err
+    assert not output.exists()
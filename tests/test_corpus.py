@@ -0,0 +1,95 @@
+import gzip
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from src.corpus import find_books, output_paths, run_corpus
+
+# ------------------- Fixtures -------------------
+
+
+def make_book(body: str) -> str:
+    return (
+        "Header\n*** START OF PROJECT GUTENBERG EBOOK TITLE ***\n"
+        f"{body}\n*** END OF PROJECT GUTENBERG EBOOK TITLE ***\nFooter\n"
+    )
+
+
+@pytest.fixture
+def raw_dir(tmp_path: Path):
+    directory = tmp_path / "raw"
+    directory.mkdir()
+    (directory / "alpha.txt").write_text(make_book("hello world\nHello there"), encoding="utf-8")
+    (directory / "beta.txt").write_text(make_book("world peace, world"), encoding="utf-8")
+    (directory / "broken.txt").write_bytes(b"\xff\xfe not utf-8 \xff")
+    (directory / "notes.md").write_text("not a book", encoding="utf-8")
+    return directory
+
+
+# ------------------- Tests -------------------
+
+
+def test_find_books_directory(raw_dir: Path):
+    """Test that a directory selects its .txt files in sorted order."""
+    books = find_books(str(raw_dir))
+    assert [book.name for book in books] == ["alpha.txt", "beta.txt", "broken.txt"]
+
+
+def test_find_books_compressed(raw_dir: Path):
+    """Test that a directory also selects its compressed .txt files."""
+    with gzip.open(raw_dir / "gamma.txt.gz", "wt", encoding="utf-8") as f:
+        f.write(make_book("zipped"))
+    books = find_books(str(raw_dir))
+    assert [book.name for book in books] == ["alpha.txt", "beta.txt", "broken.txt", "gamma.txt.gz"]
+
+
+def test_find_books_glob(raw_dir: Path):
+    """Test that a glob pattern selects only the matching files."""
+    books = find_books(str(raw_dir / "b*.txt"))
+    assert [book.name for book in books] == ["beta.txt", "broken.txt"]
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_run_corpus_skips_failures(raw_dir: Path, tmp_path: Path, workers: int):
+    """Test that failing books are skipped and the remaining counts are combined."""
+    processed_dir = tmp_path / "processed"
+    analyzed_dir = tmp_path / "analyzed"
+    combined, failed = run_corpus(
+        find_books(str(raw_dir)), processed_dir, analyzed_dir, workers=workers, use_cache=False
+    )
+    assert [book.name for book in failed] == ["broken.txt"]
+    assert combined == {"hello": 2, "world": 3, "there": 1, "peace": 1}
+    assert list(combined) == ["hello", "world", "there", "peace"]
+    alpha = pd.read_csv(analyzed_dir / "alpha.csv")
+    assert dict(zip(alpha["word"], alpha["count"])) == {"hello": 2, "world": 1, "there": 1}
+    assert (processed_dir / "beta.txt").read_text(encoding="utf-8") == "world peace, world"
+    # The failed book leaves no partial output behind
+    assert not (processed_dir / "broken.txt").exists()
+    assert not (analyzed_dir / "broken.csv").exists()
+
+
+def test_run_corpus_same_names(tmp_path: Path):
+    """Test that books of the same name in different directories keep separate outputs."""
+    for name in ("a", "b"):
+        (tmp_path / "raw" / name).mkdir(parents=True)
+        (tmp_path / "raw" / name / "book.txt").write_text(make_book(name), encoding="utf-8")
+    books = find_books(str(tmp_path / "raw" / "**" / "*.txt"))
+    processed_dir = tmp_path / "processed"
+    analyzed_dir = tmp_path / "analyzed"
+    combined, failed = run_corpus(books, processed_dir, analyzed_dir, use_cache=False)
+    assert not failed
+    assert combined == {"a": 1, "b": 1}
+    for name in ("a", "b"):
+        assert (processed_dir / name / "book.txt").read_text(encoding="utf-8") == name
+        assert pd.read_csv(analyzed_dir / name / "book.csv")["word"].tolist() == [name]
+
+
+def test_output_paths_rejects_duplicates(tmp_path: Path):
+    """Test that a plain and a compressed copy of a book cannot share their outputs."""
+    books = [tmp_path / "book.txt", tmp_path / "book.txt.gz"]
+    with pytest.raises(ValueError, match="book.csv"):
+        output_paths(books, tmp_path / "processed", tmp_path / "analyzed")
+    processed, counts = output_paths(books[1:], tmp_path / "processed", tmp_path / "analyzed")[0]
+    assert processed == tmp_path / "processed" / "book.txt.gz"
+    assert counts == tmp_path / "analyzed" / "book.csv"
@@ -1,9 +1,25 @@
+import bz2
+import gzip
+import lzma
 from pathlib import Path
 from typing import Callable
+import zipfile
 
 import pytest
 
-from src.dataset import load_text, save_text, strip_headers
+from src.dataset import (
+    clean_text,
+    compression,
+    iter_body,
+    iter_chunks,
+    iter_lines,
+    last_line_end,
+    load_text,
+    open_text,
+    save_text,
+    split_line_ranges,
+    strip_headers,
+)
 
 # ------------------- Fixtures -------------------
 
@@ -18,6 +34,20 @@ def tmp_text_file(tmp_path: Path):
     return _make_file
 
 
+def _write_compressed(path: Path, content: str) -> str:
+    data = content.encode("utf-8")
+    if path.suffix == ".gz":
+        path.write_bytes(gzip.compress(data))
+    elif path.suffix == ".bz2":
+        path.write_bytes(bz2.compress(data))
+    elif path.suffix == ".xz":
+        path.write_bytes(lzma.compress(data))
+    else:
+        with zipfile.ZipFile(path, "w") as archive:
+            archive.writestr("book.txt", data)
+    return str(path)
+
+
 # ------------------- Tests -------------------
 
 
@@ -53,6 +83,62 @@ def test_load_text_unicode(tmp_text_file: Callable[[str], str]):
     assert result == expected
 
 
+def test_iter_lines_matches_splitlines(tmp_text_file: Callable[[str], str]):
+    """Test that iter_lines splits lines exactly as str.splitlines does, across chunk boundaries."""
+    test_content = "héllo\r\nwörld\n\nlast\rline\n\nünicode tëst"
+    file_path = tmp_text_file(test_content)
+    for chunk_size in (1, 2, 5, 1 << 20):
+        assert list(iter_lines(file_path, chunk_size)) == test_content.splitlines()
+
+
+def test_iter_lines_is_lazy(tmp_text_file: Callable[[str], str]):
+    """Test that iter_lines returns a generator rather than a list."""
+    file_path = tmp_text_file("line1\nline2\n")
+    result = iter_lines(file_path)
+    assert next(result) == "line1"
+    assert list(result) == ["line2"]
+
+
+def test_iter_chunks_line_aligned(tmp_text_file: Callable[[str], str]):
+    """Test that iter_chunks never splits a line or a multi-byte character between chunks."""
+    test_content = "ééé\nüü\nabcdef\nend"
+    file_path = tmp_text_file(test_content)
+    chunks = list(iter_chunks(file_path, chunk_size=3))
+    assert "".join(chunks) == test_content
+    assert chunks == ["ééé\n", "üü\n", "abcdef\n", "end"]
+
+
+def test_iter_chunks_empty_file(tmp_text_file: Callable[[str], str]):
+    """Test that iter_chunks yields nothing for an empty file."""
+    file_path = tmp_text_file("")
+    assert list(iter_chunks(file_path)) == []
+
+
+def test_split_line_ranges(tmp_text_file: Callable[[str], str]):
+    """Test that split_line_ranges returns contiguous, line-aligned byte ranges."""
+    test_content = "ééé\nline two\nthree\nfour\nlast"
+    file_path = tmp_text_file(test_content)
+    ranges = split_line_ranges(file_path, parts=3)
+    data = test_content.encode("utf-8")
+    assert ranges[0][0] == 0
+    assert ranges[-1][1] == len(data)
+    for (_, end), (start, _) in zip(ranges, ranges[1:]):
+        assert end == start
+        assert data[end - 1 : end] == b"\n"
+    pieces = [
+        line for start, end in ranges for line in iter_lines(file_path, start=start, end=end)
+    ]
+    assert pieces == test_content.splitlines()
+
+
+def test_last_line_end(tmp_text_file: Callable[[str], str]):
+    """Test that last_line_end points just after the last newline at or after start."""
+    file_path = tmp_text_file("one\ntwo\nthr")
+    assert last_line_end(file_path) == 8
+    assert last_line_end(file_path, start=8) == 8
+    assert last_line_end(tmp_text_file("no newline")) == 0
+
+
 def test_save_text_basic(tmp_path: Path):
     """Test that save_text writes basic multi-line text to a file."""
     test_text = "Hello\nWorld\nTest"
@@ -102,6 +188,13 @@ def test_strip_gutenberg_headers():
     assert result == expected
 
 
+def test_strip_headers_from_iter_lines(tmp_text_file: Callable[[str], str]):
+    """Test that strip_headers accepts the lazy line iterator of a file."""
+    test_content = "Header\n*** START OF PROJECT GUTENBERG EBOOK X ***\nBody\n*** END OF PROJECT GUTENBERG EBOOK X ***\n"
+    file_path = tmp_text_file(test_content)
+    assert strip_headers(iter_lines(file_path)) == "Body"
+
+
 def test_strip_headers_no_gutenberg_markers():
     """Test that strip_headers returns an empty string if no Gutenberg markers are present."""
     text_lines = ["Line 1", "Line 2", "Line 3"]
@@ -163,3 +256,112 @@ def test_strip_headers_multiple_gutenberg_references():
     result = strip_headers(text_lines)
     expected = "Content 1\nContent 2"
     assert result == expected
+
+
+def test_strip_headers_strips_like_str_strip():
+    """Test that surrounding whitespace of the body is dropped exactly as str.strip drops it."""
+    body = ["", "  \t", "   Title  ", "", "  indented line ", "\t", "last line\t ", "  ", ""]
+    text_lines = ["Header", "*** START OF PROJECT GUTENBERG EBOOK X ***", *body]
+    text_lines += ["*** END OF PROJECT GUTENBERG EBOOK X ***", "Footer"]
+    result = strip_headers(text_lines)
+    assert result == "\n".join(body).strip()
+
+
+def test_iter_body_stops_at_end_marker():
+    """Test that iter_body stops consuming lines once the end marker is read."""
+    lines = iter(
+        [
+            "*** START OF PROJECT GUTENBERG EBOOK X ***",
+            "Content",
+            "*** END OF PROJECT GUTENBERG EBOOK X ***",
+            "Footer 1",
+            "Footer 2",
+        ]
+    )
+    assert list(iter_body(lines)) == ["Content"]
+    assert list(lines) == ["Footer 1", "Footer 2"]
+
+
+def test_clean_text_writes_stripped_body(tmp_text_file: Callable[[str], str], tmp_path: Path):
+    """Test that clean_text streams the cleaned body to the output file."""
+    test_content = (
+        "Header\n*** START OF PROJECT GUTENBERG EBOOK X ***\n\n  Body line 1\n\nBody line 2  \n\n"
+        "*** END OF PROJECT GUTENBERG EBOOK X ***\nFooter\n"
+    )
+    file_path = tmp_text_file(test_content)
+    output_path = tmp_path / "clean.txt"
+    written = clean_text(file_path, str(output_path))
+    result = output_path.read_text(encoding="utf-8")
+    assert result == "Body line 1\n\nBody line 2"
+    assert written == len(result)
+
+
+def test_compression_by_suffix():
+    """Test that compression recognises the compressed suffixes case-insensitively."""
+    assert compression("book.txt.gz") == ".gz"
+    assert compression("BOOK.XZ") == ".xz"
+    assert compression("book.zip") == ".zip"
+    assert compression("book.txt") is None
+
+
+@pytest.mark.parametrize("suffix", [".gz", ".bz2", ".xz", ".zip"])
+def test_iter_chunks_compressed_matches_plain(
+    tmp_text_file: Callable[[str], str], tmp_path: Path, suffix: str
+):
+    """Test that a compressed file is read into the same chunks as the plain file."""
+    test_content = "ééé\nüü\nabcdef\n" * 50 + "end"
+    plain = tmp_text_file(test_content)
+    packed = _write_compressed(tmp_path / f"book.txt{suffix}", test_content)
+    assert list(iter_chunks(packed, chunk_size=7)) == list(iter_chunks(plain, chunk_size=7))
+    assert load_text(packed) == test_content.splitlines()
+
+
+def test_iter_chunks_compressed_range(tmp_path: Path):
+    """Test that start and end offsets of a compressed file refer to the uncompressed text."""
+    packed = _write_compressed(tmp_path / "book.txt.gz", "one\ntwo\nthree\n")
+    assert list(iter_lines(packed, chunk_size=2, start=4, end=8)) == ["two"]
+
+
+def test_split_line_ranges_compressed(tmp_path: Path):
+    """Test that a compressed file is a single range that is read to its end."""
+    packed = _write_compressed(tmp_path / "book.txt.xz", "one\ntwo\n")
+    ranges = split_line_ranges(packed, parts=4)
+    assert ranges == [(0, None)]
+    assert list(iter_lines(packed, start=0, end=ranges[0][1])) == ["one", "two"]
+
+
+def test_zip_with_several_members_is_rejected(tmp_path: Path):
+    """Test that a .zip archive must hold exactly one file."""
+    path = tmp_path / "books.zip"
+    with zipfile.ZipFile(path, "w") as archive:
+        archive.writestr("a.txt", "a")
+        archive.writestr("b.txt", "b")
+    with pytest.raises(ValueError, match="exactly one file"):
+        list(iter_chunks(str(path)))
+
+
+@pytest.mark.parametrize("suffix", [".gz", ".bz2", ".xz", ".zip"])
+def test_save_text_compressed_round_trip(tmp_path: Path, suffix: str):
+    """Test that save_text compresses by extension and open_text reads it back."""
+    path = str(tmp_path / f"book.txt{suffix}")
+    save_text(path, "Ünïcode\ntext")
+    with open_text(path) as f:
+        assert f.read() == "Ünïcode\ntext"
+    if suffix == ".zip":
+        assert zipfile.ZipFile(path).namelist() == ["book.txt"]
+
+
+@pytest.mark.parametrize("suffix", [".gz", ".zip"])
+def test_clean_text_compressed_input_and_output(tmp_path: Path, suffix: str):
+    """Test that clean_text reads and writes compressed files."""
+    test_content = (
+        "Header\n*** START OF PROJECT GUTENBERG EBOOK X ***\nBody line 1\nBody line 2\n"
+        "*** END OF PROJECT GUTENBERG EBOOK X ***\nFooter\n"
+    )
+    packed = _write_compressed(tmp_path / f"raw.txt{suffix}", test_content)
+    output_path = str(tmp_path / f"clean.txt{suffix}")
+    written = clean_text(packed, output_path)
+    with open_text(output_path) as f:
+        result = f.read()
+    assert result == "Body line 1\nBody line 2"
+    assert written == len(result)
@@ -0,0 +1,77 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.formats import _memmap_npz_member, read_word_counts, write_word_counts
+
+# ------------------- Fixtures -------------------
+
+
+@pytest.fixture
+def wordcount_df():
+    return pd.DataFrame({"word": ["the", "wörld", "null", "”", "nan"], "count": [30, 20, 10, 5, 1]})
+
+
+# ------------------- Tests -------------------
+
+
+@pytest.mark.parametrize("suffix", [".csv", ".npz"])
+def test_round_trip(wordcount_df: pd.DataFrame, tmp_path: Path, suffix: str):
+    """Test that word counts are read back unchanged, including words that look like NaN."""
+    file_path = tmp_path / f"counts{suffix}"
+    write_word_counts(str(file_path), wordcount_df)
+    result = read_word_counts(str(file_path))
+    pd.testing.assert_frame_equal(result, wordcount_df, check_dtype=False)
+    assert result["count"].dtype == np.int64
+
+
+@pytest.mark.parametrize("suffix", [".csv", ".npz"])
+@pytest.mark.parametrize("limit", [0, 2, 10])
+def test_read_limit(wordcount_df: pd.DataFrame, tmp_path: Path, suffix: str, limit: int):
+    """Test that only the top `limit` rows are read."""
+    file_path = tmp_path / f"counts{suffix}"
+    write_word_counts(str(file_path), wordcount_df)
+    result = read_word_counts(str(file_path), limit)
+    expected = wordcount_df.head(limit)
+    assert list(result["word"]) == list(expected["word"])
+    assert list(result["count"]) == list(expected["count"])
+
+
+def test_npz_is_memory_mapped(wordcount_df: pd.DataFrame, tmp_path: Path):
+    """Test that the arrays of an .npz file are memory-mapped rather than read."""
+    file_path = tmp_path / "counts.npz"
+    write_word_counts(str(file_path), wordcount_df)
+    counts = _memmap_npz_member(str(file_path), "counts")
+    assert isinstance(counts, np.memmap)
+    assert counts.tolist() == [30, 20, 10, 5, 1]
+
+
+def test_npz_empty(tmp_path: Path):
+    """Test that an empty word counts table can be saved and loaded as .npz."""
+    file_path = tmp_path / "counts.npz"
+    empty_df = pd.DataFrame({"word": pd.Series([], dtype=object), "count": pd.Series([], dtype="int64")})
+    write_word_counts(str(file_path), empty_df)
+    result = read_word_counts(str(file_path))
+    assert list(result.columns) == ["word", "count"]
+    assert len(result) == 0
+
+
+def test_feather_round_trip(wordcount_df: pd.DataFrame, tmp_path: Path):
+    """Test the Feather format when pyarrow is installed."""
+    pytest.importorskip("pyarrow")
+    file_path = tmp_path / "counts.feather"
+    write_word_counts(str(file_path), wordcount_df)
+    pd.testing.assert_frame_equal(read_word_counts(str(file_path)), wordcount_df, check_dtype=False)
+    assert list(read_word_counts(str(file_path), 2)["word"]) == ["the", "wörld"]
+
+
+@pytest.mark.parametrize("name", ["counts.tsv", "counts.txt", "counts"])
+def test_other_suffixes_are_csv(wordcount_df: pd.DataFrame, tmp_path: Path, name: str):
+    """Test that any other extension, or none, is written and read as CSV."""
+    file_path = tmp_path / name
+    write_word_counts(str(file_path), wordcount_df)
+    assert file_path.read_text(encoding="utf-8").startswith("word,count\n")
+    result = read_word_counts(str(file_path))
+    pd.testing.assert_frame_equal(result, wordcount_df, check_dtype=False)
@@ -0,0 +1,179 @@
+import gzip
+import os
+from pathlib import Path
+from typing import List
+
+import numpy as np
+import pytest
+
+from src.__main__ import main
+from src.index import SortedWords, WordIndex, book_names
+
+# ------------------- Fixtures -------------------
+
+
+@pytest.fixture
+def books(tmp_path: Path) -> List[str]:
+    texts = {
+        "alpha": "the cat sat\non the mat\n",
+        "beta": "The dog ran\nthe dog sat down\nthe end",
+        "gamma": "a cat\n",
+    }
+    paths = []
+    for name, text in texts.items():
+        path = tmp_path / f"{name}.txt"
+        path.write_text(text, encoding="utf-8")
+        paths.append(str(path))
+    return paths
+
+
+def _touch(path: str, text: str) -> None:
+    Path(path).write_text(text, encoding="utf-8")
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+# ------------------- Tests -------------------
+
+
+def test_sorted_words():
+    """Test the binary search over the words of the UTF-8 buffer."""
+    words = SortedWords.from_list(sorted(["the", "cat", "zoë", "a"]))
+    assert len(words) == 4
+    assert words.tolist() == ["a", "cat", "the", "zoë"]
+    assert words.find("zoë") == 3
+    assert words.find("a") == 0
+    assert words.find("dog") is None
+    assert SortedWords.from_list([]).find("a") is None
+
+
+def test_book_names():
+    """Test that books are named by their relative paths without .txt and compression."""
+    assert book_names(["data/processed/book.txt.gz"]) == ["book"]
+    assert book_names(["data/a/book.txt", "data/b/book.txt.gz", "data/c.txt"]) == [
+        "a/book",
+        "b/book",
+        "c",
+    ]
+    with pytest.raises(ValueError, match="both named book"):
+        book_names(["data/book.txt", "data/book.txt.gz"])
+
+
+def test_books_of_the_same_name(tmp_path: Path, capsys: pytest.CaptureFixture):
+    """Test that books of the same name in different directories are indexed apart."""
+    for name, text in (("a", "the cat\n"), ("b", "the dog\nthe end\n")):
+        (tmp_path / name).mkdir()
+        (tmp_path / name / "book.txt").write_text(text, encoding="utf-8")
+    sources = [str(tmp_path / name / "book.txt") for name in ("a", "b")]
+    index = WordIndex.build(sources, lines=True)
+    assert index.books == ["a/book", "b/book"]
+    assert index.frequencies("the") == {"b/book": 2, "a/book": 1}
+    assert index.term_frequency("the", "a/book") == 1
+    assert index.read_line("b/book", index.line_offsets("the", "b/book")[1]) == "the end"
+
+    (tmp_path / "a" / "book.txt.gz").write_bytes(gzip.compress(b"the\n"))
+    with pytest.raises(ValueError):
+        WordIndex.build([*sources, str(tmp_path / "a" / "book.txt.gz")])
+    index_path = str(tmp_path / "index.npz")
+    pattern = str(tmp_path / "a" / "*")
+    with pytest.raises(SystemExit) as exc_info:
+        main(["index", "build", "--input-path", pattern, "--index-path", index_path])
+    assert exc_info.value.code == 2
+    assert "both named" in " ".join(capsys.readouterr().err.replace("│", " ").split())
+    assert not os.path.exists(index_path)
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_build_index(books: List[str], workers: int):
+    """Test the term frequencies and top books of every word."""
+    index = WordIndex.build(books, workers=workers)
+    assert index.books == ["alpha", "beta", "gamma"]
+    assert index.totals.tolist() == [6, 9, 2]
+    assert index.term_frequency("the") == 5
+    assert index.term_frequency("THE", "beta") == 3
+    assert index.term_frequency("the", "gamma") == 0
+    assert index.term_frequency("unknown") == 0
+    assert index.frequencies("sat") == {"alpha": 1, "beta": 1}
+    assert index.top_books("the", k=1) == [("beta", 3)]
+    assert index.top_books("cat", relative=True) == [("gamma", 0.5), ("alpha", 1 / 6)]
+    assert "dog" in index and "cow" not in index
+
+
+def test_line_offsets(books: List[str]):
+    """Test that the lines of every word can be read back from their offsets."""
+    index = WordIndex.build(books, lines=True)
+    offsets = index.line_offsets("the", "beta").tolist()
+    assert offsets == [0, 12, 29]
+    assert [index.read_line("beta", offset) for offset in offsets] == [
+        "The dog ran",
+        "the dog sat down",
+        "the end",
+    ]
+    assert len(index.line_offsets("dog", "alpha")) == 0
+    with pytest.raises(ValueError):
+        WordIndex.build(books).line_offsets("the", "beta")
+
+
+def test_save_and_load(tmp_path: Path, books: List[str]):
+    """Test that a saved index loads back memory-mapped and unchanged."""
+    index = WordIndex.build(books, lines=True)
+    filename = str(tmp_path / "index.npz")
+    index.save(filename)
+    loaded = WordIndex.load(filename)
+    assert isinstance(loaded.postings, np.memmap)
+    assert loaded.books == index.books
+    assert loaded.words.tolist() == index.words.tolist()
+    for word in index.words.tolist():
+        assert loaded.frequencies(word) == index.frequencies(word)
+    assert loaded.line_offsets("the", "alpha").tolist() == [0, 12]
+    assert not os.path.exists(f"{filename}.tmp")
+
+
+def test_update_index(tmp_path: Path, books: List[str]):
+    """Test that an update recounts new and changed books only, and drops removed ones."""
+    index = WordIndex.build(books, lines=True)
+    assert index.stale(books) == []
+    _touch(books[0], "the cow\n")
+    new_book = str(tmp_path / "delta.txt.gz")
+    with gzip.open(new_book, "wt", encoding="utf-8") as f:
+        f.write("cow cow the\n")
+    sources = books[:2] + [new_book]
+    assert index.stale(sources) == [books[0], new_book]
+
+    updated = index.update(sources)
+    expected = WordIndex.build(sources, lines=True)
+    assert updated.books == ["alpha", "beta", "delta"]
+    assert updated.words.tolist() == expected.words.tolist()
+    assert "mat" not in updated and "a" not in updated
+    for word in expected.words.tolist():
+        assert updated.frequencies(word) == expected.frequencies(word)
+        for book in updated.frequencies(word):
+            np.testing.assert_array_equal(
+                updated.line_offsets(word, book), expected.line_offsets(word, book)
+            )
+    assert updated.totals.tolist() == expected.totals.tolist()
+    assert index.term_frequency("mat") == 1
+
+
+def test_index_commands(tmp_path: Path, books: List[str], capsys: pytest.CaptureFixture):
+    """Test building, updating and querying the index from the command line."""
+    index_path = str(tmp_path / "index.npz")
+    args = ["--input-path", str(tmp_path), "--index-path", index_path]
+    with pytest.raises(SystemExit) as exc_info:
+        main(["index", "build", *args, "--lines", "--workers", "1"])
+    assert exc_info.value.code == 0
+    assert WordIndex.load(index_path).books == ["alpha", "beta", "gamma"]
+
+    with pytest.raises(SystemExit) as exc_info:
+        main(["index", "query", "dog", "--index-path", index_path, "--lines", "1"])
+    assert exc_info.value.code == 0
+    assert capsys.readouterr().out == "dog\t*\t2\ndog\tbeta\t2\n\t0: The dog ran\n"
+
+    Path(books[2]).unlink()
+    with pytest.raises(SystemExit) as exc_info:
+        main(["index", "build", *args, "--lines", "--workers", "1"])
+    assert exc_info.value.code == 0
+    with pytest.raises(SystemExit) as exc_info:
+        main(["index", "top", "cat", "--index-path", index_path])
+    assert exc_info.value.code == 0
+    assert capsys.readouterr().out == "alpha\t1\n"
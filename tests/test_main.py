@@ -0,0 +1,104 @@
+import subprocess
+import sys
+
+import pytest
+
+from src.__main__ import COMMANDS, main
+from src.config import PROJ_ROOT
+
+# ------------------- Tests -------------------
+
+
+def test_main_lists_commands(capsys: pytest.CaptureFixture):
+    """Test that running without a command prints the available commands."""
+    main([])
+    output = capsys.readouterr().out
+    for name in COMMANDS:
+        assert name in output
+
+
+def test_main_unknown_command(capsys: pytest.CaptureFixture):
+    """Test that an unknown command exits with an error."""
+    with pytest.raises(SystemExit) as exc_info:
+        main(["unknown"])
+    assert exc_info.value.code == 2
+    assert "Unknown command 'unknown'" in capsys.readouterr().err
+
+
+def test_main_runs_command(tmp_path):
+    """Test that a command is run with the remaining arguments."""
+    input_path = tmp_path / "book.txt"
+    output_path = tmp_path / "counts.csv"
+    input_path.write_text("hello world\nhello\n", encoding="utf-8")
+    with pytest.raises(SystemExit) as exc_info:
+        main(
+            [
+                "analysis",
+                "--input-path",
+                str(input_path),
+                "--output-path",
+                str(output_path),
+                "--no-cache",
+            ]
+        )
+    assert exc_info.value.code == 0
+    assert output_path.read_text(encoding="utf-8") == "word,count\nhello,2\nworld,1\n"
+
+
+def test_main_counts_ngrams(tmp_path):
+    """Test that the analysis command counts n-grams with --ngram."""
+    input_path = tmp_path / "book.txt"
+    output_path = tmp_path / "trigrams.csv"
+    input_path.write_text("a b c\na b c d\n", encoding="utf-8")
+    with pytest.raises(SystemExit) as exc_info:
+        main(
+            [
+                "analysis",
+                "--input-path",
+                str(input_path),
+                "--output-path",
+                str(output_path),
+                "--ngram",
+                "3",
+                "--no-cache",
+            ]
+        )
+    assert exc_info.value.code == 0
+    assert output_path.read_text(encoding="utf-8") == (
+        "word,count\na b c,2\nb c a,1\nc a b,1\nb c d,1\n"
+    )
+
+
+@pytest.mark.parametrize("suffix", [".csv", ".feather", ".npz"])
+def test_main_ngram_formats(tmp_path, suffix: str):
+    """Test that n-gram tables round-trip through every output format and can be plotted."""
+    if suffix == ".feather":
+        pytest.importorskip("pyarrow")
+    from src.formats import read_word_counts
+
+    input_path = tmp_path / "book.txt"
+    output_path = tmp_path / f"bigrams{suffix}"
+    plot_path = tmp_path / "bigrams.png"
+    input_path.write_text("a b a b\nc a b\n", encoding="utf-8")
+    for args in (
+        ["analysis", "--input-path", str(input_path), "--output-path", str(output_path)]
+        + ["--ngram", "2", "--no-cache"],
+        ["plots", "main", "--input-path", str(output_path), "--output-path", str(plot_path)],
+    ):
+        with pytest.raises(SystemExit) as exc_info:
+            main(args)
+        assert exc_info.value.code == 0
+    df = read_word_counts(str(output_path))
+    assert df.values.tolist() == [["a b", 3], ["b a", 1], ["b c", 1], ["c a", 1]]
+    assert plot_path.stat().st_size > 0
+
+
+@pytest.mark.parametrize("module", [module for module, _ in COMMANDS.values()])
+def test_commands_import_lazily(module: str):
+    """Test that importing a command does not load pandas, numpy, matplotlib or tqdm."""
+    heavy = ("pandas", "numpy", "matplotlib", "tqdm")
+    code = f"import sys, {module}; print(' '.join(m for m in {heavy!r} if m in sys.modules))"
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, cwd=PROJ_ROOT, check=True
+    )
+    assert result.stdout.split() == []
@@ -0,0 +1,114 @@
+from collections import Counter
+from typing import List
+
+import pytest
+
+from src.analysis import count_words, counts_to_dataframe
+from src.ngrams import NgramCounter
+from src.vocab import Vocabulary
+
+# ------------------- Fixtures -------------------
+
+
+@pytest.fixture
+def words() -> List[str]:
+    return "the cat sat on the mat and the cat ran to the mat the cat".split()
+
+
+def _reference(words: List[str], n: int) -> Counter:
+    """N-gram counts from Python tuples of strings, in order of first appearance."""
+    return Counter(" ".join(gram) for gram in zip(*(words[i:] for i in range(n))))
+
+
+# ------------------- Tests -------------------
+
+
+@pytest.mark.parametrize("n", [1, 2, 3, 5])
+def test_ngrams_match_tuples(words: List[str], n: int):
+    """Test that the counts and their order equal counting tuples of strings."""
+    counter = NgramCounter(n)
+    counter.update(words)
+    df = counter.to_dataframe()
+    expected = counts_to_dataframe(_reference(words, n))
+    assert df.iloc[:, 0].tolist() == expected["word"].tolist()
+    assert df["count"].tolist() == expected["count"].tolist()
+    assert counter.total == len(words) - n + 1
+
+
+@pytest.mark.parametrize("split", [0, 1, 2, 7, 15])
+def test_rolling_window_spans_updates(words: List[str], split: int):
+    """Test that n-grams span the boundary between two updates."""
+    counter = NgramCounter(3)
+    counter.update(words[:split])
+    counter.update(words[split:])
+    single = NgramCounter(3)
+    single.update(words)
+    assert counter.to_dataframe().equals(single.to_dataframe())
+
+
+def test_short_stream():
+    """Test that fewer words than n give no n-grams until more words arrive."""
+    counter = NgramCounter(3)
+    counter.update(["a"])
+    counter.update(["b"])
+    assert len(counter) == 0
+    assert counter.to_dataframe().empty
+    assert list(counter.to_dataframe().columns) == ["word", "count"]
+    counter.update(["c"])
+    assert counter.to_dataframe().values.tolist() == [["a b c", 1]]
+
+
+def test_unigrams_match_counts_to_dataframe(words: List[str]):
+    """Test that n = 1 gives exactly the word counts table."""
+    counter = NgramCounter(1)
+    counter.update(words)
+    assert counter.to_dataframe().equals(counts_to_dataframe(count_words([" ".join(words)])))
+
+
+def test_compaction_keeps_counts(monkeypatch: pytest.MonkeyPatch, words: List[str]):
+    """Test that merging many chunk tables keeps counts and first appearances."""
+    monkeypatch.setattr("src.ngrams.COMPACT_MIN", 2)
+    counter = NgramCounter(2)
+    for word in words * 3:
+        counter.update([word])
+    expected = counts_to_dataframe(_reference(words * 3, 2))
+    df = counter.to_dataframe()
+    assert df["word"].tolist() == expected["word"].tolist()
+    assert df["count"].tolist() == expected["count"].tolist()
+
+
+def test_top_k(words: List[str]):
+    """Test that top_k returns the head of the full table."""
+    counter = NgramCounter(2)
+    counter.update(words)
+    full = counter.to_dataframe()
+    assert counter.to_dataframe(top_k=3).equals(full.head(3))
+    assert counter.to_dataframe(top_k=0).empty
+
+
+def test_shared_vocabulary(words: List[str]):
+    """Test that counters of one vocabulary share word IDs."""
+    vocabulary = Vocabulary()
+    first = NgramCounter(2, vocabulary)
+    second = NgramCounter(2, vocabulary)
+    first.update(words[:5])
+    second.update(words[5:])
+    assert len(vocabulary) == len(set(words))
+    assert vocabulary.get("the") == 0
+    expected = counts_to_dataframe(_reference(words[5:], 2))
+    assert second.to_dataframe()["word"].tolist() == expected["word"].tolist()
+
+
+def test_vocabulary_overflow():
+    """Test that a vocabulary too large for the packed IDs is an error."""
+    counter = NgramCounter(3)
+    counter.bits = 2
+    with pytest.raises(ValueError, match="do not fit"):
+        counter.update(["a", "b", "c", "d", "e"])
+
+
+def test_invalid_n():
+    """Test that n must be between 1 and 63."""
+    for n in (0, 64):
+        with pytest.raises(ValueError, match="between 1 and 63"):
+            NgramCounter(n)
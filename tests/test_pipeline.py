@@ -0,0 +1,62 @@
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from src.analysis import calculate_word_counts
+from src.dataset import clean_text, load_text
+import src.pipeline as pipeline
+from src.pipeline import run_pipeline
+
+# ------------------- Fixtures -------------------
+
+
+@pytest.fixture
+def raw_file(tmp_path: Path):
+    body = "\n".join(f"Line {i}: the quick brown fox, the lazy dog!" for i in range(200))
+    file_path = tmp_path / "raw.txt"
+    file_path.write_text(
+        "Header\n*** START OF PROJECT GUTENBERG EBOOK TITLE ***\n\n"
+        f"{body}\n\n*** END OF PROJECT GUTENBERG EBOOK TITLE ***\nFooter\n",
+        encoding="utf-8",
+    )
+    return file_path
+
+
+# ------------------- Tests -------------------
+
+
+@pytest.mark.parametrize("block_chars", [1, 100, 1 << 20])
+def test_run_pipeline_matches_stages(
+    tmp_path: Path, raw_file: Path, monkeypatch: pytest.MonkeyPatch, block_chars: int
+):
+    """Test that the overlapped pipeline gives the same outputs as the separate stages."""
+    monkeypatch.setattr(pipeline, "BLOCK_CHARS", block_chars)
+    expected_text = tmp_path / "expected.txt"
+    clean_text(str(raw_file), str(expected_text))
+    expected = calculate_word_counts(load_text(str(expected_text)))
+
+    processed_file = tmp_path / "processed.txt"
+    counts_file = tmp_path / "counts.csv"
+    plot_file = tmp_path / "plot.png"
+    df, timings = run_pipeline(
+        str(raw_file), str(processed_file), str(counts_file), str(plot_file)
+    )
+    pd.testing.assert_frame_equal(df, expected)
+    assert processed_file.read_text(encoding="utf-8") == expected_text.read_text(encoding="utf-8")
+    pd.testing.assert_frame_equal(pd.read_csv(counts_file), expected)
+    assert plot_file.stat().st_size > 0
+    assert set(timings) == {"read", "clean", "count", "plot", "total"}
+
+
+def test_run_pipeline_without_files(raw_file: Path):
+    """Test that intermediate files and the plot are optional."""
+    df, timings = run_pipeline(str(raw_file))
+    assert df["word"].iloc[0] == "the"
+    assert "plot" not in timings
+
+
+def test_run_pipeline_raises_stage_errors(tmp_path: Path):
+    """Test that an error in a background stage is raised by run_pipeline."""
+    with pytest.raises(FileNotFoundError):
+        run_pipeline(str(tmp_path / "missing.txt"))
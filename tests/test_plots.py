@@ -1,10 +1,15 @@
+from pathlib import Path
+from typing import List
 from unittest.mock import Mock, patch
 
 import matplotlib.pyplot as plt
+import numpy as np
 import pandas as pd
 import pytest
 
-from src.plots import plot_word_counts
+from src.__main__ import main
+from src.plots import HistogramRenderer, plot_batch, plot_rank_frequency, plot_word_counts
+from src.zipf import fit_zipf
 
 # ------------------- Fixtures -------------------
 
@@ -122,6 +127,32 @@ def test_plot_word_counts_rotation(mock_savefig: Mock, mock_show: Mock, sample_d
     plt.close()
 
 
+def test_plot_word_counts_zipf_overlay(sample_df: pd.DataFrame):
+    """Test that the fitted counts of the plotted ranks are drawn over the bars."""
+    fit = fit_zipf(sample_df["count"].to_numpy(), "lsq")
+    plot_word_counts(sample_df, limit=5, fit=fit)
+    ax = plt.gca()
+    (line,) = ax.get_lines()
+    np.testing.assert_allclose(line.get_ydata(), fit.predict(range(1, 6)))
+    assert len(ax.patches) == 5
+    assert "lsq" in ax.get_legend().get_texts()[0].get_text()
+    plt.close()
+
+
+def test_plot_rank_frequency(sample_df: pd.DataFrame):
+    """Test the log-log rank-frequency plot with one line per fit."""
+    counts = sample_df["count"].to_numpy()[::-1]
+    fits = [fit_zipf(counts, "lsq"), fit_zipf(counts, "mle", max_rank=5)]
+    plot_rank_frequency(counts, fits, points=100)
+    ax = plt.gca()
+    observed, lsq, mle = ax.get_lines()
+    assert ax.get_xscale() == ax.get_yscale() == "log"
+    assert observed.get_ydata().tolist() == sorted(counts, reverse=True)
+    assert len(lsq.get_xdata()) == 10
+    assert len(mle.get_xdata()) == 5
+    plt.close()
+
+
 def test_dataframe_compatibility():
     """Test plot compatibility with different DataFrame column orders."""
     df1 = pd.DataFrame({"word": ["test", "data"], "count": [10, 5]})
@@ -130,3 +161,55 @@ def test_dataframe_compatibility():
     df2 = pd.DataFrame({"count": [15, 8], "word": ["hello", "world"]})
     plot_word_counts(df2, limit=2)
     plt.close()
+
+
+def test_renderer_reuses_bars(tmp_path: Path, sample_df: pd.DataFrame):
+    """Test that the renderer updates the same bars and hides those without a word."""
+    figures = plt.get_fignums()
+    with HistogramRenderer(limit=5) as renderer:
+        bars = list(renderer.ax.patches)
+        renderer.render(sample_df, str(tmp_path / "a.png"))
+        assert [bar.get_height() for bar in bars] == [100, 80, 70, 60, 50]
+        renderer.render(sample_df.tail(2), str(tmp_path / "b.png"))
+        assert list(renderer.ax.patches) == bars
+        assert [bar.get_visible() for bar in bars] == [True, True, False, False, False]
+        assert [label.get_text() for label in renderer.ax.get_xticklabels()] == ["you", "that"]
+    assert plt.get_fignums() == figures
+    assert (tmp_path / "a.png").stat().st_size > 0
+
+
+@pytest.mark.parametrize("fmt", ["png", "pdf", "svg"])
+@pytest.mark.parametrize("workers", [1, 2])
+def test_plot_batch(tmp_path: Path, sample_df: pd.DataFrame, fmt: str, workers: int):
+    """Test that every table is plotted, in every format, and broken tables are skipped."""
+    tables = []
+    for i in range(5):
+        table = tmp_path / f"book{i}.csv"
+        sample_df.to_csv(table, index=False)
+        tables.append(str(table))
+    broken = tmp_path / "broken.csv"
+    broken.write_text("not,a,table\n", encoding="utf-8")
+    saved, failed = plot_batch(tables + [str(broken)], tmp_path / "plots", fmt, workers=workers)
+    assert saved == [tmp_path / "plots" / f"book{i}.{fmt}" for i in range(5)]
+    assert all(path.stat().st_size > 0 for path in saved)
+    assert failed == [str(broken)]
+
+
+def test_plot_batch_unknown_format(tmp_path: Path):
+    """Test that an unknown plot format is rejected."""
+    with pytest.raises(ValueError):
+        plot_batch([], tmp_path, "gif")
+
+
+@pytest.mark.parametrize("command", [[], ["main"]])
+def test_histogram_is_the_default_command(
+    tmp_path: Path, sample_df: pd.DataFrame, command: List[str]
+):
+    """Test that the histogram is plotted with or without naming the main command."""
+    table = tmp_path / "counts.csv"
+    sample_df.to_csv(table, index=False)
+    output = tmp_path / "histogram.png"
+    with pytest.raises(SystemExit) as exc_info:
+        main(["plots", *command, "--input-path", str(table), "--output-path", str(output)])
+    assert exc_info.value.code == 0
+    assert output.stat().st_size > 0
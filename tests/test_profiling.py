@@ -0,0 +1,95 @@
+import json
+from pathlib import Path
+import pstats
+import time
+
+import pytest
+
+from src.analysis import word_count
+from src.dataset import clean_text
+from src.profiling import Profiler, profile_command
+
+# ------------------- Fixtures -------------------
+
+
+@pytest.fixture
+def raw_file(tmp_path: Path):
+    file_path = tmp_path / "raw.txt"
+    file_path.write_text(
+        "Header\n*** START OF PROJECT GUTENBERG EBOOK TITLE ***\n"
+        "Hello world\nhello there\n*** END OF PROJECT GUTENBERG EBOOK TITLE ***\n",
+        encoding="utf-8",
+    )
+    return file_path
+
+
+# ------------------- Tests -------------------
+
+
+def test_nested_stages_are_exclusive():
+    """Test that time spent in a nested stage is not counted for the outer stage."""
+    profiler = Profiler()
+    with profiler.stage("outer"):
+        with profiler.stage("inner"):
+            time.sleep(0.05)
+    assert profiler.stages["inner"].wall >= 0.05
+    assert profiler.stages["outer"].wall < 0.05
+
+
+def test_iterate_times_item_production():
+    """Test that producing items is charged to the iterated stage, not to the consumer."""
+    profiler = Profiler()
+
+    def slow_items():
+        for i in range(3):
+            time.sleep(0.02)
+            yield i
+
+    with profiler.stage("consume"):
+        assert list(profiler.iterate("produce", slow_items())) == [0, 1, 2]
+    assert profiler.stages["produce"].calls == 4
+    assert profiler.stages["produce"].wall >= 0.06
+    assert profiler.stages["consume"].wall < 0.02
+
+
+def test_disabled_profiler_records_nothing():
+    """Test that a disabled profiler passes items through without keeping stages."""
+    profiler = Profiler(enabled=False)
+    with profiler.stage("stage") as stats:
+        stats.tokens += 1
+    assert list(profiler.iterate("items", [1, 2])) == [1, 2]
+    assert profiler.stages == {}
+
+
+def test_profile_command_writes_json_and_pstats(tmp_path: Path, raw_file: Path):
+    """Test that a profiled dataset run saves the stages as JSON and a pstats dump."""
+    output_file = tmp_path / "clean.txt"
+    profile_path = tmp_path / "profile.json"
+    pstats_path = tmp_path / "profile.pstats"
+    with profile_command("dataset", profile_path, pstats_path) as profiler:
+        clean_text(str(raw_file), str(output_file), profiler)
+    assert output_file.read_text(encoding="utf-8") == "Hello world\nhello there"
+    report = json.loads(profile_path.read_text(encoding="utf-8"))
+    stages = {stage["name"]: stage for stage in report["stages"]}
+    assert set(stages) == {"load", "strip", "save"}
+    assert stages["load"]["bytes_read"] == raw_file.stat().st_size
+    assert stages["save"]["bytes_written"] == output_file.stat().st_size
+    assert stages["strip"]["lines"] == 5
+    assert report["total"]["wall_s"] >= sum(stage["wall_s"] for stage in stages.values())
+    assert pstats.Stats(str(pstats_path)).total_calls > 0
+
+
+@pytest.mark.parametrize("backend", ["python", "pandas"])
+def test_profiled_word_count_same_output(tmp_path: Path, backend: str):
+    """Test that profiling word_count records its stages without changing the output."""
+    input_path = tmp_path / "book.txt"
+    input_path.write_text("b a c a\nb d e c a\n", encoding="utf-8")
+    word_count(str(input_path), str(tmp_path / "plain.csv"), backend=backend)
+    profiler = Profiler("analysis")
+    word_count(str(input_path), str(tmp_path / "profiled.csv"), backend=backend, profiler=profiler)
+    assert (tmp_path / "plain.csv").read_text() == (tmp_path / "profiled.csv").read_text()
+    assert profiler.stages["count"].tokens == 9
+    assert {"load", "count", "sort", "save"} <= set(profiler.stages)
+    if backend == "python":
+        assert profiler.stages["tokenize"].tokens == 9
+        assert profiler.stages["tokenize"].lines == 2
@@ -0,0 +1,138 @@
+import http.client
+import json
+from pathlib import Path
+import threading
+
+import pytest
+
+from src.analysis import count_words, counts_to_dataframe
+from src.server import (
+    REQUEST_QUEUE_SIZE,
+    CountServer,
+    CountService,
+    Metrics,
+    percentile,
+    request_counts,
+    request_metrics,
+)
+
+# ------------------- Fixtures -------------------
+
+
+@pytest.fixture(scope="module")
+def service():
+    service = CountService(workers=1, batch_wait=0.01).start()
+    yield service
+    service.close()
+
+
+@pytest.fixture(scope="module")
+def url(service: CountService):
+    server = CountServer(("127.0.0.1", 0), service)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+
+# ------------------- Tests -------------------
+
+
+def test_percentile():
+    """Test nearest-rank percentiles."""
+    values = [float(v) for v in range(1, 101)]
+    assert percentile(values, 50) == 50.0
+    assert percentile(values, 99) == 99.0
+    assert percentile([], 50) == 0.0
+
+
+def test_metrics_snapshot():
+    """Test that the metrics count requests, errors and batches."""
+    metrics = Metrics()
+    metrics.record_request(0.01)
+    metrics.record_request(0.03, ok=False)
+    metrics.record_batch(2)
+    snapshot = metrics.snapshot()
+    assert snapshot["requests"] == 2
+    assert snapshot["errors"] == 1
+    assert snapshot["p99_ms"] == pytest.approx(30.0)
+    assert snapshot["mean_batch_size"] == 2
+
+
+def test_service_batches_queued_requests():
+    """Test that requests queued together are counted in one batch, each correctly."""
+    service = CountService(workers=1)
+    texts = [f"word{i} common common" for i in range(10)]
+    # Queue every request before the batching thread starts
+    futures = [service.submit(text) for text in texts]
+    service.start()
+    try:
+        results = [future.result(timeout=30) for future in futures]
+    finally:
+        service.close()
+    assert results == [count_words([text]) for text in texts]
+    assert service.metrics.snapshot()["batches"] == 1
+
+
+def test_request_counts_text_json(url: str):
+    """Test that counts of a text are returned in descending order as JSON."""
+    text = "Hello world! hello there, world peace."
+    expected = counts_to_dataframe(count_words([text]))
+    result = request_counts(text=text, url=url)
+    assert result == list(zip(expected["word"], expected["count"].tolist()))
+
+
+def test_request_counts_path_csv(url: str, tmp_path: Path):
+    """Test that counts of a file are returned as the word,count CSV."""
+    input_path = tmp_path / "book.txt"
+    input_path.write_text("b a c a\nb d e c a\n", encoding="utf-8")
+    result = request_counts(path=str(input_path), top_k=2, fmt="csv", url=url)
+    assert result == "word,count\na,3\nb,2\n"
+
+
+def test_request_errors(url: str, tmp_path: Path):
+    """Test that bad requests and missing files are reported without stopping the server."""
+    with pytest.raises(RuntimeError, match="400"):
+        request_counts(url=url)
+    with pytest.raises(RuntimeError, match="404"):
+        request_counts(path=str(tmp_path / "missing.txt"), url=url)
+    assert request_counts(text="still running", url=url) == [("still", 1), ("running", 1)]
+
+
+def test_request_metrics(url: str):
+    """Test that the metrics endpoint reports latency percentiles and throughput."""
+    request_counts(text="hello", url=url)
+    metrics = request_metrics(url)
+    assert metrics["requests"] >= 1
+    assert metrics["p50_ms"] > 0
+    assert metrics["throughput_rps"] > 0
+
+
+def test_server_queues_connection_bursts(service: CountService):
+    """Test that more clients than socketserver's default backlog can connect at once."""
+    server = CountServer(("127.0.0.1", 0), service)
+    assert server.request_queue_size == REQUEST_QUEUE_SIZE
+    body = json.dumps({"text": "hello world, hello", "format": "json"})
+    connections = []
+    thread = None
+    try:
+        # Nothing is accepted yet, so every connection waits in the listen backlog
+        for _ in range(32):
+            connection = http.client.HTTPConnection("127.0.0.1", server.server_port, timeout=1)
+            connection.connect()
+            connection.sock.settimeout(5)
+            connection.request("POST", "/count", body, {"Content-Type": "application/json"})
+            connections.append(connection)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        for connection in connections:
+            response = connection.getresponse()
+            assert response.status == 200
+            assert json.loads(response.read())["counts"] == [["hello", 2], ["world", 1]]
+    finally:
+        for connection in connections:
+            connection.close()
+        if thread is not None:
+            server.shutdown()
+        server.server_close()
@@ -0,0 +1,88 @@
+from collections import Counter
+from pathlib import Path
+from typing import List
+
+import pandas as pd
+import pytest
+
+from src.analysis import count_words, word_count
+from src.shards import iter_shard, merge_shards, sort_shard_by_count, write_shard
+
+# ------------------- Fixtures -------------------
+
+
+@pytest.fixture
+def books() -> List[str]:
+    return [
+        "the cat sat on the mat",
+        "the dog ate the cat food",
+        "a bird on a wire",
+        "the end",
+        "",
+    ]
+
+
+@pytest.fixture
+def shards(tmp_path: Path, books: List[str]) -> List[str]:
+    paths = []
+    for i, book in enumerate(books):
+        path = tmp_path / f"book{i}.shard"
+        write_shard(str(path), count_words([book]))
+        paths.append(str(path))
+    return paths
+
+
+# ------------------- Tests -------------------
+
+
+def test_write_shard_sorted_by_word(tmp_path: Path):
+    """Test that a shard stores every word once, sorted by word."""
+    path = tmp_path / "counts.shard"
+    assert write_shard(str(path), {"b": 2, "a": 1, "é": 3}) == 3
+    assert list(iter_shard(str(path))) == [("a", 1), ("b", 2), ("é", 3)]
+
+
+@pytest.mark.parametrize("fan_in", [2, 3, 64])
+def test_merge_shards_matches_in_memory(
+    tmp_path: Path, books: List[str], shards: List[str], fan_in: int
+):
+    """Test that the k-way merge equals counting all books in memory, for any fan-in."""
+    output = tmp_path / "merged.shard"
+    n = merge_shards(shards, str(output), fan_in=fan_in)
+    expected = Counter()
+    for book in books:
+        expected.update(count_words([book]))
+    assert list(iter_shard(str(output))) == sorted(expected.items())
+    assert n == len(expected)
+
+
+@pytest.mark.parametrize("run_size", [1, 2, 1000])
+def test_sort_shard_by_count(tmp_path: Path, shards: List[str], run_size: int):
+    """Test that the spilling sort orders by descending count, then by word."""
+    merged = tmp_path / "merged.shard"
+    output = tmp_path / "counts.csv"
+    merge_shards(shards, str(merged))
+    n = sort_shard_by_count(str(merged), str(output), run_size=run_size)
+    result = pd.read_csv(output, keep_default_na=False)
+    items = list(zip(result["word"], result["count"]))
+    assert len(items) == n
+    assert items == sorted(iter_shard(str(merged)), key=lambda item: (-item[1], item[0]))
+    assert items[0] == ("the", 5)
+
+
+def test_sort_empty_shard(tmp_path: Path):
+    """Test that an empty shard gives a CSV file with only the header."""
+    shard = tmp_path / "empty.shard"
+    write_shard(str(shard), {})
+    output = tmp_path / "counts.csv"
+    assert sort_shard_by_count(str(shard), str(output)) == 0
+    assert output.read_text(encoding="utf-8") == "word,count\n"
+
+
+def test_word_count_writes_shard(tmp_path: Path):
+    """Test that word_count saves the full counts as a shard next to the table."""
+    input_path = tmp_path / "book.txt"
+    input_path.write_text("b a c a\nb d e c a\n", encoding="utf-8")
+    shard = tmp_path / "book.shard"
+    word_count(str(input_path), str(tmp_path / "counts.csv"), shard_file=str(shard))
+    assert list(iter_shard(str(shard))) == [("a", 3), ("b", 2), ("c", 2), ("d", 1), ("e", 1)]
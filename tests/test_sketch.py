@@ -0,0 +1,85 @@
+from collections import Counter
+import random
+
+import pytest
+
+from src.sketch import CountMinSketch, SpaceSaving
+
+# ------------------- Fixtures -------------------
+
+
+@pytest.fixture
+def zipf_counts():
+    """Skewed word counts: word i occurs about 2000 / (i + 1) times."""
+    rng = random.Random(0)
+    words = [f"w{i}" for i in range(500)]
+    weights = [1 / (i + 1) for i in range(500)]
+    return Counter(rng.choices(words, weights=weights, k=20_000))
+
+
+# ------------------- Tests -------------------
+
+
+def test_space_saving_exact_below_capacity():
+    """Test that counts are exact while the summary has room for every word."""
+    summary = SpaceSaving(capacity=10)
+    summary.update_counts(Counter("hello world hello".split()))
+    assert summary.top(2) == [("hello", 2, 0), ("world", 1, 0)]
+    assert summary.min_count == 0
+
+
+def test_space_saving_error_bounds(zipf_counts: Counter):
+    """Test that every kept count is within [count - error, count] and error <= N / m."""
+    summary = SpaceSaving(capacity=50)
+    for word, count in zipf_counts.items():
+        summary.update(word, count)
+    assert len(summary.counts) == 50
+    assert summary.total == sum(zipf_counts.values())
+    for word, count, error in summary.top(50):
+        assert count - error <= zipf_counts[word] <= count
+        assert error <= summary.max_error
+    # Every word more frequent than N / m is guaranteed to be kept
+    for word, count in zipf_counts.items():
+        if count > summary.max_error:
+            assert word in summary.counts
+
+
+def test_space_saving_merge(zipf_counts: Counter):
+    """Test that merged summaries keep the error guarantees of the combined stream."""
+    items = list(zipf_counts.items())
+    left, right = SpaceSaving(capacity=50), SpaceSaving(capacity=50)
+    left.update_counts(dict(items[::2]))
+    right.update_counts(dict(items[1::2]))
+    left.merge(right)
+    assert left.total == sum(zipf_counts.values())
+    assert len(left.counts) <= 50
+    for word, count, error in left.top(50):
+        assert count - error <= zipf_counts[word] <= count
+        assert error <= 2 * left.max_error
+    assert [word for word, _, _ in left.top(3)] == ["w0", "w1", "w2"]
+
+
+def test_count_min_never_underestimates(zipf_counts: Counter):
+    """Test point queries against the exact counts and the epsilon * N bound."""
+    sketch = CountMinSketch(width=256, depth=4)
+    sketch.update_counts(zipf_counts)
+    words = list(zipf_counts)
+    estimates = sketch.query(words)
+    exact = [zipf_counts[word] for word in words]
+    assert all(e >= c for e, c in zip(estimates, exact))
+    over = sum(e - c > sketch.epsilon * sketch.total for e, c in zip(estimates, exact))
+    assert over <= len(words) * 5 * sketch.delta
+
+
+def test_count_min_merge_equals_single_sketch(zipf_counts: Counter):
+    """Test that merging sketches of two halves equals the sketch of the whole."""
+    items = list(zipf_counts.items())
+    whole, left, right = (CountMinSketch(width=128, depth=3) for _ in range(3))
+    whole.update_counts(zipf_counts)
+    left.update_counts(dict(items[::2]))
+    right.update_counts(dict(items[1::2]))
+    left.merge(right)
+    assert (left.table == whole.table).all()
+    assert left.total == whole.total
+    with pytest.raises(ValueError):
+        left.merge(CountMinSketch(width=64, depth=3))
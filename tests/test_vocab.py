@@ -0,0 +1,102 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.analysis import calculate_word_counts, count_words, vocab_count_words
+from src.vocab import CountVector, Vocabulary
+
+# ------------------- Fixtures -------------------
+
+
+@pytest.fixture
+def lines():
+    return ["The cat sat, on the mat!", "THE DOG: sat on a log.", "", "a cat"]
+
+
+# ------------------- Tests -------------------
+
+
+def test_vocabulary_ids_in_order_of_first_appearance():
+    """Test that every distinct word gets the next ID, once."""
+    vocabulary = Vocabulary()
+    ids = vocabulary.add_all(["b", "a", "b", "c"])
+    assert ids.tolist() == [0, 1, 0, 2]
+    assert vocabulary.words == ["b", "a", "c"]
+    assert vocabulary.add("a") == 1
+    assert vocabulary.add("d") == 3
+    assert vocabulary.get("e") is None
+    assert "d" in vocabulary and len(vocabulary) == 4
+
+
+def test_vocabulary_encode():
+    """Test that encode returns the ID of every token and adds new words in order."""
+    vocabulary = Vocabulary(["b"])
+    ids = vocabulary.encode(["a", "b", "a", "c"])
+    assert ids.tolist() == [1, 0, 1, 2]
+    assert vocabulary.words == ["b", "a", "c"]
+    assert vocabulary.encode([]).tolist() == []
+
+
+def test_vocabulary_save_and_load(tmp_path: Path):
+    """Test that a saved vocabulary loads back with the same IDs."""
+    vocabulary = Vocabulary(["b", "a", "é"])
+    vocabulary.save(str(tmp_path / "vocab.txt"))
+    assert Vocabulary.load(str(tmp_path / "vocab.txt")).words == ["b", "a", "é"]
+
+
+def test_vocab_count_words_matches_count_words(lines):
+    """Test that the array-backed counts equal the Counter, in the same order."""
+    counts = vocab_count_words(lines)
+    expected = count_words(lines)
+    assert list(counts.items()) == list(expected.items())
+    assert counts["the"] == 3
+    assert "dog" in counts and "zebra" not in counts
+    assert counts == expected
+
+
+@pytest.mark.parametrize("min_length", [1, 3])
+def test_vocab_backend_dataframe(lines, min_length: int):
+    """Test that the vocab backend gives the same DataFrame as the python backend."""
+    pd.testing.assert_frame_equal(
+        calculate_word_counts(lines, min_length, backend="vocab"),
+        calculate_word_counts(lines, min_length, backend="python"),
+    )
+
+
+def test_count_vector_grows(monkeypatch: pytest.MonkeyPatch):
+    """Test that the count array grows past its initial capacity."""
+    monkeypatch.setattr("src.vocab.INITIAL_CAPACITY", 2)
+    counts = CountVector()
+    counts.update(f"w{i}" for i in range(100))
+    counts.update(["w99", "w0"])
+    assert len(counts) == 100
+    assert counts["w99"] == 2 and counts["w50"] == 1
+
+
+def test_shared_vocabulary_across_books(lines):
+    """Test that books counted with one vocabulary share IDs and merge as arrays."""
+    vocabulary = Vocabulary()
+    first = vocab_count_words(lines[:1], vocabulary=vocabulary)
+    second = vocab_count_words(lines[1:], vocabulary=vocabulary)
+    assert len(vocabulary) == len(count_words(lines))
+    both = vocab_count_words(lines, vocabulary=vocabulary)
+    np.testing.assert_array_equal(first.to_array() + second.to_array(), both.to_array())
+    first.merge(second)
+    assert list(first.items()) == list(count_words(lines).items())
+
+
+def test_merge_other_vocabulary(lines):
+    """Test that vectors of different vocabularies cannot be merged."""
+    with pytest.raises(ValueError):
+        vocab_count_words(lines).merge(vocab_count_words(lines))
+
+
+def test_update_counts_skips_zeros():
+    """Test that zero counts are ignored and negative counts rejected."""
+    counts = CountVector()
+    counts.update_counts({"a": 2, "b": 0})
+    assert dict(counts) == {"a": 2}
+    with pytest.raises(ValueError):
+        counts.update_counts({"a": -1})
@@ -0,0 +1,186 @@
+import json
+from pathlib import Path
+from typing import List
+
+import numpy as np
+import pytest
+
+from src.__main__ import main
+from src.zipf import METHODS, ZipfFit, bootstrap_exponents, fit_zipf, rank_blocks
+
+# ------------------- Fixtures -------------------
+
+
+@pytest.fixture(scope="module")
+def zipf_counts() -> np.ndarray:
+    """Word counts of 2 million tokens drawn from Zipf's law with exponent 1.1."""
+    ranks = np.arange(1, 20_001)
+    p = ranks**-1.1
+    counts = np.random.default_rng(0).multinomial(2_000_000, p / p.sum())
+    return np.random.default_rng(1).permutation(counts)
+
+
+# ------------------- Tests -------------------
+
+
+def test_rank_blocks():
+    """Test that equal counts form one block of consecutive ranks, in descending order."""
+    values, ends = rank_blocks(np.array([1, 5, 0, 3, 5, 1, 1]))
+    assert values.tolist() == [5, 3, 1]
+    assert ends.tolist() == [2, 3, 6]
+    values, ends = rank_blocks(np.array([1, 5, 0, 3, 5, 1, 1]), max_rank=4)
+    assert values.tolist() == [5, 3, 1]
+    assert ends.tolist() == [2, 3, 4]
+
+
+@pytest.mark.parametrize("exponent", [0.8, 1.0, 1.5])
+def test_lsq_exact_power_law(exponent: float):
+    """Test that the least-squares fit recovers an exact power law."""
+    counts = 1e9 * np.arange(1, 101, dtype=np.float64) ** -exponent
+    fit = fit_zipf(counts.astype(np.int64), "lsq")
+    assert fit.exponent == pytest.approx(exponent, abs=1e-3)
+    assert fit.constant == pytest.approx(1e9, rel=1e-2)
+    assert fit.r_squared == pytest.approx(1.0, abs=1e-6)
+
+
+def test_lsq_matches_polyfit(zipf_counts: np.ndarray):
+    """Test that the per-block least-squares fit equals a regression over every rank."""
+    counts = np.sort(zipf_counts[zipf_counts > 0])[::-1]
+    slope, intercept = np.polyfit(np.log(np.arange(1, len(counts) + 1)), np.log(counts), 1)
+    fit = fit_zipf(zipf_counts, "lsq")
+    assert fit.exponent == pytest.approx(-slope, rel=1e-9)
+    assert fit.constant == pytest.approx(np.exp(intercept), rel=1e-9)
+    assert fit.n_ranks == len(counts)
+
+
+def test_mle_recovers_exponent(zipf_counts: np.ndarray):
+    """Test that the maximum-likelihood fit of the top ranks recovers the exponent."""
+    fit = fit_zipf(zipf_counts, "mle", max_rank=1000)
+    assert fit.exponent == pytest.approx(1.1, abs=0.01)
+    assert fit.n_ranks == 1000
+    total = np.sort(zipf_counts)[::-1][:1000].sum()
+    assert fit.predict(np.arange(1, 1001)).sum() == pytest.approx(total)
+
+
+def test_mle_is_likelihood_maximum(zipf_counts: np.ndarray):
+    """Test that the fitted exponent maximises the log-likelihood."""
+    counts = np.sort(zipf_counts[zipf_counts > 0])[::-1].astype(np.float64)
+    log_ranks = np.log(np.arange(1, len(counts) + 1))
+
+    def log_likelihood(s: float) -> float:
+        return -s * (counts @ log_ranks) - counts.sum() * np.log(np.exp(-s * log_ranks).sum())
+
+    fit = fit_zipf(zipf_counts, "mle")
+    for delta in (-1e-3, 1e-3):
+        assert log_likelihood(fit.exponent) > log_likelihood(fit.exponent + delta)
+
+
+def test_uniform_counts_have_zero_exponent():
+    """Test that equal counts give a flat fit with either method."""
+    for method in METHODS:
+        assert fit_zipf(np.full(50, 7), method).exponent == pytest.approx(0.0, abs=1e-6)
+
+
+def test_fit_needs_two_ranks():
+    """Test that a table with fewer than two words cannot be fitted."""
+    with pytest.raises(ValueError, match="two ranks"):
+        fit_zipf(np.array([5, 0]))
+    with pytest.raises(ValueError, match="Unknown method"):
+        fit_zipf(np.array([5, 3]), "median")
+
+
+@pytest.mark.parametrize("method", METHODS)
+def test_bootstrap_interval(zipf_counts: np.ndarray, method: str):
+    """Test that the bootstrap interval is narrow and brackets the top-rank exponent."""
+    fit = fit_zipf(zipf_counts, method, max_rank=1000, n_boot=50, workers=1)
+    low, high = fit.interval
+    assert low < high < low + 0.1
+    assert low - 0.02 < 1.1 < high + 0.02
+    assert fit.n_boot == 50
+    assert fit.confidence == 0.95
+
+
+@pytest.mark.parametrize("method", METHODS)
+def test_bootstrap_interval_contains_exponent(method: str):
+    """Test that the interval contains the fit even when resampling biases the replicates."""
+    ranks = np.arange(1, 20_001)
+    p = ranks**-1.1
+    # A long tail of rare words, many of which drop out of every replicate
+    counts = np.random.default_rng(0).multinomial(20_000, p / p.sum())
+    fit = fit_zipf(counts, method, n_boot=30, workers=1)
+    low, high = fit.interval
+    assert low <= fit.exponent <= high
+    exponents = bootstrap_exponents(counts, method, n_boot=30, start=fit.exponent)
+    assert fit.bias == pytest.approx(np.median(exponents) - fit.exponent)
+    assert fit.to_dict()["bias"] == fit.bias
+
+
+def test_bootstrap_independent_of_workers(zipf_counts: np.ndarray):
+    """Test that the replicates only depend on the seed, not on the number of workers."""
+    serial = bootstrap_exponents(zipf_counts, "lsq", n_boot=30, workers=1, seed=3)
+    parallel = bootstrap_exponents(zipf_counts, "lsq", n_boot=30, workers=2, seed=3)
+    np.testing.assert_array_equal(serial, parallel)
+    other = bootstrap_exponents(zipf_counts, "lsq", n_boot=30, workers=1, seed=4)
+    assert not np.array_equal(serial, other)
+
+
+def test_bootstrap_resamples_counts():
+    """Test that the Poisson replicates keep the total count on average."""
+    counts = np.array([1000, 40, 40, 3, 3, 3, 1, 1, 1, 1])
+    exponents = bootstrap_exponents(counts, "mle", n_boot=100, seed=0)
+    assert exponents.shape == (100,)
+    assert np.isfinite(exponents).all()
+    assert abs(exponents.mean() - fit_zipf(counts, "mle").exponent) < 0.2
+
+
+def test_main_writes_json(tmp_path: Path):
+    """Test that the command saves both fits and the rank-frequency plot."""
+    table = tmp_path / "counts.csv"
+    counts = (10_000 * np.arange(1, 201, dtype=np.float64) ** -1.0).astype(int) + 1
+    table.write_text("word,count\n" + "".join(f"w{i},{c}\n" for i, c in enumerate(counts)))
+    output = tmp_path / "zipf.json"
+    plot = tmp_path / "zipf.png"
+    with pytest.raises(SystemExit) as exc_info:
+        main(
+            [
+                "zipf",
+                "--input-path",
+                str(table),
+                "--output-path",
+                str(output),
+                "--bootstrap",
+                "20",
+                "--workers",
+                "1",
+                "--plot-path",
+                str(plot),
+            ]
+        )
+    assert exc_info.value.code == 0
+    fits = json.loads(output.read_text())
+    assert [fit["method"] for fit in fits] == list(METHODS)
+    assert all(len(fit["interval"]) == 2 for fit in fits)
+    assert plot.stat().st_size > 0
+
+
+@pytest.mark.parametrize("command", [["zipf"], ["plots", "main", "--fit", "mle"]])
+def test_main_rejects_single_rank(
+    tmp_path: Path, command: List[str], capsys: pytest.CaptureFixture
+):
+    """Test that fitting a table of one word is a usage error, not a traceback."""
+    table = tmp_path / "counts.csv"
+    table.write_text("word,count\nhello,3\n")
+    output = tmp_path / "output.png"
+    with pytest.raises(SystemExit) as exc_info:
+        main([*command, "--input-path", str(table), "--output-path", str(output)])
+    assert exc_info.value.code == 2
+    # The error box of the usage message may wrap the text
+    assert "two ranks" in " ".join(capsys.readouterr().err.replace("│", " ").split())
+
+
+def test_fit_to_dict():
+    """Test the JSON form of a fit without an interval."""
+    fit = ZipfFit("lsq", 1.0, 100.0, 10, 0.99)
+    assert fit.to_dict()["interval"] is None
+    assert fit.to_dict()["bias"] is None
+    assert fit.predict([1, 10]).tolist() == pytest.approx([100.0, 10.0])